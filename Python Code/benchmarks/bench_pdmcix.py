@@ -0,0 +1,173 @@
+"""
+Benchmarks for PD_MCIx, handle_type and comorbidityIdentifier on synthetic cohorts.
+
+    python benchmarks/bench_pdmcix.py --save baseline.json
+    python benchmarks/bench_pdmcix.py --large --compare benchmarks/baseline.json
+
+Each stage is timed (best of --repeat runs) in a plain run, and its peak
+traced memory is measured in a separate run under tracemalloc so tracing
+does not distort the timings. PD_MCIx is also broken down into its internal
+stages (``PD_MCIx/inputs``, ``PD_MCIx/neuropsych``, ...) with a
+StageProfiler, timed and measured the same way. --compare exits non-zero
+when a stage is slower or larger than the baseline by more than --tolerance.
+
+The default sizes run from 1k to 1M rows; --large adds 10M, which needs
+about 8 GB (PD_MCIx peaks near 800 bytes per row). benchmarks/baseline.json
+holds a reference run of the default sizes, from a 1-CPU, 5 GB machine that
+cannot hold 10M rows (its machine is recorded under "environment"); compare
+against a baseline saved on the same machine.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdmcix import StageProfiler, comorbidityIdentifier, handle_type  # noqa: E402
+from pdmcix.kernel import numba_available  # noqa: E402
+from pdmcix.synthetic import synthetic_cohort  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LARGE_SIZES = [10_000_000]
+
+
+def stages(df, config):
+    # name -> zero-argument callable; inputs are copied outside the timed call.
+    # PD_MCIx stages also take a profiler (see measure_stages)
+    subjective = config.subjective
+    series = next(r for r in subjective if r.type == "series")
+    standalone = next(r for r in subjective if r.type == "standalone")
+    ogsame = next(r for r in subjective if r.type == "OGSame")
+    plan = config.compile()
+    comorb = df[[col for col in df.columns if col.startswith("comorb")]]
+    funcs = {
+        'handle_type.standalone': lambda: handle_type(
+            df[[standalone.column]].copy(), "standalone", "bench", standalone.column, standalone.cutoff,
+            standalone.direction),
+        'handle_type.series': lambda: handle_type(
+            df[list(series.columns)].copy(), "series", "bench", series=list(series.columns),
+            series_array=list(series.values), series_match=series.match),
+        'handle_type.OGSame': lambda: handle_type(
+            df[[ogsame.column]].copy(), "OGSame", "bench", ogsame=ogsame.column),
+        'PD_MCIx': lambda profiler=None: plan.apply(df, profiler, engine="numpy"),
+        'comorbidityIdentifier': lambda: comorbidityIdentifier(comorb.copy()),
+    }
+    if numba_available():
+        # Load the compiled kernel up front; its one-off cost is not timed
+        plan.apply(df.head(1), engine="numba")
+        funcs['PD_MCIx.numba'] = lambda profiler=None: plan.apply(df, profiler, engine="numba")
+    return funcs
+
+
+def measure(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def measure_stages(func, repeat):
+    # Internal stages of one call: best time per stage over `repeat` profiled
+    # runs, and per-stage peaks from a run with StageProfiler(memory=True)
+    best = {}
+    for _ in range(repeat):
+        gc.collect()
+        profiler = StageProfiler()
+        func(profiler)
+        for stage, seconds in profiler.summary()['seconds'].items():
+            best[stage] = min(best.get(stage, float("inf")), seconds)
+
+    gc.collect()
+    profiler = StageProfiler(memory=True)
+    func(profiler)
+    peaks = profiler.summary()['peak_bytes']
+    return {stage: (seconds, int(peaks[stage])) for stage, seconds in best.items()}
+
+
+def record(results, name, n, seconds, peak):
+    results.append({'stage': name, 'rows': n, 'seconds': seconds,
+                    'rows_per_second': n / seconds if seconds else None, 'peak_bytes': peak})
+    print(f"  {name:<28} {seconds:10.4f}s {n / seconds:14,.0f} rows/s {peak / 2**20:10.1f} MiB")
+
+
+def run(sizes, seed, repeat, selected):
+    results = []
+    for n in sizes:
+        start = time.perf_counter()
+        df, config = synthetic_cohort(n, seed=seed)
+        print(f"n={n:,}: generated in {time.perf_counter() - start:.2f}s")
+        for name, func in stages(df, config).items():
+            if selected and name not in selected:
+                continue
+            record(results, name, n, *measure(func, repeat))
+            if name.startswith("PD_MCIx"):
+                for stage, (seconds, peak) in measure_stages(func, repeat).items():
+                    record(results, f"{name}/{stage}", n, seconds, peak)
+        del df
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = {(r['stage'], r['rows']): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        base = baseline.get((result['stage'], result['rows']))
+        if base is None:
+            continue
+        for key in ('seconds', 'peak_bytes'):
+            if base[key] and result[key] > tolerance * base[key]:
+                regressions.append(f"{result['stage']} n={result['rows']:,}: {key} "
+                                   f"{result[key]:.4g} vs baseline {base[key]:.4g}")
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--large", action="store_true",
+                        help=f"also run {', '.join(f'{n:,}' for n in LARGE_SIZES)} rows (needs about 8 GB)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", help="only run these stages")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="allowed slowdown / memory growth factor (default 1.25)")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes + [n for n in LARGE_SIZES if args.large and n not in args.sizes]
+    results = run(sizes, args.seed, args.repeat, args.stages)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({'environment': environment(), 'seed': args.seed, 'results': results}, f, indent=2)
+    if args.compare and compare(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
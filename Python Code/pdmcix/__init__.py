@@ -0,0 +1,69 @@
+# PD-MCIx - automated PD-MCI classification (MDS Task Force 2012 criteria)
+#
+# Public names are imported from their submodules on first use, so importing
+# the package (or starting the command line tool) does not load pandas until
+# something actually needs it.
+
+import importlib
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    'handle_type': 'core', 'PD_MCIx': 'core', 'apply_plan': 'core', 'comorbidityIdentifier': 'core',
+    'decode_missing': 'core', 'decode_domains': 'core', 'render_text': 'core', 'comorbidity_matrix': 'core',
+    'CriteriaConfig': 'criteria', 'CriteriaPlan': 'criteria', 'NeuropsychTest': 'criteria',
+    'ResponseCriterion': 'criteria', 'NormConfig': 'criteria',
+    'load_norms': 'norms',
+    'StageProfiler': 'profiling', 'StageTiming': 'profiling',
+    'read_table': 'formats', 'write_table': 'formats',
+    'PD_MCIx_stream': 'streaming',
+    'PD_MCIx_parallel': 'parallel', 'comorbidityIdentifier_parallel': 'parallel',
+    'PD_MCIx_dask': 'partitioned', 'comorbidityIdentifier_dask': 'partitioned', 'write_partitions': 'partitioned',
+    'PD_MCIx_incremental': 'incremental', 'PD_MCIx_mapped': 'mapped',
+    'PD_MCIx_longitudinal': 'longitudinal', 'progression_summary': 'longitudinal',
+    'ResultStore': 'store', 'build_store': 'store',
+    'PD_MCIx_cached': 'cache', 'ResultCache': 'cache',
+    'PD_MCIx_sweep': 'sweep', 'cutoff_grid': 'sweep',
+    'agreement': 'validation', 'cohen_kappa': 'validation', 'confusion_matrix': 'validation',
+}
+
+__all__ = list(_EXPORTS)
+
+# Submodules stay reachable as attributes (pdmcix.streaming, ...) without an
+# explicit import, as they were when the package imported them eagerly
+_SUBMODULES = {'core', 'criteria', 'profiling', 'formats', 'streaming', 'parallel', 'incremental',
+               'sweep', 'validation', 'longitudinal', 'mapped', 'synthetic', 'jobs', 'uploads', 'cli', 'server',
+               'norms', 'partitioned', 'store', 'kernel', 'cache'}
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .core import handle_type, PD_MCIx, apply_plan, comorbidityIdentifier, decode_missing
+    from .core import comorbidity_matrix, decode_domains, render_text
+    from .criteria import CriteriaConfig, CriteriaPlan, NeuropsychTest, ResponseCriterion, NormConfig
+    from .norms import load_norms
+    from .profiling import StageProfiler, StageTiming
+    from .formats import read_table, write_table
+    from .streaming import PD_MCIx_stream
+    from .parallel import PD_MCIx_parallel, comorbidityIdentifier_parallel
+    from .partitioned import PD_MCIx_dask, comorbidityIdentifier_dask, write_partitions
+    from .incremental import PD_MCIx_incremental
+    from .mapped import PD_MCIx_mapped
+    from .longitudinal import PD_MCIx_longitudinal, progression_summary
+    from .store import ResultStore, build_store
+    from .cache import PD_MCIx_cached, ResultCache
+    from .sweep import PD_MCIx_sweep, cutoff_grid
+    from .validation import agreement, cohen_kappa, confusion_matrix
@@ -0,0 +1,375 @@
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .core import DOMAIN_NAMES, add_vectors, apply_plan, is_dask
+from .criteria import PRIMARY_TESTS, TERTIARY_TESTS, CriteriaPlan, resolve_plan
+from .formats import TableWriter, _pyarrow, file_hash, iter_table, read_schema, value_types
+from .norms import CACHE_DIR
+from .profiling import StageProfiler, stage_timer
+from .streaming import STREAM_OUTPUT_COLS, PD_MCIx_stream
+
+# Content-addressed cache of PD_MCIx results.
+#
+# A result is keyed by a digest of the input columns the criteria read
+# (values, dtypes, names and the index), the criteria fingerprint, the
+# output mode (compact, text) and the code version: the source of the
+# modules that compute it, and the pandas and numpy versions. Only the
+# columns PD_MCIx computes are stored; a hit rebuilds the {test}_vec columns
+# from the caller's frame (they are copies or normed values of its scores)
+# and appends the stored ones. Other input columns never affect those, so
+# frames that differ only in columns the criteria do not read share an entry.
+# Streamed files (ResultCache.stream) are keyed by a digest of their content
+# supplied by the caller instead, e.g. the upload hash.
+#
+# Entries are held in two tiers: an in-memory LRU with a byte budget, and
+# Parquet files under CACHE_DIR/results with a disk budget, evicted least
+# recently used first. Both hold label and text columns as categoricals.
+# Disk hits are promoted to memory, and new results are written to disk by a
+# background thread, so a miss costs no more than classifying. Inputs holding
+# columns PD_MCIx writes (e.g. an earlier result) are classified directly,
+# since their output depends on those columns too.
+
+RESULTS_DIR = os.path.join(CACHE_DIR, "results")
+MEMORY_BYTES = int(os.environ.get("PDMCIX_RESULT_MEMORY_MB", "512")) << 20
+DISK_BYTES = int(os.environ.get("PDMCIX_RESULT_DISK_MB", "4096")) << 20
+
+# attrs key listing the object columns stored as categoricals
+OBJECT_COLUMNS = "pdmcix_object_columns"
+# Output columns besides the {test}_vec, {test}_impaired, {domain}_impaired
+# and {response}_impairment ones
+RESULT_COLUMNS = {'NP_impaired', 'Subjective_total', 'Subjective_impaired', 'Functional_total',
+                  'Functional_impaired', 'missingValues', 'missingMask', 'AutoDx', 'amnesticStatus',
+                  'multipleSingle', 'Reliability', 'multipleSingleDomain', 'domainMask'}
+# Score columns rebuilt from the input on a hit rather than stored
+VECTOR_COLUMNS = {f"{name}_vec" for name in PRIMARY_TESTS + TERTIARY_TESTS}
+OUTPUT_COLUMNS = (RESULT_COLUMNS | VECTOR_COLUMNS
+                  | {f"{name}_impaired" for name in PRIMARY_TESTS + DOMAIN_NAMES})
+# Modules whose code determines the output
+SOURCES = ("core", "criteria", "kernel", "norms")
+
+
+@lru_cache(maxsize=None)
+def code_version() -> str:
+    here = os.path.dirname(os.path.abspath(__file__))
+    digests = [file_hash(os.path.join(here, f"{module}.py")) for module in SOURCES]
+    return "-".join([pd.__version__, np.__version__] + digests)
+
+
+def writes(col) -> bool:
+    # Columns PD_MCIx writes, or whose presence changes its output: any
+    # {response}_impairment column is summed into the response totals
+    col = str(col)
+    return (col in OUTPUT_COLUMNS
+            or (col.startswith(('Subjective', 'Functional')) and col.endswith('impairment')))
+
+
+def _update(digest, values: pd.Series):
+    # Raw bytes for numeric columns, else a 64-bit hash per value. Those
+    # hashes are of the values as strings, so object columns also digest
+    # each value's type: 3 and '3' must not share an entry (see value_types)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        _update(digest, values.cat.categories.to_series())
+        digest.update(np.ascontiguousarray(values.cat.codes.to_numpy()).data)
+        return
+    array = values.to_numpy() if isinstance(values.dtype, np.dtype) else None
+    if array is not None and array.dtype.kind in "biufmM":
+        digest.update(np.ascontiguousarray(array).view(np.uint8).data)
+        return
+    digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().data)
+    types = value_types(values)
+    if types is not None:
+        digest.update(pd.util.hash_array(types).data)
+
+
+def frame_digest(df: pd.DataFrame, columns) -> str:
+    # Digest of df[columns] and the index (sha256: the fastest hashlib
+    # digest on CPUs with SHA extensions)
+    digest = hashlib.sha256()
+    positions = df.columns.get_indexer(columns)
+    digest.update(repr([(str(col), str(df.dtypes.iloc[i])) for col, i in zip(columns, positions)]).encode())
+    if isinstance(df.index, pd.RangeIndex):
+        digest.update(repr(("range", df.index.start, df.index.stop, df.index.step, df.index.name)).encode())
+    else:
+        digest.update(repr(("index", str(df.index.dtype), df.index.names)).encode())
+        _update(digest, df.index.to_series())
+    for i in positions:
+        _update(digest, df.iloc[:, i])
+    return digest.hexdigest()
+
+
+def _stored(added: pd.DataFrame) -> pd.DataFrame:
+    # Label and text columns hold a few distinct strings; as categoricals
+    # they are small in memory, dictionary-encoded on disk and read back fast
+    objects = [col for col in added.columns if added[col].dtype == object]
+    stored = added.assign(**{col: added[col].astype("category") for col in objects})
+    stored.attrs = {**added.attrs, OBJECT_COLUMNS: objects}
+    return stored
+
+
+def _restored(stored: pd.DataFrame) -> pd.DataFrame:
+    attrs = dict(stored.attrs)
+    objects = attrs.pop(OBJECT_COLUMNS, [])
+    added = stored.copy(deep=False)
+    for col in objects:
+        added[col] = stored[col].astype(object)
+    added.attrs = attrs
+    return added
+
+
+class ResultCache:
+    """
+    Two-tier cache of PD_MCIx results (see ``classify``).
+
+    `memory_bytes` bounds the in-memory tier and `disk_bytes` the Parquet
+    files in `directory`; with directory=None results are only kept in
+    memory. At most `memory_entries` results are kept in memory.
+    """
+
+    def __init__(self, directory: Optional[str] = RESULTS_DIR, memory_bytes: int = MEMORY_BYTES,
+                 disk_bytes: int = DISK_BYTES, memory_entries: int = 64):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.memory_entries = memory_entries
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._pending: List[Future] = []
+
+    def key(self, df: pd.DataFrame, plan: CriteriaPlan, compact: bool = False, text: bool = True) -> str:
+        return self._key(frame_digest(df, plan.input_columns), plan, compact, text)
+
+    @staticmethod
+    def _key(source: str, plan: CriteriaPlan, *options) -> str:
+        state = (source, plan.fingerprint) + options + (code_version(),)
+        return hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()
+
+    def classify(self, df: pd.DataFrame, plan: CriteriaPlan, compact: bool = False, text: bool = True,
+                 profiler: Optional[StageProfiler] = None, engine: Optional[str] = None) -> pd.DataFrame:
+        # apply_plan(df, plan, ...), from the cache when the same inputs were classified before
+        if is_dask(df) or any(writes(col) for col in df.columns):
+            return apply_plan(df, plan, profiler, compact, text, engine)
+        plan.bind(df.columns)
+        key = self.key(df, plan, compact, text)
+        added = self.get(key)
+        if added is None:
+            self.misses += 1
+            result = apply_plan(df, plan, profiler, compact, text, engine)
+            added = result[[col for col in result.columns
+                            if col not in df.columns and col not in VECTOR_COLUMNS]].reset_index(drop=True)
+            added.attrs = {k: v for k, v in result.attrs.items() if k not in df.attrs}
+            self.put(key, added)
+            return result
+        result = add_vectors(df, plan, stage_timer(profiler, len(df)))
+        for col in added.columns:
+            # Copied, so changes to the result do not reach the cache
+            values = added[col].to_numpy() if isinstance(added[col].dtype, np.dtype) else added[col].array
+            result[col] = values.copy()
+        result.attrs.update(added.attrs)
+        return result
+
+    def stream(self, source_key: str, input_path: Union[str, pd.DataFrame], output_path: str,
+               chunksize: int = 100_000, output_cols: Optional[List[str]] = None, config=None,
+               compact: bool = False, progress: Optional[Callable[[int], None]] = None,
+               output_format: Optional[str] = None, **criteria) -> int:
+        """
+        PD_MCIx_stream through the cache. `source_key` identifies the content
+        of `input_path` (e.g. its file hash); a file streamed before with the
+        same criteria and output columns is written from the stored columns,
+        reading only the input columns in `output_cols`. Chunks and `progress`
+        calls are the same on a hit, so a job can still be followed or
+        cancelled. Results over the memory budget are not kept.
+        """
+        if output_cols is None:
+            output_cols = STREAM_OUTPUT_COLS
+        plan = resolve_plan(config, **criteria)
+        schema = pd.Index(read_schema(input_path))
+        run = partial(PD_MCIx_stream, input_path, output_path, chunksize=chunksize, output_cols=output_cols,
+                      config=plan, compact=compact, progress=progress, output_format=output_format)
+        if any(writes(col) for col in schema):
+            return run()
+        plan.bind(schema)
+        computed = [col for col in output_cols if col not in schema]
+        key = self._key(f"stream:{source_key}", plan, compact, tuple(computed))
+        added = self.get(key)
+        if added is not None:
+            return self._replay(added, input_path, output_path, schema, chunksize, output_cols,
+                                progress, output_format)
+
+        self.misses += 1
+        parts, nbytes = [], 0
+
+        def collect(result: pd.DataFrame):
+            nonlocal nbytes
+            if nbytes <= self.memory_bytes:
+                parts.append(result[computed])
+                nbytes += int(parts[-1].memory_usage(index=False).sum())
+
+        rows = run(on_chunk=collect)
+        # A column whose dtype varies by chunk (e.g. an OGSame flag copied
+        # from input that is only missing in some chunks) would be written
+        # differently from stored values
+        if (parts and nbytes <= self.memory_bytes
+                and all(list(part.dtypes) == list(parts[0].dtypes) for part in parts)):
+            added = pd.concat(parts, ignore_index=True)
+            added.attrs = {}
+            self.put(key, added)
+        return rows
+
+    def _replay(self, added: pd.DataFrame, input_path, output_path, schema: pd.Index, chunksize: int,
+                output_cols: List[str], progress, output_format) -> int:
+        # Writes a stored stream result chunk by chunk, as PD_MCIx_stream does
+        passthrough = set(output_cols) & set(schema)
+        if passthrough:
+            chunks = iter_table(input_path, chunksize, [col for col in schema if col in passthrough])
+        else:
+            chunks = (pd.DataFrame(index=range(min(chunksize, len(added) - start)))
+                      for start in range(0, len(added), chunksize))
+        with TableWriter(output_path, output_cols, fmt=output_format) as writer:
+            for chunk in chunks:
+                part = added.iloc[writer.rows:writer.rows + len(chunk)].reset_index(drop=True)
+                writer.write(pd.concat([chunk.reset_index(drop=True), part], axis=1)[output_cols])
+                if progress is not None:
+                    progress(writer.rows)
+        return writer.rows
+
+    # --- Tiers ---
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        # The stored columns for `key`, or None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return _restored(entry[0])
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            _pyarrow()
+            stored = pd.read_parquet(path)
+            os.utime(path)
+        except (OSError, ImportError):
+            return None
+        self.hits["disk"] += 1
+        self._remember(key, stored)
+        return _restored(stored)
+
+    def put(self, key: str, added: pd.DataFrame):
+        # `added` must not be modified afterwards; the disk copy is written
+        # in the background (see flush)
+        stored = _stored(added)
+        self._remember(key, stored)
+        if self.directory is None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdmcix-cache")
+            self._pending = [future for future in self._pending if not future.done()]
+            self._pending.append(self._writer.submit(self._write, key, stored))
+
+    def flush(self):
+        # Wait for pending disk writes
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def _write(self, key: str, stored: pd.DataFrame):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            _pyarrow()
+            os.makedirs(self.directory, exist_ok=True)
+            stored.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+            self._evict_disk()
+        except (OSError, ImportError, ValueError, TypeError):
+            # A read-only cache directory, no pyarrow, or columns Parquet
+            # cannot hold: the result stays in the memory tier only
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _remember(self, key: str, stored: pd.DataFrame):
+        nbytes = int(stored.memory_usage(index=False).sum())
+        with self._lock:
+            self._memory[key] = (stored, nbytes)
+            self._memory.move_to_end(key)
+            # The newest entry is kept even when it alone is over budget
+            total = sum(size for _, size in self._memory.values())
+            while len(self._memory) > 1 and (total > self.memory_bytes or len(self._memory) > self.memory_entries):
+                _, (_, size) = self._memory.popitem(last=False)
+                total -= size
+
+    def _evict_disk(self):
+        files = []
+        for path in glob.glob(os.path.join(self.directory, "*.parquet")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files)[:-1]:
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        self.flush()
+        with self._lock:
+            self._memory.clear()
+        if self.directory is not None:
+            for path in glob.glob(os.path.join(self.directory, "*.parquet")):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+_default: Optional[ResultCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> ResultCache:
+    # Shared by PD_MCIx_cached calls that do not pass a cache
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ResultCache()
+    return _default
+
+
+def PD_MCIx_cached(df: pd.DataFrame, config=None, compact: bool = False, text: bool = True,
+                   cache: Optional[ResultCache] = None, profiler: Optional[StageProfiler] = None,
+                   **criteria) -> pd.DataFrame:
+    """
+    PD_MCIx through a result cache: rerunning the same inputs with the same
+    criteria returns the stored result instead of classifying again.
+
+    Criteria are given as `config` or as PD_MCIx keyword arguments. `cache`
+    defaults to a process-wide ResultCache in ``CACHE_DIR/results`` (budgets
+    from PDMCIX_RESULT_MEMORY_MB and PDMCIX_RESULT_DISK_MB). The result is
+    identical to PD_MCIx's.
+    """
+    plan = resolve_plan(config, **criteria)
+    return (cache or default_cache()).classify(df, plan, compact, text, profiler)
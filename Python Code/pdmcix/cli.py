@@ -0,0 +1,100 @@
+import argparse
+import sys
+from typing import List, Optional
+
+# Command line entry point: ``python -m pdmcix classify|serve ...``.
+#
+# Only argparse is imported up front; pandas, pyarrow and the HTTP server are
+# loaded inside the subcommand that needs them, so ``--help`` and argument
+# errors return immediately. ``-`` as a path means stdin / stdout, which lets
+# the classifier sit in a shell pipeline:
+#
+#     extract | python -m pdmcix classify -c criteria.json - - | load
+
+FORMAT_CHOICES = ["csv", "parquet", "feather"]
+
+
+def _format(path: str, fmt: Optional[str]) -> Optional[str]:
+    if path == "-" and fmt is None:
+        # No extension to go by; CSV is the pipeline default
+        return "csv"
+    return fmt
+
+
+def _columns(value: str) -> List[str]:
+    return [col.strip() for col in value.split(",") if col.strip()]
+
+
+def classify(args: argparse.Namespace) -> int:
+    from .streaming import PD_MCIx_stream
+
+    input_format = _format(args.input, args.input_format)
+    output_format = _format(args.output, args.output_format)
+    # Columnar formats are binary; CSV goes through the text layer
+    source = args.input
+    if source == "-":
+        source = sys.stdin if input_format == "csv" else sys.stdin.buffer
+    sink = args.output
+    if sink == "-":
+        sink = sys.stdout if output_format == "csv" else sys.stdout.buffer
+
+    rows = PD_MCIx_stream(source, sink, chunksize=args.chunksize, output_cols=args.output_cols,
+                          workers=args.workers, config=args.config, compact=args.compact,
+                          input_format=input_format, output_format=output_format)
+    if sink is not args.output:
+        sink.flush()
+    if not args.quiet:
+        print(f"Classified {rows} rows", file=sys.stderr)
+    return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    from .server import serve as run_server
+
+    run_server(args.config, host=args.host, port=args.port, chunksize=args.chunksize)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pdmcix", description="Automated PD-MCI classification (PD-MCIx).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("classify", help="Classify a CSV, Parquet or Feather file.",
+                            description="Classify INPUT and write the results to OUTPUT. Use - for stdin/stdout.")
+    p.add_argument("input", help="input file, or - for stdin")
+    p.add_argument("output", help="output file, or - for stdout")
+    p.add_argument("-c", "--config", required=True,
+                   help="criteria file (JSON or YAML) naming the test columns, cutoffs and response items")
+    p.add_argument("--output-cols", type=_columns, metavar="COL,...",
+                   help="comma-separated columns to write (default: AutoDx,amnesticStatus,multipleSingle,Reliability)")
+    p.add_argument("--input-format", choices=FORMAT_CHOICES, help="format of INPUT (default: from extension)")
+    p.add_argument("--output-format", choices=FORMAT_CHOICES, help="format of OUTPUT (default: from extension)")
+    p.add_argument("--chunksize", type=int, default=100_000, help="rows per chunk (default: %(default)s)")
+    p.add_argument("--workers", type=int, default=1, help="classifier processes (default: %(default)s)")
+    p.add_argument("--compact", action="store_true", help="write compact output (missingMask, Int8 flags)")
+    p.add_argument("-q", "--quiet", action="store_true", help="do not report the row count on stderr")
+    p.set_defaults(func=classify)
+
+    p = commands.add_parser("serve", help="Serve batch classification over HTTP.",
+                            description="Serve POST /classify and GET /health on HOST:PORT.")
+    p.add_argument("-c", "--config", required=True,
+                   help="criteria file (JSON or YAML) naming the test columns, cutoffs and response items")
+    p.add_argument("--host", default="127.0.0.1", help="interface to bind (default: %(default)s)")
+    p.add_argument("--port", type=int, default=8000, help="port to listen on (default: %(default)s)")
+    p.add_argument("--chunksize", type=int, default=100_000, help="rows per chunk (default: %(default)s)")
+    p.set_defaults(func=serve)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # Downstream closed the pipe (e.g. `| head`); not an error for us
+        sys.stderr.close()
+        return 1
+    except (ValueError, KeyError, OSError, ImportError) as e:
+        # KeyError's str() is the repr of its message
+        print(f"pdmcix: error: {e.args[0] if isinstance(e, KeyError) else e}", file=sys.stderr)
+        return 2
@@ -0,0 +1,636 @@
+import pandas as pd
+import numpy as np
+from typing import Optional, Union, List, Tuple
+
+from .criteria import CriteriaConfig, CriteriaPlan, PRIMARY_TESTS, tertiary_for
+from .profiling import StageProfiler, stage_timer
+
+# PD-MCIx - Subjective Optional
+
+def is_dask(df) -> bool:
+    # Dask DataFrames are classified lazily by .partitioned; checked by
+    # module name so that dask is never imported here
+    return type(df).__module__.split(".")[0] in ("dask", "dask_expr")
+
+
+def match_series(frame: pd.DataFrame, series_array: List[Union[str, int, float]], how: str = "all") -> np.ndarray:
+    # Row-wise: are all (or any) of the series_array items present among the
+    # columns of `frame`? Builds an items x rows presence matrix: numeric
+    # columns by direct comparison, other columns by code lookup.
+    if how not in ("all", "any"):
+        raise ValueError("Series match must be 'all' or 'any'")
+    if how == "all" and any(pd.isna(item) for item in series_array):
+        # NaN never compares equal, so an "all" series with a NaN item never matches
+        return np.zeros(len(frame), dtype=bool)
+
+    items = pd.Index([item for item in series_array if not pd.isna(item)]).unique()
+    numeric_items = [(k, item) for k, item in enumerate(items)
+                     if isinstance(item, (int, float, np.number)) and not isinstance(item, (bool, np.bool_))]
+    found = np.zeros((len(items), len(frame)), dtype=bool)
+
+    # Numeric columns are compared a whole same-dtype block at a time
+    dtypes = frame.dtypes.to_numpy()
+    numeric = [i for i, dtype in enumerate(dtypes) if dtype.kind in "iuf"]
+    for dtype in set(dtypes[numeric]):
+        block = frame.iloc[:, [i for i in numeric if dtypes[i] == dtype]].to_numpy()
+        for k, item in numeric_items:
+            # Compare in the block's own dtype; items it cannot represent never match
+            with np.errstate(invalid="ignore", over="ignore"):
+                typed = np.array(item).astype(dtype)
+            if typed == item:
+                found[k] |= (block == typed).any(axis=1)
+
+    for col in (i for i, dtype in enumerate(dtypes) if dtype.kind not in "iuf"):
+        codes = items.get_indexer(frame.iloc[:, col])
+        hit = np.flatnonzero(codes >= 0)
+        found[codes[hit], hit] = True
+
+    return found.all(axis=0) if how == "all" else found.any(axis=0)
+
+
+def handle_type(df: pd.DataFrame, type_: str, base_name: str, 
+                standalone: Optional[str] = None, standalone_cutoff: Optional[float] = None, 
+                cutoff_direction: str = "less",
+                series: Optional[List[str]] = None, series_array: Optional[List[Union[str, int, float]]] = None, 
+                ogsame: Optional[str] = None, series_match: str = "all") -> pd.DataFrame:
+    if is_dask(df):
+        from .partitioned import handle_type_dask
+        return handle_type_dask(df, type_, base_name, standalone=standalone, standalone_cutoff=standalone_cutoff,
+                                cutoff_direction=cutoff_direction, series=series, series_array=series_array,
+                                ogsame=ogsame, series_match=series_match)
+    
+    impairment_col = f"{base_name}_impairment"
+    
+    if type_ == "standalone":
+        if cutoff_direction == "less":
+            df[impairment_col] = np.where(df[standalone] <= standalone_cutoff, 1,
+                                         np.where(df[standalone] > standalone_cutoff, 0, np.nan))
+        elif cutoff_direction == "greater":
+            df[impairment_col] = np.where(df[standalone] >= standalone_cutoff, 1,
+                                         np.where(df[standalone] < standalone_cutoff, 0, np.nan))
+    elif type_ == "series":
+        # series is list of column names (strings); series_match is "all" when
+        # every series_array item must appear in the row, "any" when one is enough
+        df[impairment_col] = np.where(match_series(df[series], series_array, series_match), 1, 0)
+    elif type_ == "OGSame":
+        # ogsame is a boolean or numeric vector with impairment flags
+        df[impairment_col] = df[ogsame]
+    else:
+        # Unknown type or no data
+        df[impairment_col] = np.nan
+        
+    return df
+
+
+# Column-wise rule engine used by PD_MCIx
+
+DOMAIN_NAMES = ["Attention", "Memory", "Executive", "Visuospatial", "Language"]
+
+
+def score_values(scores) -> Tuple[np.ndarray, np.ndarray]:
+    # (values, missing) for a score Series, or an already split pair (e.g.
+    # zero-copy views of a memory-mapped column and its validity)
+    if isinstance(scores, tuple):
+        return scores
+    values = scores.to_numpy(dtype=float, na_value=np.nan)
+    return values, np.isnan(values)
+
+
+def calculate_impaired(primary, primary_cutoff: float,
+                       fallback=None, fallback_cutoff: Optional[float] = None) -> np.ndarray:
+    # 1 at or below the cutoff, 0 above it, NaN when missing; the tertiary
+    # test is only consulted where the primary score is missing. Scores are
+    # Series or (values, missing) pairs, see score_values.
+    primary, use_fallback = score_values(primary)
+    flags = np.where(primary <= primary_cutoff, 1.0, 0.0)
+    use_fallback = use_fallback.copy()
+    flags[use_fallback] = np.nan
+
+    if fallback is not None:
+        fallback, fallback_missing = score_values(fallback)
+        use_fallback &= ~fallback_missing
+        flags[use_fallback] = fallback[use_fallback] <= fallback_cutoff
+
+    # Same dtype the row-wise version produced: int when nothing is missing
+    if not np.isnan(flags).any():
+        return flags.astype(np.int64)
+    return flags
+
+
+def calculate_NP_impaired(domain_scores: np.ndarray) -> np.ndarray:
+    # The 15 MDS conditions reduce to: two impaired tests within one domain,
+    # or at least one impaired test in two different domains
+    two_in_one = (domain_scores >= 2).any(axis=1)
+    one_in_two = (domain_scores >= 1).sum(axis=1) >= 2
+    return (two_in_one | one_in_two).astype(np.int64)
+
+
+def mask_dtype(n_cols: int) -> type:
+    # Smallest unsigned integer type with a bit per column
+    if n_cols > 64:
+        raise ValueError(f"Cannot pack {n_cols} columns into a 64-bit mask")
+    return next(t for t in (np.uint8, np.uint16, np.uint32, np.uint64) if np.iinfo(t).bits >= n_cols)
+
+
+def bitmask(flags: np.ndarray) -> np.ndarray:
+    # Pack each row of a boolean matrix (at most 64 columns) into the smallest
+    # unsigned integer that holds it; bit i is column i
+    n_cols = flags.shape[1]
+    dtype = mask_dtype(n_cols)
+    codes = np.zeros(flags.shape[0], dtype=dtype)
+    for bit in range(n_cols):
+        codes |= flags[:, bit].astype(dtype) << dtype(bit)
+    return codes
+
+
+def unpack_bitmask(codes: np.ndarray, n_cols: int) -> np.ndarray:
+    return ((codes[:, None] >> np.arange(n_cols, dtype=codes.dtype)) & 1).astype(bool)
+
+
+def row_patterns(flags: np.ndarray):
+    # Distinct rows of a boolean matrix and, for every row, the index of its pattern
+    n_cols = flags.shape[1]
+    if n_cols <= 64:
+        inverse, uniques = pd.factorize(bitmask(flags))
+        return unpack_bitmask(uniques, n_cols), inverse
+    packed = np.packbits(flags, axis=1, bitorder="little")
+    patterns, inverse = np.unique(packed, axis=0, return_inverse=True)
+    patterns = np.unpackbits(patterns, axis=1, count=n_cols, bitorder="little")
+    return patterns.astype(bool), inverse.reshape(-1)
+
+
+def missing_message(missing_cols: List[str]) -> str:
+    if missing_cols:
+        return f"Patient is missing values in {', '.join(missing_cols)}"
+    return "No missing values"
+
+
+def get_missing_values(missing: np.ndarray, cols: List[str]) -> np.ndarray:
+    # Build one message per distinct missingness pattern, then broadcast
+    patterns, inverse = row_patterns(missing)
+
+    messages = [missing_message([col for col, is_missing in zip(cols, pattern) if is_missing])
+                for pattern in patterns]
+    return np.array(messages, dtype=object)[inverse]
+
+
+# Text columns and the bitmask columns they are rendered from (see render_text)
+TEXT_COLUMNS = {'missingValues': 'missingMask', 'multipleSingleDomain': 'domainMask'}
+
+
+def decode_missing(mask: pd.Series, cols: Optional[List[str]] = None, as_text: bool = True) -> pd.Series:
+    # Expand a missingMask column back into the missingValues text (or, with
+    # as_text=False, lists of column names). The bit order is the column list
+    # apply_plan stores in df.attrs['missing_columns'].
+    if cols is None:
+        cols = mask.attrs['missing_columns']
+    inverse, uniques = pd.factorize(mask.to_numpy())
+    decoded = []
+    for pattern in unpack_bitmask(uniques, len(cols)):
+        names = [col for col, is_missing in zip(cols, pattern) if is_missing]
+        decoded.append(missing_message(names) if as_text else names)
+    values = np.empty(len(decoded), dtype=object)
+    values[:] = decoded
+    return pd.Series(values[inverse], index=mask.index, name='missingValues')
+
+
+def decode_domains(mask: pd.Series, compact: bool = False) -> pd.Series:
+    # Expand a domainMask column into the multipleSingleDomain labels
+    return pd.Series(labels(mask.to_numpy(dtype=np.intp), DOMAIN_LABELS, compact), index=mask.index,
+                     name='multipleSingleDomain')
+
+
+def render_text(df: pd.DataFrame, columns: Optional[List[str]] = None, compact: bool = False) -> pd.DataFrame:
+    """
+    Render the text columns of a ``text=False`` result from their bitmasks.
+
+    Only the rows of `df` are rendered, so select first: ``render_text(result.head(5))``
+    for a preview, or one chunk at a time for an export. Each text column
+    (``missingValues``, ``multipleSingleDomain``; default: both, where the
+    mask is present) replaces its mask column (``missingMask``,
+    ``domainMask``) in place. Each distinct mask is decoded once; compact=True
+    gives a Categorical multipleSingleDomain. Returns a new frame; `df` is
+    not modified.
+    """
+    if columns is None:
+        columns = [text for text, mask in TEXT_COLUMNS.items() if mask in df.columns]
+    out = df.copy(deep=False)
+    for text in columns:
+        mask = TEXT_COLUMNS[text]
+        if text == 'missingValues':
+            out[mask] = decode_missing(df[mask], df.attrs.get('missing_columns')).to_numpy()
+        else:
+            out[mask] = decode_domains(df[mask], compact).array
+    return out.rename(columns={TEXT_COLUMNS[text]: text for text in columns})
+
+
+def select_columns(result: pd.DataFrame, columns: List[str], compact: bool = False) -> pd.DataFrame:
+    # `columns` of a text=False result; text columns among them are rendered
+    # from their masks, so text that is not selected is never built
+    selected = {}
+    for col in columns:
+        if col in TEXT_COLUMNS and col not in result.columns:
+            mask = result[TEXT_COLUMNS[col]]
+            selected[col] = (decode_missing(mask, result.attrs['missing_columns']) if col == 'missingValues'
+                             else decode_domains(mask, compact))
+        else:
+            selected[col] = result[col]
+    out = pd.DataFrame(selected, index=result.index)
+    out.attrs = dict(result.attrs)
+    return out
+
+
+def reliability_lookup(total_cols: int) -> np.ndarray:
+    # Reliability by number of non-missing items; only total_cols + 1 values
+    # are possible, so round each once with Python's round()
+    return np.array([round(100 * (count / total_cols), 1) for count in range(total_cols + 1)])
+
+
+def calculate_reliability(missing: np.ndarray) -> np.ndarray:
+    # Percentage of non-missing items
+    total_cols = missing.shape[1]
+    return reliability_lookup(total_cols)[total_cols - missing.sum(axis=1)]
+
+
+# multipleSingleDomain label for every 5-bit domain code
+DOMAIN_LABELS = [
+    ", ".join(name for bit, name in enumerate(DOMAIN_NAMES) if code >> bit & 1)
+    for code in range(1 << len(DOMAIN_NAMES))
+]
+AMNESTIC_LABELS = ["noMCI", "nonAmnestic", "amnestic"]
+MULTIPLE_SINGLE_LABELS = ["None", "Single", "Multiple"]
+
+
+def domain_codes(domain_scores: np.ndarray) -> np.ndarray:
+    # Encode the impaired domains as a 5-bit code
+    return bitmask(domain_scores >= 1)
+
+
+def get_domain_details(domain_scores: np.ndarray) -> np.ndarray:
+    return np.array(DOMAIN_LABELS, dtype=object)[domain_codes(domain_scores)]
+
+
+def labels(codes: np.ndarray, categories: List[str], compact: bool = False):
+    # Label column from integer codes (-1 = missing): Categorical in compact
+    # mode, otherwise the string column PD_MCIx has always produced ('nan'
+    # for missing)
+    if compact:
+        return pd.Categorical.from_codes(codes, categories)
+    return np.array(categories + ["nan"], dtype=object)[codes]
+
+
+def as_int8(values: pd.Series) -> pd.Series:
+    # Nullable Int8 when every value is a small integer, otherwise unchanged
+    if values.dtype.kind not in "biuf":
+        return values
+    numbers = values.to_numpy(dtype=float, na_value=np.nan)
+    present = numbers[~np.isnan(numbers)]
+    if len(present) and ((present != np.round(present)).any() or np.abs(present).max() > 127):
+        return values
+    return values.astype("Int8")
+
+
+def PD_MCIx(
+    df: pd.DataFrame,
+    # Neuropsychological Assessment parameters
+    attentionOne: str, attentionOne_cutoff: float, 
+    attentionTwo: str, attentionTwo_cutoff: float,
+    memoryOne: str, memoryOne_cutoff: float, 
+    memoryTwo: str, memoryTwo_cutoff: float,
+    execuFuncOne: str, execuFuncOne_cutoff: float, 
+    execuFuncTwo: str, execuFuncTwo_cutoff: float,
+    visuoSpatOne: str, visuoSpatOne_cutoff: float, 
+    visuoSpatTwo: str, visuoSpatTwo_cutoff: float,
+    languageOne: str, languageOne_cutoff: float, 
+    languageTwo: str, languageTwo_cutoff: float,
+    *,
+    # Tertiary fallback
+    attentionThree: Optional[str] = None, attentionThree_cutoff: Optional[float] = None,
+    memoryThree: Optional[str] = None, memoryThree_cutoff: Optional[float] = None,
+    execuFuncThree: Optional[str] = None, execuFuncThree_cutoff: Optional[float] = None,
+    visuoSpatThree: Optional[str] = None, visuoSpatThree_cutoff: Optional[float] = None,
+    languageThree: Optional[str] = None, languageThree_cutoff: Optional[float] = None,
+    
+    # Subjective Response parameters
+    type_1: str, subjectiveOne_standalone: Optional[str] = None, subjectiveOne_standalone_cutoff: Optional[float] = None, 
+    subjectiveOne_cutoff_direction: str = "less", subjectiveOne_Series: Optional[List[str]] = None, 
+    subjectiveOne_Series_array: Optional[List[Union[str, int, float]]] = None, subjectiveOne_OGSame: Optional[str] = None,
+    subjectiveOne_Series_match: str = "all",
+    type_2: str, subjectiveTwo_standalone: Optional[str] = None, subjectiveTwo_standalone_cutoff: Optional[float] = None, 
+    subjectiveTwo_cutoff_direction: str = "less", subjectiveTwo_Series: Optional[List[str]] = None, 
+    subjectiveTwo_Series_array: Optional[List[Union[str, int, float]]] = None, subjectiveTwo_OGSame: Optional[str] = None,
+    subjectiveTwo_Series_match: str = "all",
+    type_3: str, subjectiveThree_standalone: Optional[str] = None, subjectiveThree_standalone_cutoff: Optional[float] = None, 
+    subjectiveThree_cutoff_direction: str = "less", subjectiveThree_Series: Optional[List[str]] = None, 
+    subjectiveThree_Series_array: Optional[List[Union[str, int, float]]] = None, subjectiveThree_OGSame: Optional[str] = None,
+    subjectiveThree_Series_match: str = "all",
+    type_4: str, subjectiveFour_standalone: Optional[str] = None, subjectiveFour_standalone_cutoff: Optional[float] = None, 
+    subjectiveFour_cutoff_direction: str = "less", subjectiveFour_Series: Optional[List[str]] = None, 
+    subjectiveFour_Series_array: Optional[List[Union[str, int, float]]] = None, subjectiveFour_OGSame: Optional[str] = None,
+    subjectiveFour_Series_match: str = "all",
+    
+    # Functional Response parameters
+    type_1F: str, functionalOne_standalone: Optional[str] = None, functionalOne_standalone_cutoff: Optional[float] = None, 
+    functionalOne_cutoff_direction: str = "less", functionalOne_Series: Optional[List[str]] = None, 
+    functionalOne_Series_array: Optional[List[Union[str, int, float]]] = None, functionalOne_OGSame: Optional[str] = None,
+    functionalOne_Series_match: str = "all",
+    type_2F: str, functionalTwo_standalone: Optional[str] = None, functionalTwo_standalone_cutoff: Optional[float] = None, 
+    functionalTwo_cutoff_direction: str = "less", functionalTwo_Series: Optional[List[str]] = None, 
+    functionalTwo_Series_array: Optional[List[Union[str, int, float]]] = None, functionalTwo_OGSame: Optional[str] = None,
+    functionalTwo_Series_match: str = "all",
+    type_3F: str, functionalThree_standalone: Optional[str] = None, functionalThree_standalone_cutoff: Optional[float] = None, 
+    functionalThree_cutoff_direction: str = "less", functionalThree_Series: Optional[List[str]] = None, 
+    functionalThree_Series_array: Optional[List[Union[str, int, float]]] = None, functionalThree_OGSame: Optional[str] = None,
+    functionalThree_Series_match: str = "all",
+    type_4F: str, functionalFour_standalone: Optional[str] = None, functionalFour_standalone_cutoff: Optional[float] = None, 
+    functionalFour_cutoff_direction: str = "less", functionalFour_Series: Optional[List[str]] = None, 
+    functionalFour_Series_array: Optional[List[Union[str, int, float]]] = None, functionalFour_OGSame: Optional[str] = None,
+    functionalFour_Series_match: str = "all",
+    # Normative-score conversion (a NormConfig or its dict form)
+    norms: Optional[dict] = None,
+    profiler: Optional[StageProfiler] = None,
+    compact: bool = False,
+    text: bool = True,
+    engine: Optional[str] = None
+) -> pd.DataFrame:
+    criteria = dict(locals())
+    del criteria['df'], criteria['profiler'], criteria['compact'], criteria['text'], criteria['engine']
+    return apply_plan(df, CriteriaConfig.from_kwargs(**criteria).compile(), profiler, compact, text, engine)
+
+
+def apply_plan(df: pd.DataFrame, plan: CriteriaPlan, profiler: Optional[StageProfiler] = None,
+               compact: bool = False, text: bool = True, engine: Optional[str] = None) -> pd.DataFrame:
+    # compact=True returns narrow dtypes: nullable Int8 flags and totals,
+    # categorical labels, float32 Reliability, and a missingMask bitmask
+    # (see decode_missing) in place of the missingValues text.
+    # text=False skips the per-row text altogether: missingMask and a
+    # domainMask (bit i = DOMAIN_NAMES[i] impaired) stand in for
+    # missingValues and multipleSingleDomain until render_text is called.
+    # engine="numba" evaluates the rules in one compiled pass (see .kernel),
+    # "numpy" column by column; None uses Numba for large frames when it is
+    # installed. Both give identical results.
+    if is_dask(df):
+        from .partitioned import PD_MCIx_dask
+        return PD_MCIx_dask(df, plan, compact, text=text)
+    stage = stage_timer(profiler, len(df))
+    df = add_vectors(df, plan, stage)
+
+    from .kernel import classify_fused, use_kernel
+    if use_kernel(engine, len(df)):
+        result = classify_fused(df, plan, stage, compact, text)
+        if result is not None:
+            return result
+
+    with stage("neuropsych"):
+        # Neuropsychological impairments
+        # (primary test, tertiary fallback) per domain, evaluated column-wise
+        for i, name in enumerate(PRIMARY_TESTS):
+            fallback = df[f"{tertiary_for(name)}_vec"] if plan.fallback_cols[i] is not None else None
+            df[f"{name}_impaired"] = calculate_impaired(
+                df[f"{name}_vec"], plan.cutoffs[i], fallback, plan.fallback_cutoffs[i])
+
+    return classify_flags(df, plan, stage, compact, text)
+
+
+def add_vectors(df: pd.DataFrame, plan: CriteriaPlan, stage) -> pd.DataFrame:
+    # A new frame with the {test}_vec columns PD_MCIx classifies: the input
+    # scores, or their normed values when the plan converts raw scores
+    with stage("inputs"):
+        # Input columns are resolved to positions once per schema by the plan
+        positions = plan.bind(df.columns)
+
+        # Add neuropsych vectors as columns
+        df = df.assign(**{
+            f"{name}_vec": df.iloc[:, positions[col]] for name, col in zip(PRIMARY_TESTS, plan.primary_cols)
+        })
+
+        # Tertiary fallback
+        for name, col in plan.tertiary:
+            df[f"{name}_vec"] = df.iloc[:, positions[col]]
+
+    if plan.norms is not None:
+        with stage("norms"):
+            # Raw scores to normed scores; the *_vec columns carry the normed
+            # values and the raw input columns are left as they were
+            tests = list(zip(PRIMARY_TESTS, plan.primary_cols)) + list(plan.tertiary)
+            raw = {col: score_values(df.iloc[:, positions[col]])[0] for _, col in tests if col in plan.norms.columns}
+            demographics = df.iloc[:, [positions[col] for col in plan.norms.demographic_columns]]
+            normed = plan.norms.convert(raw, demographics)
+            for name, col in tests:
+                if col in normed:
+                    df[f"{name}_vec"] = normed[col]
+
+    return df
+
+
+def classify_flags(df: pd.DataFrame, plan: CriteriaPlan, stage, compact: bool = False,
+                   text: bool = True) -> pd.DataFrame:
+    # The stages after the neuropsych flags. `df` needs the {test}_impaired
+    # columns and the subjective/functional input columns; `stage` is a
+    # stage_timer.
+    df = apply_responses(df, plan, stage)
+
+    with stage("np_rule"):
+        # Final calculations
+        df['Attention_impaired'] = df['attentionOne_impaired'] + df['attentionTwo_impaired']
+        df['Memory_impaired'] = df['memoryOne_impaired'] + df['memoryTwo_impaired']
+        df['Executive_impaired'] = df['execuFuncOne_impaired'] + df['execuFuncTwo_impaired']
+        df['Visuospatial_impaired'] = df['visuoSpatOne_impaired'] + df['visuoSpatTwo_impaired']
+        df['Language_impaired'] = df['languageOne_impaired'] + df['languageTwo_impaired']
+
+        domain_cols = ['Attention_impaired', 'Memory_impaired', 'Executive_impaired',
+                       'Visuospatial_impaired', 'Language_impaired']
+        domain_scores = df[domain_cols].to_numpy(dtype=float)
+
+        df['NP_impaired'] = calculate_NP_impaired(domain_scores)
+
+    with stage("totals"):
+        # Calculate Subjective and Functional totals
+        subjective_cols = [col for col in df.columns if col.startswith('Subjective') and col.endswith('impairment')]
+        df['Subjective_total'] = df[subjective_cols].sum(axis=1)
+        df['Subjective_impaired'] = np.where(df['Subjective_total'] >= 1, 1, 0)
+
+        functional_cols = [col for col in df.columns if col.startswith('Functional') and col.endswith('impairment')]
+        df['Functional_total'] = df[functional_cols].sum(axis=1)
+        df['Functional_impaired'] = np.where(df['Functional_total'] >= 1, 1, 0)
+    
+    with stage("missing_values"):
+        # Missing values code
+        # One boolean matrix drives both missingValues and Reliability
+        cols_to_check = [f"{name}_impaired" for name in PRIMARY_TESTS] + subjective_cols + functional_cols
+        missing = df[cols_to_check].isna().to_numpy()
+
+        if compact or not text:
+            df['missingMask'] = bitmask(missing)
+            df.attrs['missing_columns'] = cols_to_check
+        else:
+            df['missingValues'] = get_missing_values(missing, cols_to_check)
+    
+    with stage("autodx"):
+        # AutoDx calculation
+        conditions = [
+            (df['NP_impaired'] == 0) & (df['Subjective_impaired'] == 0) & (df['Functional_impaired'] == 0),
+            (df['NP_impaired'] == 1) & (df['Subjective_impaired'] == 0) & (df['Functional_impaired'] == 0),
+            (df['NP_impaired'] == 0) & (df['Subjective_impaired'] == 1) & (df['Functional_impaired'] == 0),
+            (df['NP_impaired'] == 0) & (df['Subjective_impaired'] == 0) & (df['Functional_impaired'] == 1),
+            (df['NP_impaired'] == 1) & (df['Subjective_impaired'] == 0) & (df['Functional_impaired'] == 1),
+            (df['NP_impaired'] == 1) & (df['Subjective_impaired'] == 1) & (df['Functional_impaired'] == 0),
+            (df['NP_impaired'] == 0) & (df['Subjective_impaired'] == 1) & (df['Functional_impaired'] == 1),
+            (df['NP_impaired'] == 1) & (df['Subjective_impaired'] == 1) & (df['Functional_impaired'] == 1)
+        ]
+        choices = [0, 1, 0, 0, 0, 1, 0, 1]
+        df['AutoDx'] = np.select(conditions, choices, default=np.nan)
+
+        # Amnestic status
+        amnestic = np.select([
+            (df['AutoDx'] == 1) & ((df['memoryOne_impaired'] == 1) | (df['memoryTwo_impaired'] == 1)),
+            df['AutoDx'] == 1,
+            df['AutoDx'] == 0,
+        ], [2, 1, 0], default=-1)
+        df['amnesticStatus'] = labels(amnestic, AMNESTIC_LABELS, compact)
+
+        # Multiple/Single domain classification
+        domain_total = df[domain_cols].sum(axis=1)
+        multiple_single = np.select([domain_total > 1, domain_total < 1], [2, 0], default=1)
+        df['multipleSingle'] = labels(multiple_single, MULTIPLE_SINGLE_LABELS, compact)
+    
+    with stage("reliability"):
+        # Reliability measure
+        df['Reliability'] = calculate_reliability(missing)
+    
+    with stage("domain_details"):
+        # Multiple/Single domain details
+        if not text:
+            df['domainMask'] = domain_codes(domain_scores)
+        elif compact:
+            df['multipleSingleDomain'] = pd.Categorical.from_codes(domain_codes(domain_scores), DOMAIN_LABELS)
+        else:
+            df['multipleSingleDomain'] = get_domain_details(domain_scores)
+
+    return finish_flags(df, stage, compact, text)
+
+
+def apply_responses(df: pd.DataFrame, plan: CriteriaPlan, stage) -> pd.DataFrame:
+    # Subjective then Functional impairments
+    for kind in ("subjective", "functional"):
+        with stage(kind):
+            for response in plan.responses:
+                if response.base_name.lower().startswith(kind):
+                    column = response.columns[0] if response.columns else None
+                    df = handle_type(df, response.type, response.base_name, column, response.cutoff,
+                                     "less" if response.less else "greater",
+                                     list(response.columns), list(response.values), column, response.match)
+    return df
+
+
+def finish_flags(df: pd.DataFrame, stage, compact: bool = False, text: bool = True) -> pd.DataFrame:
+    # Column order and compact dtypes, once every output column is present
+    with stage("reorder"):
+        # Reorder columns
+        missing_col = 'missingValues' if text and not compact else 'missingMask'
+        domain_col = 'multipleSingleDomain' if text else 'domainMask'
+        trailing = ['NP_impaired', 'Subjective_impaired', 'Functional_impaired', missing_col,
+                    'AutoDx', 'amnesticStatus', 'multipleSingle', domain_col]
+        # Moved in place (df is this function's own frame): selecting the
+        # new column order would copy every column
+        for col in trailing:
+            df[col] = df.pop(col)
+
+    if compact:
+        with stage("compact"):
+            impairment_cols = [col for col in df.columns
+                               if col.startswith(('Subjective', 'Functional')) and col.endswith('impairment')]
+            flag_cols = ([f"{name}_impaired" for name in PRIMARY_TESTS + DOMAIN_NAMES] + impairment_cols
+                         + ['Subjective_total', 'Functional_total', 'NP_impaired',
+                            'Subjective_impaired', 'Functional_impaired', 'AutoDx'])
+            for col in flag_cols:
+                df[col] = as_int8(df[col])
+            df['Reliability'] = df['Reliability'].astype(np.float32)
+
+    return df
+
+
+# Comorbidity Function
+# Comorbidities are factorized against one vocabulary for all comorb_*
+# columns. Each row becomes a list of distinct vocabulary codes, in column
+# order, and the text is built once per distinct list rather than per row.
+
+def comorbidity_codes(df: pd.DataFrame, base_name: str = "comorb") -> Tuple[np.ndarray, pd.Index]:
+    # Rows x comorb columns of vocabulary codes (-1 where missing or a repeat
+    # of an earlier column in the same row) and the sorted vocabulary
+    values = df[[col for col in df.columns if col.startswith(base_name)]].to_numpy(dtype=object)
+    codes, vocabulary = pd.factorize(values.ravel(), sort=True)
+    codes = codes.reshape(values.shape).astype(np.min_scalar_type(-max(len(vocabulary), 1)))
+    if codes.shape[1] > 1:
+        # Repeats sit next to each other once each row is sorted
+        order = np.argsort(codes, axis=1, kind="stable")
+        ranked = np.take_along_axis(codes, order, axis=1)
+        repeat = np.zeros(codes.shape, dtype=bool)
+        np.put_along_axis(repeat, order[:, 1:], (ranked[:, 1:] == ranked[:, :-1]) & (ranked[:, 1:] >= 0), axis=1)
+        codes[repeat] = -1
+    return codes, pd.Index(vocabulary)
+
+
+def comorbidity_matrix(df: pd.DataFrame, base_name: str = "comorb", sparse: bool = True) -> pd.DataFrame:
+    # Patient x comorbidity 0/1 matrix (one column per distinct value in the
+    # comorb_* columns, sorted), sparse unless sparse=False; matrix.sum()
+    # gives prevalence and matrix.sum(axis=1) each patient's count
+    codes, vocabulary = comorbidity_codes(df, base_name)
+    rows, cols = np.nonzero(codes >= 0)
+    indicators = np.zeros((len(df), len(vocabulary)), dtype=np.uint8)
+    indicators[rows, codes[rows, cols]] = 1
+    matrix = pd.DataFrame(indicators, index=df.index, columns=vocabulary)
+    # Sparse sums keep the value dtype, so sparse values are int32, not uint8
+    return matrix.astype(pd.SparseDtype(np.int32, 0)) if sparse else matrix
+
+
+def comorbidity_patterns(codes: np.ndarray, vocabulary: pd.Index) -> Tuple[np.ndarray, List[str]]:
+    # Pattern code per row and the "; "-joined text of each pattern ("None"
+    # for rows without comorbidities)
+    present = codes >= 0
+    counts = present.sum(axis=1)
+    width = int(counts.max(initial=0))
+    if width == 0:
+        return np.zeros(len(codes), dtype=np.intp), ["None"]
+    # Move each row's codes to the front, keeping their column order
+    rows, cols = np.nonzero(present)
+    packed = np.full((len(codes), width), -1, dtype=codes.dtype)
+    packed[rows, np.cumsum(present, axis=1)[rows, cols] - 1] = codes[rows, cols]
+    patterns, keys = pd.factorize(packed.view(f"S{packed.itemsize * width}").ravel())
+    first = np.unique(patterns, return_index=True)[1]
+    names = vocabulary.to_numpy(dtype=object)
+    texts = ["; ".join(names[packed[i, :counts[i]]]) if counts[i] else "None" for i in first]
+    return patterns, texts
+
+
+def pattern_labels(patterns: np.ndarray, texts: List[str], compact: bool = False):
+    # Per-row labels from pattern codes; distinct patterns may share a text
+    text_codes, categories = pd.factorize(np.array(texts, dtype=object))
+    return labels(text_codes[patterns], list(categories), compact)
+
+
+def comorbidityIdentifier(df: pd.DataFrame, type_: str = "broad", base_name: str = "comorb",
+                          profiler: Optional[StageProfiler] = None, compact: bool = False) -> pd.DataFrame:
+    # compact=True stores comorbidities and suggestions as Categoricals, so
+    # each distinct text exists once however many patients share it
+    if type_ not in ("broad", "strict"):
+        raise ValueError("Invalid type. Use 'broad' or 'strict'.")
+    if is_dask(df):
+        from .partitioned import comorbidityIdentifier_dask
+        return comorbidityIdentifier_dask(df, type_, base_name, compact)
+    stage = stage_timer(profiler, len(df))
+
+    with stage("comorbidities"):
+        patterns, texts = comorbidity_patterns(*comorbidity_codes(df, base_name))
+        df['comorbidities'] = pattern_labels(patterns, texts, compact)
+
+    with stage("suggestions"):
+        if type_ == "strict":
+            suggestions = ["No notable comorbidities." if text == "None" else "Refer to specialist." for text in texts]
+        else:
+            suggestions = ["No action needed." if text == "None" else "Consider follow-up for: " + text
+                           for text in texts]
+        df['suggestions'] = pattern_labels(patterns, suggestions, compact)
+
+    return df
+
@@ -0,0 +1,408 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from numbers import Real
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .norms import SCORES, NormPlan, load_norms
+
+# Reusable, validated PD-MCIx criteria.
+#
+# CriteriaConfig mirrors the PD_MCIx keyword arguments in structured form and
+# is validated once on construction. compile() turns it into a CriteriaPlan
+# holding the resolved column names, cutoff arrays and direction flags, which
+# can be applied to any number of DataFrames or chunks.
+
+PRIMARY_TESTS = [
+    'attentionOne', 'attentionTwo', 'memoryOne', 'memoryTwo', 'execuFuncOne',
+    'execuFuncTwo', 'visuoSpatOne', 'visuoSpatTwo', 'languageOne', 'languageTwo'
+]
+TERTIARY_TESTS = ['attentionThree', 'memoryThree', 'execuFuncThree', 'visuoSpatThree', 'languageThree']
+ORDINALS = ['One', 'Two', 'Three', 'Four']
+RESPONSE_TYPES = ("standalone", "series", "OGSame", "none")
+MAX_RESPONSES = 4
+
+
+def tertiary_for(test: str) -> str:
+    # 'memoryTwo' -> 'memoryThree'
+    for ordinal in ('One', 'Two'):
+        if test.endswith(ordinal):
+            return test[:-len(ordinal)] + 'Three'
+    raise ValueError(f"Not a primary neuropsychological test: {test}")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, Real) and not isinstance(value, bool)
+
+
+@dataclass(frozen=True)
+class NeuropsychTest:
+    column: str
+    cutoff: float
+
+
+@dataclass(frozen=True)
+class ResponseCriterion:
+    type: str = "none"
+    # standalone and OGSame read a single column
+    column: Optional[str] = None
+    cutoff: Optional[float] = None
+    direction: str = "less"
+    # series reads several columns and a set of impairment values; match is
+    # "all" when every value must be present in the row, "any" when one is enough
+    columns: Tuple[str, ...] = ()
+    values: Tuple[Any, ...] = ()
+    match: str = "all"
+
+    def validate(self, label: str):
+        if self.type not in RESPONSE_TYPES:
+            raise ValueError(f"{label}: unknown type {self.type!r}; use one of {', '.join(RESPONSE_TYPES)}")
+        if self.type in ("standalone", "OGSame") and not isinstance(self.column, str):
+            raise ValueError(f"{label}: {self.type} criteria need a column name")
+        if self.type == "standalone":
+            if not _is_number(self.cutoff):
+                raise ValueError(f"{label}: standalone cutoff must be a number, got {self.cutoff!r}")
+            if self.direction not in ("less", "greater"):
+                raise ValueError(f"{label}: cutoff direction must be 'less' or 'greater'")
+        if self.type == "series":
+            if not self.columns or not all(isinstance(col, str) for col in self.columns):
+                raise ValueError(f"{label}: series criteria need a list of column names")
+            if not self.values:
+                raise ValueError(f"{label}: series criteria need at least one impairment value")
+            if self.match not in ("all", "any"):
+                raise ValueError(f"{label}: series match must be 'all' or 'any'")
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.type == "standalone":
+            return {'type': self.type, 'column': self.column, 'cutoff': self.cutoff, 'direction': self.direction}
+        if self.type == "series":
+            return {'type': self.type, 'columns': list(self.columns), 'values': list(self.values),
+                    'match': self.match}
+        if self.type == "OGSame":
+            return {'type': self.type, 'column': self.column}
+        return {'type': "none"}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ResponseCriterion":
+        if data is None:
+            return cls()
+        data = dict(data)
+        if data.get('type') in (None, ""):
+            data['type'] = "none"
+        columns = data.pop('columns', ())
+        values = data.pop('values', ())
+        return cls(columns=tuple([columns] if isinstance(columns, str) else columns or ()),
+                   values=tuple(values or ()), **data)
+
+
+@dataclass(frozen=True)
+class NormConfig:
+    # Norm table file (see norms.py) and the demographic columns of the data
+    table: str
+    age: str
+    # Data column -> test name in the norm table
+    columns: Dict[str, str]
+    education: Optional[str] = None
+    sex: Optional[str] = None
+    # Scale the normed scores (and so the test cutoffs) are on
+    score: str = "z"
+
+    def validate(self):
+        if not isinstance(self.table, (str, os.PathLike)):
+            raise ValueError(f"norms: table must be a file path, got {self.table!r}")
+        if not isinstance(self.age, str):
+            raise ValueError(f"norms: age must be a column name, got {self.age!r}")
+        if not self.columns:
+            raise ValueError("norms: no columns to normalize")
+        if self.score not in SCORES:
+            raise ValueError(f"norms: unknown score {self.score!r}; use one of {', '.join(SCORES)}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'table': os.fspath(self.table), 'age': self.age, 'columns': dict(self.columns)}
+        data.update({key: value for key, value in (('education', self.education), ('sex', self.sex))
+                     if value is not None})
+        data['score'] = self.score
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Union["NormConfig", Dict[str, Any], None]) -> Optional["NormConfig"]:
+        if data is None or isinstance(data, NormConfig):
+            return data
+        data = dict(data)
+        columns = data.pop('columns', {})
+        # A list names columns whose test in the norm table has the same name
+        if not isinstance(columns, dict):
+            columns = {col: col for col in columns}
+        return cls(columns=columns, **data)
+
+    def compile(self) -> NormPlan:
+        table = load_norms(os.fspath(self.table))
+        unknown = sorted(set(self.columns.values()) - set(table.tests))
+        if unknown:
+            raise ValueError(f"norms: tests not in {self.table}: {', '.join(unknown)}")
+        for name, stratified in (("education", table.by_education), ("sex", table.by_sex)):
+            if stratified and getattr(self, name) is None:
+                raise ValueError(f"norms: {self.table} is stratified by {name}; set the {name} column")
+        return NormPlan(table, dict(self.columns), self.age, self.education, self.sex, self.score)
+
+
+@dataclass(frozen=True)
+class CriteriaConfig:
+    # Keys are PD_MCIx test names ('attentionOne', ..., 'languageThree')
+    tests: Dict[str, NeuropsychTest]
+    subjective: Tuple[ResponseCriterion, ...] = ()
+    functional: Tuple[ResponseCriterion, ...] = ()
+    # Normative-score conversion of raw test scores; cutoffs are then on the normed scale
+    norms: Optional[NormConfig] = None
+
+    def __post_init__(self):
+        object.__setattr__(self, 'subjective', tuple(self.subjective))
+        object.__setattr__(self, 'functional', tuple(self.functional))
+        self.validate()
+
+    def validate(self):
+        missing = [test for test in PRIMARY_TESTS if test not in self.tests]
+        if missing:
+            raise ValueError(f"Missing neuropsychological tests: {', '.join(missing)}")
+        unknown = [test for test in self.tests if test not in PRIMARY_TESTS + TERTIARY_TESTS]
+        if unknown:
+            raise ValueError(f"Unknown neuropsychological tests: {', '.join(unknown)}")
+        for name, test in self.tests.items():
+            if not isinstance(test.column, str):
+                raise ValueError(f"{name}: column must be a column name, got {test.column!r}")
+            if not _is_number(test.cutoff):
+                raise ValueError(f"{name}: cutoff must be a number, got {test.cutoff!r}")
+
+        for label, responses in (("subjective", self.subjective), ("functional", self.functional)):
+            if len(responses) > MAX_RESPONSES:
+                raise ValueError(f"At most {MAX_RESPONSES} {label} criteria are supported")
+            for ordinal, response in zip(ORDINALS, responses):
+                response.validate(f"{label}{ordinal}")
+        if self.norms is not None:
+            self.norms.validate()
+
+    # --- Construction ---
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CriteriaConfig":
+        tests = {}
+        for name, test in data.get('tests', {}).items():
+            if isinstance(test, dict):
+                tests[name] = NeuropsychTest(test.get('column'), test.get('cutoff'))
+            else:
+                tests[name] = NeuropsychTest(*test)
+        return cls(tests=tests,
+                   subjective=[ResponseCriterion.from_dict(r) for r in data.get('subjective', [])],
+                   functional=[ResponseCriterion.from_dict(r) for r in data.get('functional', [])],
+                   norms=NormConfig.from_dict(data.get('norms')))
+
+    @classmethod
+    def from_kwargs(cls, **kwargs) -> "CriteriaConfig":
+        # Accepts exactly the keyword arguments of PD_MCIx
+        kwargs = dict(kwargs)
+        norms = NormConfig.from_dict(kwargs.pop('norms', None))
+        tests = {}
+        for name in PRIMARY_TESTS + TERTIARY_TESTS:
+            column = kwargs.pop(name, None)
+            cutoff = kwargs.pop(f"{name}_cutoff", None)
+            if column is not None or name in PRIMARY_TESTS:
+                tests[name] = NeuropsychTest(column, cutoff)
+
+        def responses(prefix: str, type_key) -> List[ResponseCriterion]:
+            found = []
+            for i, ordinal in enumerate(ORDINALS, start=1):
+                type_ = kwargs.pop(type_key(i), None)
+                standalone = kwargs.pop(f"{prefix}{ordinal}_standalone", None)
+                cutoff = kwargs.pop(f"{prefix}{ordinal}_standalone_cutoff", None)
+                direction = kwargs.pop(f"{prefix}{ordinal}_cutoff_direction", "less")
+                series = kwargs.pop(f"{prefix}{ordinal}_Series", None)
+                series_array = kwargs.pop(f"{prefix}{ordinal}_Series_array", None)
+                ogsame = kwargs.pop(f"{prefix}{ordinal}_OGSame", None)
+                match = kwargs.pop(f"{prefix}{ordinal}_Series_match", "all")
+                found.append(ResponseCriterion.from_dict({
+                    'type': type_,
+                    'column': standalone if type_ == "standalone" else ogsame if type_ == "OGSame" else None,
+                    'cutoff': cutoff if type_ == "standalone" else None,
+                    'direction': direction,
+                    'columns': series if type_ == "series" else (),
+                    'values': series_array if type_ == "series" else (),
+                    'match': match,
+                }))
+            return found
+
+        subjective = responses("subjective", lambda i: f"type_{i}")
+        functional = responses("functional", lambda i: f"type_{i}F")
+        if kwargs:
+            raise TypeError(f"Unexpected criteria arguments: {', '.join(kwargs)}")
+        return cls(tests=tests, subjective=subjective, functional=functional, norms=norms)
+
+    @classmethod
+    def load(cls, path: str) -> "CriteriaConfig":
+        with open(path) as f:
+            if path.endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError("Loading YAML criteria requires PyYAML (pip install pyyaml)")
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+        norms = data.get('norms')
+        if norms and not os.path.isabs(norms.get('table', "")):
+            # Norm tables are found relative to the criteria file
+            norms = dict(norms, table=os.path.join(os.path.dirname(os.path.abspath(path)), norms['table']))
+            data = dict(data, norms=norms)
+        return cls.from_dict(data)
+
+    # --- Serialisation ---
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'tests': {name: {'column': test.column, 'cutoff': test.cutoff} for name, test in self.tests.items()},
+            'subjective': [response.to_dict() for response in self.subjective],
+            'functional': [response.to_dict() for response in self.functional],
+        }
+        if self.norms is not None:
+            data['norms'] = self.norms.to_dict()
+        return data
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_kwargs(self) -> Dict[str, Any]:
+        kwargs = {}
+        for name, test in self.tests.items():
+            kwargs[name] = test.column
+            kwargs[f"{name}_cutoff"] = test.cutoff
+        for prefix, responses, type_key in (("subjective", self.subjective, "type_{}"),
+                                            ("functional", self.functional, "type_{}F")):
+            for i, ordinal in enumerate(ORDINALS, start=1):
+                response = responses[i - 1] if i <= len(responses) else ResponseCriterion()
+                kwargs[type_key.format(i)] = response.type
+                if response.type == "standalone":
+                    kwargs[f"{prefix}{ordinal}_standalone"] = response.column
+                    kwargs[f"{prefix}{ordinal}_standalone_cutoff"] = response.cutoff
+                    kwargs[f"{prefix}{ordinal}_cutoff_direction"] = response.direction
+                elif response.type == "series":
+                    kwargs[f"{prefix}{ordinal}_Series"] = list(response.columns)
+                    kwargs[f"{prefix}{ordinal}_Series_array"] = list(response.values)
+                    kwargs[f"{prefix}{ordinal}_Series_match"] = response.match
+                elif response.type == "OGSame":
+                    kwargs[f"{prefix}{ordinal}_OGSame"] = response.column
+        if self.norms is not None:
+            kwargs['norms'] = self.norms.to_dict()
+        return kwargs
+
+    def compile(self) -> "CriteriaPlan":
+        fallbacks = [tertiary_for(test) for test in PRIMARY_TESTS]
+        tertiary = tuple((name, self.tests[name].column) for name in TERTIARY_TESTS if name in self.tests)
+
+        responses = []
+        for base, criteria in (("Subjective", self.subjective), ("Functional", self.functional)):
+            for i, ordinal in enumerate(ORDINALS):
+                response = criteria[i] if i < len(criteria) else ResponseCriterion()
+                responses.append(CompiledResponse(
+                    base_name=f"{base}{ordinal}", type=response.type,
+                    columns=(response.column,) if response.column is not None else response.columns,
+                    cutoff=response.cutoff, less=response.direction == "less", values=response.values,
+                    match=response.match))
+
+        return CriteriaPlan(
+            primary_cols=tuple(self.tests[test].column for test in PRIMARY_TESTS),
+            cutoffs=np.array([self.tests[test].cutoff for test in PRIMARY_TESTS], dtype=float),
+            fallback_cols=tuple(self.tests[f].column if f in self.tests else None for f in fallbacks),
+            fallback_cutoffs=np.array([self.tests[f].cutoff if f in self.tests else np.nan for f in fallbacks],
+                                      dtype=float),
+            tertiary=tertiary,
+            responses=tuple(responses),
+            norms=self.norms.compile() if self.norms is not None else None,
+        )
+
+
+@dataclass(frozen=True)
+class CompiledResponse:
+    base_name: str
+    type: str
+    columns: Tuple[str, ...]
+    cutoff: Optional[float]
+    less: bool
+    values: Tuple[Any, ...]
+    match: str
+
+
+@dataclass(frozen=True, eq=False)
+class CriteriaPlan:
+    # Aligned with PRIMARY_TESTS
+    primary_cols: Tuple[str, ...]
+    cutoffs: np.ndarray
+    fallback_cols: Tuple[Optional[str], ...]
+    fallback_cutoffs: np.ndarray
+    # (tertiary test name, column) for the configured tertiary tests
+    tertiary: Tuple[Tuple[str, str], ...]
+    # Subjective One..Four then Functional One..Four
+    responses: Tuple[CompiledResponse, ...]
+    norms: Optional[NormPlan] = None
+    _positions: Dict[Tuple[str, ...], np.ndarray] = field(default_factory=dict, repr=False)
+
+    @property
+    def input_columns(self) -> List[str]:
+        # Every input column the criteria read, in first-use order
+        cols = list(self.primary_cols) + [col for _, col in self.tertiary]
+        for response in self.responses:
+            cols.extend(response.columns)
+        if self.norms is not None:
+            cols.extend(self.norms.demographic_columns)
+        return list(dict.fromkeys(cols))
+
+    @property
+    def fingerprint(self) -> str:
+        # Stable digest of everything that affects the classification
+        state = (self.primary_cols, self.cutoffs.tolist(), self.fallback_cols, self.fallback_cutoffs.tolist(),
+                 self.tertiary, self.responses)
+        if self.norms is not None:
+            state += (self.norms.key,)
+        return hashlib.sha256(repr(state).encode()).hexdigest()
+
+    def bind(self, columns: pd.Index) -> Dict[str, int]:
+        # Positional index of every input column, resolved once per schema
+        key = tuple(columns)
+        positions = self._positions.get(key)
+        if positions is None:
+            index = pd.Index(columns)
+            wanted = self.input_columns
+            missing = [col for col in wanted if col not in index]
+            if missing:
+                raise KeyError(f"Missing columns in data: {', '.join(map(str, missing))}")
+            positions = dict(zip(wanted, index.get_indexer(wanted)))
+            self._positions[key] = positions
+        return positions
+
+    def apply(self, df: pd.DataFrame, profiler=None, compact: bool = False, text: bool = True,
+              engine: Optional[str] = None) -> pd.DataFrame:
+        from .core import apply_plan
+        return apply_plan(df, self, profiler, compact, text, engine)
+
+
+def resolve_config(config: Union[CriteriaConfig, Dict[str, Any], str, None] = None,
+                   **criteria) -> CriteriaConfig:
+    # Accept a config, a config dict / file path, or PD_MCIx keyword arguments
+    if isinstance(config, CriteriaConfig):
+        return config
+    if isinstance(config, dict):
+        return CriteriaConfig.from_dict(config)
+    if isinstance(config, (str, os.PathLike)):
+        return CriteriaConfig.load(os.fspath(config))
+    return CriteriaConfig.from_kwargs(**criteria)
+
+
+def resolve_plan(config: Union["CriteriaPlan", CriteriaConfig, Dict[str, Any], str, None] = None,
+                 **criteria) -> CriteriaPlan:
+    # As resolve_config, but a compiled plan is also accepted
+    if isinstance(config, CriteriaPlan):
+        return config
+    return resolve_config(config, **criteria).compile()
@@ -0,0 +1,233 @@
+import hashlib
+import os
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Table readers and writers for the classification path. CSV is handled by
+# pandas alone; Parquet and Feather (Arrow IPC) need pyarrow, imported on
+# first use. Columnar formats read only the requested columns from disk.
+# The readers also accept an in-memory DataFrame (e.g. a cached upload), and
+# iter_table / TableWriter accept open binary streams such as stdin/stdout
+# when the format is given explicitly.
+
+FORMATS = {'.csv': "csv", '.parquet': "parquet", '.pq': "parquet",
+           '.feather': "feather", '.arrow': "feather", '.ipc': "feather"}
+
+
+def table_format(path: str) -> str:
+    suffix = os.path.splitext(str(path))[1].lower()
+    try:
+        return FORMATS[suffix]
+    except KeyError:
+        raise ValueError(f"Unsupported file type {suffix!r}; use one of {', '.join(FORMATS)}")
+
+
+def file_hash(path: str) -> str:
+    # Content digest, e.g. to key caches on what a file holds rather than its name
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_value_type = np.frompyfunc(type, 1, 1)
+
+
+def value_types(values: pd.Series) -> Optional[np.ndarray]:
+    # The type name of each value of an object (or categorical) column, or
+    # None when there is nothing to tell apart (not object, or only strings).
+    # hash_pandas_object hashes object values as strings, so 3 and '3' only
+    # hash differently together with their types.
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        names = value_types(values.cat.categories.to_series())
+        # Code -1 (missing) picks the trailing None
+        return None if names is None else np.append(names, None)[values.cat.codes.to_numpy()]
+    if values.dtype != object:
+        return None
+    array = values.to_numpy()
+    if pd.api.types.infer_dtype(array) in ("string", "empty"):
+        return None
+    codes, types = pd.factorize(_value_type(array))
+    return np.array([f"{t.__module__}.{t.__qualname__}" for t in types], dtype=object)[codes]
+
+
+def _is_stream(path) -> bool:
+    return hasattr(path, "read") or hasattr(path, "write")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Feather files require pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def read_schema(path: Union[str, pd.DataFrame]) -> List[str]:
+    # Column names only; no data is read
+    if isinstance(path, pd.DataFrame):
+        return list(path.columns)
+    fmt = table_format(path)
+    if fmt == "csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    pa = _pyarrow()
+    if fmt == "parquet":
+        return list(pa.parquet.read_schema(path).names)
+    with pa.memory_map(str(path)) as source:
+        return list(pa.ipc.open_file(source).schema.names)
+
+
+def count_rows(path: str) -> int:
+    # Data rows in the file; for CSV this counts line breaks, so quoted
+    # multi-line fields make it an estimate
+    fmt = table_format(path)
+    if fmt == "csv":
+        lines, last = 0, b"\n"
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                lines += block.count(b"\n")
+                last = block[-1:]
+        if last != b"\n":
+            lines += 1
+        return max(lines - 1, 0)
+    pa = _pyarrow()
+    if fmt == "parquet":
+        return pa.parquet.ParquetFile(path).metadata.num_rows
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all().num_rows
+
+
+def iter_table(path, chunksize: int, columns: Optional[List[str]] = None,
+               fmt: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    # DataFrames of at most `chunksize` rows holding `columns` (default: all).
+    # For a binary stream `fmt` is required and `columns` only filters: names
+    # that are not in the data are ignored, since the schema is not known
+    # before reading.
+    if isinstance(path, pd.DataFrame):
+        frame = path if columns is None else path[columns]
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start:start + chunksize]
+        return
+    stream = _is_stream(path)
+    fmt = fmt or table_format(path)
+    if fmt == "csv":
+        usecols = columns
+        if stream and columns is not None:
+            wanted = set(columns)
+            usecols = lambda col: col in wanted  # noqa: E731
+        with pd.read_csv(path, chunksize=chunksize, usecols=usecols) as reader:
+            yield from reader
+        return
+    pa = _pyarrow()
+    if stream:
+        # Columnar formats need the whole input (Parquet keeps its schema at the end)
+        source = pa.BufferReader(path.read())
+        if columns is not None:
+            names = (pa.parquet.read_schema(source) if fmt == "parquet" else _open_ipc(pa, source).schema).names
+            columns = [col for col in names if col in set(columns)]
+            source.seek(0)
+    else:
+        source = str(path)
+    if fmt == "parquet":
+        for batch in pa.parquet.ParquetFile(source).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    # Feather is memory-mapped; only the slice being converted is materialised
+    with (source if stream else pa.memory_map(source)) as source:
+        table = _open_ipc(pa, source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        for start in range(0, table.num_rows, chunksize):
+            yield table.slice(start, chunksize).to_pandas()
+
+
+def _open_ipc(pa, source):
+    # Arrow IPC file (Feather v2) or, from a stream, the IPC streaming format
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+
+def read_table(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    fmt = table_format(path)
+    if fmt == "csv":
+        return pd.read_csv(path, usecols=columns)
+    _pyarrow()
+    if fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
+
+
+def head_table(path: str, rows: int = 5) -> pd.DataFrame:
+    return next(iter_table(path, rows), pd.DataFrame(columns=read_schema(path)))
+
+
+def write_table(df: pd.DataFrame, path: str):
+    with TableWriter(path) as writer:
+        writer.write(df)
+
+
+class TableWriter:
+    """
+    Append DataFrames with the same columns to a CSV, Parquet or Feather file.
+
+    The first frame fixes the Arrow schema for columnar formats. Columns
+    that are all-null in it (object columns without a value so far, such as
+    an unused label column in the first chunk) are typed as strings, so
+    later frames with values still fit. Closing a writer that received no
+    frames leaves an empty file with `columns`.
+    """
+
+    def __init__(self, path, columns: Optional[List[str]] = None, fmt: Optional[str] = None):
+        # `path` may be a writable stream (binary for Parquet and Feather)
+        # when `fmt` is given; the stream is left open on close
+        self.path = path
+        self.format = fmt or table_format(path)
+        self.columns = columns
+        self.rows = 0
+        self._file = None
+        self._writer = None
+        self._schema = None
+        if self.format != "csv":
+            self._pa = _pyarrow()
+
+    def write(self, df: pd.DataFrame):
+        if self.format == "csv":
+            if self._file is None:
+                self._file = self.path if _is_stream(self.path) else open(self.path, "w", newline="")
+            df.to_csv(self._file, header=(self.rows == 0), index=False)
+        else:
+            pa = self._pa
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                          for field in table.schema], metadata=table.schema.metadata)
+                table = table.cast(self._schema)
+                if self.format == "parquet":
+                    self._writer = pa.parquet.ParquetWriter(self.path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.path, self._schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._file is None and self._writer is None:
+            # Nothing written: still leave a valid, empty table
+            self.write(pd.DataFrame(columns=self.columns or []))
+        if self._file is not None and self._file is not self.path:
+            self._file.close()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
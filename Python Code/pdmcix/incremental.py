@@ -0,0 +1,132 @@
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .core import apply_plan
+from .criteria import CriteriaPlan, resolve_plan
+from .formats import read_schema, read_table, table_format, value_types
+from .profiling import StageProfiler, stage_timer
+
+# Incremental re-classification. Each output row carries a hash of the input
+# columns the criteria read, salted with the criteria fingerprint; on the next
+# run only rows whose hash changed (or whose ID is new) are classified again.
+
+HASH_COL = "inputHash"
+# Output columns holding label text, including the strings "None" and "nan"
+# and, for no impaired domain, ""
+LABEL_COLUMNS = ['missingValues', 'amnesticStatus', 'multipleSingle', 'multipleSingleDomain']
+
+
+def row_hashes(df: pd.DataFrame, plan: CriteriaPlan) -> np.ndarray:
+    # uint64 per row over plan.input_columns; a different plan gives
+    # different hashes. Object values other than strings also mix in their
+    # type (see value_types), so 3 and '3' differ while a row of strings
+    # keeps its hash whatever the rest of its column holds
+    salt = np.uint64(int(plan.fingerprint[:16], 16))
+    columns = df[plan.input_columns]
+    hashes = pd.util.hash_pandas_object(columns, index=False).to_numpy()
+    for i in range(columns.shape[1]):
+        types = value_types(columns.iloc[:, i])
+        if types is None:
+            continue
+        typed = (types != "builtins.str") & pd.notna(types)
+        # An odd multiplier per column, so equal types in two columns do not cancel
+        hashes[typed] ^= pd.util.hash_array(types[typed]) * np.uint64(2 * i + 1)
+    return hashes ^ salt
+
+
+def read_previous(path: str, df: pd.DataFrame, id_col: str, compact: bool = False) -> pd.DataFrame:
+    # A previous result from a file. CSV labels are read back as written
+    # rather than as NaN, and IDs with the type they have in `df`
+    if table_format(path) != "csv":
+        return read_table(path)
+    columns = [col for col in read_schema(path) if col == id_col or col not in df.columns]
+    na_values = {col: [""] for col in columns if col not in LABEL_COLUMNS}
+    if compact:
+        # Compact labels are categoricals, written as "" where missing
+        na_values.update({'amnesticStatus': [""], 'multipleSingle': [""]})
+    dtype = {col: str for col in LABEL_COLUMNS}
+    if df[id_col].dtype == object:
+        dtype[id_col] = str
+    return pd.read_csv(path, usecols=columns, keep_default_na=False, na_values=na_values, dtype=dtype)
+
+
+def PD_MCIx_incremental(df: pd.DataFrame, id_col: str, previous: Union[pd.DataFrame, str, None] = None,
+                        config=None, compact: bool = False, profiler: Optional[StageProfiler] = None,
+                        **criteria) -> pd.DataFrame:
+    """
+    Classify `df`, reusing the rows of a previous result that have not changed.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Current data, one row per patient.
+    id_col : str
+        Column holding a unique patient ID in both `df` and `previous`.
+    previous : DataFrame or str, optional
+        Earlier output of this function, or a file written from it (see
+        ``write_table``). Without it every row is classified.
+    config, **criteria
+        Criteria as for ``PD_MCIx_parallel``. Changing them invalidates
+        every stored row.
+    compact : bool
+        Compact output; should match the mode `previous` was produced in.
+
+    Returns
+    -------
+    DataFrame
+        The PD_MCIx output for every row of `df`, in the same order, plus an
+        ``inputHash`` column. Input columns always come from `df`; patients
+        absent from `df` are dropped. ``attrs['reclassified']`` holds the
+        number of rows that were classified in this run.
+    """
+    plan = resolve_plan(config, **criteria)
+    if isinstance(previous, str):
+        previous = read_previous(previous, df, id_col, compact)
+    stage = stage_timer(profiler, len(df))
+
+    with stage("hash"):
+        ids = pd.Index(df[id_col])
+        if not ids.is_unique:
+            raise ValueError(f"Patient IDs in {id_col!r} are not unique")
+        hashes = row_hashes(df, plan)
+
+        # Rows whose ID is new or whose hash no longer matches
+        changed = np.ones(len(df), dtype=bool)
+        if previous is not None and len(previous):
+            stored = previous.loc[:, [id_col, HASH_COL]]
+            positions = pd.Index(stored[id_col]).get_indexer(ids)
+            known = positions >= 0
+            changed[known] = stored[HASH_COL].to_numpy(dtype=np.uint64)[positions[known]] != hashes[known]
+        changed_rows = np.flatnonzero(changed)
+        kept_rows = np.flatnonzero(~changed)
+
+    fresh = apply_plan(df.iloc[changed_rows], plan, profiler, compact)
+
+    with stage("merge"):
+        derived = [col for col in fresh.columns if col not in df.columns]
+        if len(kept_rows):
+            columns = previous.columns.get_indexer(derived)
+            if (columns < 0).any():
+                raise ValueError("Previous result has different output columns; "
+                                 "was it produced with another compact setting?")
+            kept = previous.iloc[positions[kept_rows], columns]
+            # Files do not keep every dtype (CSV has no categoricals or Int8)
+            cast = {col: dtype for col, dtype in fresh[derived].dtypes.items()
+                    if kept[col].dtype != dtype and (not isinstance(dtype, np.dtype) or dtype == np.float32)}
+            kept = kept.astype(cast)
+        if not len(kept_rows):
+            merged = fresh[derived]
+        elif not len(changed_rows):
+            merged = kept
+        else:
+            # Back to the row order of df
+            order = np.empty(len(df), dtype=np.intp)
+            order[np.concatenate([changed_rows, kept_rows])] = np.arange(len(df))
+            merged = pd.concat([fresh[derived], kept], ignore_index=True).iloc[order]
+        result = pd.concat([df, merged.set_axis(df.index)], axis=1)
+        result[HASH_COL] = hashes
+
+    result.attrs.update(fresh.attrs, reclassified=len(changed_rows))
+    return result
@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, List, Optional
+
+# Background classification jobs for the web app.
+#
+# A JobQueue runs submitted functions on a bounded thread pool. Each job
+# reports progress through Job.report, which is also where a requested
+# cancellation takes effect. Job records are kept in an index file in the
+# queue directory, so finished results outlive the page (and the server).
+# A job may belong to an owner (the web app passes a per-session token);
+# listing, lookup and cancellation can then be restricted to that owner.
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    name: str
+    status: str = QUEUED
+    rows: int = 0
+    total_rows: Optional[int] = None
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    owner: Optional[str] = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False, compare=False)
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        if self.started is None or not self.rows:
+            return None
+        return self.rows / ((self.finished or time.time()) - self.started)
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        rate = self.rows_per_second
+        if self.status != RUNNING or not rate or self.total_rows is None:
+            return None
+        return max(self.total_rows - self.rows, 0) / rate
+
+    def report(self, rows: int):
+        # Progress callback for the running function; raises once cancelled
+        self.rows = rows
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def to_dict(self) -> Dict:
+        return {f.name: getattr(self, f.name) for f in fields(self) if not f.name.startswith("_")}
+
+
+class JobQueue:
+    """
+    Run jobs on at most `max_workers` threads and keep their records in `directory`.
+
+    ``submit(func, name)`` schedules ``func(job)``; the function reports
+    progress with ``job.report(rows)`` and returns the path of its output
+    file. Jobs submitted with an `owner` are only listed, returned and
+    cancelled for that owner when ``jobs``, ``get`` and ``cancel`` are given
+    one. Only the newest `keep` jobs (and their outputs) are retained.
+    Jobs that were still queued or running when the process stopped are
+    marked failed on the next start.
+    """
+
+    def __init__(self, directory: str, max_workers: int = 2, keep: int = 100):
+        self.directory = directory
+        self.keep = keep
+        self._index = os.path.join(directory, "jobs.json")
+        self._lock = threading.RLock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdmcix-job")
+        self._jobs: Dict[str, Job] = {}
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self._index):
+            with open(self._index) as f:
+                for record in json.load(f):
+                    job = Job(**record)
+                    if job.status not in FINISHED:
+                        job.status, job.error = FAILED, "Interrupted by a server restart"
+                    self._jobs[job.id] = job
+
+    def path(self, job: Job, suffix: str) -> str:
+        # Where a job should write its output
+        return os.path.join(self.directory, f"{job.id}{suffix}")
+
+    def submit(self, func: Callable[[Job], str], name: str, total_rows: Optional[int] = None,
+               owner: Optional[str] = None) -> Job:
+        job = Job(uuid.uuid4().hex[:12], name, total_rows=total_rows, owner=owner)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+            self._save()
+        self._pool.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def jobs(self, owner: Optional[str] = None) -> List[Job]:
+        # Newest first; only `owner`'s jobs when given
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if owner is None or job.owner == owner]
+        return sorted(jobs, key=lambda job: job.submitted, reverse=True)
+
+    def cancel(self, job_id: str, owner: Optional[str] = None) -> bool:
+        job = self.get(job_id, owner)
+        if job is None or job.status in FINISHED:
+            return False
+        job._cancel.set()
+        return True
+
+    def _run(self, job: Job, func: Callable[[Job], str]):
+        if job._cancel.is_set():
+            self._finish(job, CANCELLED)
+            return
+        job.status, job.started = RUNNING, time.time()
+        with self._lock:
+            self._save()
+        try:
+            job.output_path = func(job)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            self._finish(job, FAILED, f"{type(e).__name__}: {e}")
+        else:
+            self._finish(job, DONE)
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        job.status, job.error, job.finished = status, error, time.time()
+        if status != DONE:
+            self._remove_output(job)
+        with self._lock:
+            self._save()
+
+    def _remove_output(self, job: Job):
+        for name in os.listdir(self.directory):
+            if name.startswith(job.id):
+                os.remove(os.path.join(self.directory, name))
+        job.output_path = None
+
+    def _prune(self):
+        finished = [job for job in self.jobs() if job.status in FINISHED]
+        for job in finished[max(self.keep - (len(self._jobs) - len(finished)), 0):]:
+            self._remove_output(job)
+            del self._jobs[job.id]
+
+    def _save(self):
+        tmp = self._index + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump([job.to_dict() for job in self._jobs.values()], f)
+        os.replace(tmp, self._index)
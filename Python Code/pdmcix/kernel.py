@@ -0,0 +1,259 @@
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .core import (AMNESTIC_LABELS, DOMAIN_LABELS, DOMAIN_NAMES, MULTIPLE_SINGLE_LABELS, apply_responses,
+                   decode_missing, finish_flags, labels, mask_dtype, reliability_lookup, score_values)
+from .criteria import PRIMARY_TESTS, CriteriaPlan, tertiary_for
+
+# Fused rule evaluation, compiled with Numba when it is installed.
+#
+# The NumPy path (classify_flags) evaluates the rules a column at a time:
+# every stage reads the flags written by the one before and allocates its
+# own row-sized temporaries (comparison masks, a missing matrix, np.select
+# conditions). Here one compiled loop visits each patient once and writes
+# every output value - test and domain flags, NP/subjective/functional
+# impairment, the missing-value mask, AutoDx, amnestic and single/multiple
+# domain codes, Reliability - straight into preallocated output arrays. The
+# subjective/functional impairments still come from handle_type (series
+# matching and OGSame are per-column operations, and cheap).
+#
+# Numba is optional and only imported on first use. The kernel is compiled
+# with cache=True (later processes load it from Numba's cache, which is
+# what the worker processes of PD_MCIx_parallel rely on) and nogil=True, so
+# threads classifying at the same time run it concurrently: Dask's default
+# threaded scheduler (PD_MCIx_dask), the threaded HTTP server and the web
+# app's job workers.
+# Outputs, dtypes and column order are identical to the NumPy path, which
+# remains the reference and the fallback.
+
+ENGINES = ("numpy", "numba")
+# engine=None uses the kernel from KERNEL_MIN_ROWS rows once it is loaded.
+# Loading it (importing numba and the cached compile, about half a second)
+# only pays off from COLD_KERNEL_MIN_ROWS rows, so short-lived processes
+# with small inputs never import numba.
+KERNEL_MIN_ROWS = 50_000
+COLD_KERNEL_MIN_ROWS = 500_000
+
+# AutoDx by 4 * NP + 2 * subjective + functional impairment
+AUTODX = np.array([0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 1.0, 1.0])
+
+_compiled = None
+_lock = threading.Lock()
+
+
+def _numba():
+    try:
+        import numba
+    except ImportError:
+        raise ImportError("engine='numba' requires numba (pip install numba)")
+    return numba
+
+
+def numba_available() -> bool:
+    try:
+        _numba()
+    except ImportError:
+        return False
+    return True
+
+
+def use_kernel(engine: Optional[str], rows: int) -> bool:
+    # engine None picks the kernel for large frames when numba is installed
+    if engine is None:
+        if _compiled is not None:
+            return rows >= KERNEL_MIN_ROWS
+        return rows >= COLD_KERNEL_MIN_ROWS and numba_available()
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; use one of {', '.join(ENGINES)}")
+    if engine == "numba":
+        _numba()
+    return engine == "numba"
+
+
+def compiled_rules():
+    global _compiled
+    with _lock:
+        if _compiled is None:
+            _compiled = _numba().njit(cache=True, nogil=True)(_rules)
+    return _compiled
+
+
+def _rules(primary, fallback, has_fallback, cutoffs, fallback_cutoffs, responses, n_subjective, memory,
+           autodx_table, reliability, flags, domains, test_missing, np_impaired, totals, impaired, mask,
+           autodx, amnestic, multiple, domain_code, reliability_out):
+    # One pass over the rows; plain Python, compiled by compiled_rules.
+    # Inputs and outputs are tuples of row arrays (flags, domains, totals
+    # and impaired one per column). Missing values are NaN, detected as
+    # x != x.
+    n_tests, n_rows = len(flags), len(np_impaired)
+    n_domains = len(domains)
+    n_responses = len(responses)
+    n_items = n_tests + n_responses
+    for i in range(n_rows):
+        bits = 0
+        n_missing = 0
+        for t in range(n_tests):
+            x = primary[t][i]
+            flag = np.nan
+            if x == x:
+                flag = 1.0 if x <= cutoffs[t] else 0.0
+            elif has_fallback[t]:
+                y = fallback[t][i]
+                if y == y:
+                    flag = 1.0 if y <= fallback_cutoffs[t] else 0.0
+            flags[t][i] = flag
+            if flag != flag:
+                bits |= 1 << t
+                n_missing += 1
+                test_missing[t] += 1
+
+        # Two impaired tests in one domain, or impaired tests in two domains
+        two_in_one = False
+        n_impaired = 0
+        code = 0
+        total = 0.0
+        for d in range(n_domains):
+            score = flags[2 * d][i] + flags[2 * d + 1][i]
+            domains[d][i] = score
+            if score == score:
+                total += score
+                if score >= 2:
+                    two_in_one = True
+                if score >= 1:
+                    n_impaired += 1
+                    code |= 1 << d
+        np_flag = 1 if two_in_one or n_impaired >= 2 else 0
+
+        subjective = 0.0
+        functional = 0.0
+        for j in range(n_responses):
+            value = responses[j][i]
+            if value == value:
+                if j < n_subjective:
+                    subjective += value
+                else:
+                    functional += value
+            else:
+                bits |= 1 << (n_tests + j)
+                n_missing += 1
+        subjective_flag = 1 if subjective >= 1 else 0
+        functional_flag = 1 if functional >= 1 else 0
+
+        dx = autodx_table[4 * np_flag + 2 * subjective_flag + functional_flag]
+        np_impaired[i] = np_flag
+        totals[0][i] = subjective
+        totals[1][i] = functional
+        impaired[0][i] = subjective_flag
+        impaired[1][i] = functional_flag
+        mask[i] = bits
+        autodx[i] = dx
+        if dx == 1:
+            amnestic[i] = 2 if flags[memory[0]][i] == 1 or flags[memory[1]][i] == 1 else 1
+        else:
+            amnestic[i] = 0
+        multiple[i] = 2 if total > 1 else (0 if total < 1 else 1)
+        domain_code[i] = code
+        reliability_out[i] = reliability[n_items - n_missing]
+
+
+def _float_array(series: pd.Series) -> np.ndarray:
+    # A view of float64 columns (NaN already marks missing), else a copy
+    values = series.to_numpy() if series.dtype == np.float64 else score_values(series)[0]
+    return np.ascontiguousarray(values)
+
+
+def classify_fused(df: pd.DataFrame, plan: CriteriaPlan, stage, compact: bool = False,
+                   text: bool = True) -> Optional[pd.DataFrame]:
+    """
+    The neuropsych stage and classify_flags in one compiled pass.
+
+    `df` is apply_plan's frame with the ``*_vec`` columns. Returns None,
+    leaving `df` unchanged, when the subjective/functional impairments are
+    not plain numeric columns (or would collide with input columns of the
+    same name); the caller then takes the NumPy path.
+    """
+    rules = compiled_rules()
+    names = [f"{response.base_name}_impairment" for response in plan.responses]
+    pattern = [col for col in df.columns
+               if str(col).startswith(('Subjective', 'Functional')) and str(col).endswith('impairment')]
+    if pattern:
+        return None
+
+    # Responses on a frame of just their input columns, so that the outputs
+    # below can be added to df in the NumPy path's order (timed as the
+    # subjective and functional stages, as in the NumPy path)
+    inputs = list(dict.fromkeys(col for response in plan.responses for col in response.columns))
+    side = apply_responses(df[inputs].copy(deep=False), plan, stage)
+    if not all(isinstance(side[name].dtype, np.dtype) and side[name].dtype.kind in "biuf" for name in names):
+        return None
+
+    with stage("kernel"):
+        responses = tuple(_float_array(side[name]) for name in names)
+        n_subjective = sum(name.startswith('Subjective') for name in names)
+        total_dtypes = [side[group].iloc[:0].sum(axis=1).dtype for group in (names[:n_subjective],
+                                                                              names[n_subjective:])]
+        n = len(df)
+        primary = tuple(_float_array(df[f"{name}_vec"]) for name in PRIMARY_TESTS)
+        fallback = tuple(_float_array(df[f"{tertiary_for(name)}_vec"]) if plan.fallback_cols[i] is not None
+                         else primary[i] for i, name in enumerate(PRIMARY_TESTS))
+        has_fallback = np.array([col is not None for col in plan.fallback_cols])
+        memory = np.array([PRIMARY_TESTS.index("memoryOne"), PRIMARY_TESTS.index("memoryTwo")])
+        n_items = len(PRIMARY_TESTS) + len(names)
+
+        # Separate arrays, so each can be freed once df holds its copy
+        flags = [np.empty(n) for _ in PRIMARY_TESTS]
+        domains = [np.empty(n) for _ in DOMAIN_NAMES]
+        test_missing = np.zeros(len(PRIMARY_TESTS), dtype=np.int64)
+        np_impaired = np.empty(n, dtype=np.int64)
+        totals = [np.empty(n), np.empty(n)]
+        impaired = [np.empty(n, dtype=np.int64), np.empty(n, dtype=np.int64)]
+        mask = np.empty(n, dtype=mask_dtype(n_items))
+        autodx = np.empty(n)
+        amnestic = np.empty(n, dtype=np.int8)
+        multiple = np.empty(n, dtype=np.int8)
+        domain_code = np.empty(n, dtype=np.uint8)
+        reliability = np.empty(n)
+        rules(primary, fallback, has_fallback, plan.cutoffs, plan.fallback_cutoffs, responses, n_subjective,
+              memory, AUTODX, reliability_lookup(n_items), tuple(flags), tuple(domains), test_missing,
+              np_impaired, tuple(totals), tuple(impaired), mask, autodx, amnestic, multiple, domain_code, reliability)
+        del primary, fallback, responses
+
+    with stage("outputs"):
+        # Same columns, order and dtypes as the NumPy path: a flag is int64
+        # when none of its values is missing
+        for t, name in enumerate(PRIMARY_TESTS):
+            df[f"{name}_impaired"] = flags[t] if test_missing[t] else flags[t].astype(np.int64)
+            flags[t] = None
+        for name in names:
+            df[name] = side.pop(name)
+        del side
+        for d, domain in enumerate(DOMAIN_NAMES):
+            whole = not (test_missing[2 * d] or test_missing[2 * d + 1])
+            df[f"{domain}_impaired"] = domains[d].astype(np.int64) if whole else domains[d]
+            domains[d] = None
+        df['NP_impaired'] = np_impaired
+        df['Subjective_total'] = totals.pop(0).astype(total_dtypes[0])
+        df['Subjective_impaired'] = impaired.pop(0)
+        df['Functional_total'] = totals.pop(0).astype(total_dtypes[1])
+        df['Functional_impaired'] = impaired.pop(0)
+        cols_to_check = [f"{name}_impaired" for name in PRIMARY_TESTS] + names
+        if compact or not text:
+            df['missingMask'] = mask
+            df.attrs['missing_columns'] = cols_to_check
+        else:
+            df['missingValues'] = decode_missing(pd.Series(mask), cols_to_check).to_numpy()
+        df['AutoDx'] = autodx
+        df['amnesticStatus'] = labels(amnestic, AMNESTIC_LABELS, compact)
+        df['multipleSingle'] = labels(multiple, MULTIPLE_SINGLE_LABELS, compact)
+        df['Reliability'] = reliability
+        if not text:
+            df['domainMask'] = domain_code
+        elif compact:
+            df['multipleSingleDomain'] = pd.Categorical.from_codes(domain_code, DOMAIN_LABELS)
+        else:
+            df['multipleSingleDomain'] = np.array(DOMAIN_LABELS, dtype=object)[domain_code]
+
+    return finish_flags(df, stage, compact, text)
@@ -0,0 +1,229 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .core import apply_plan, labels
+from .criteria import resolve_plan
+from .profiling import StageProfiler, stage_timer
+
+# Longitudinal (multi-visit) classification. Every visit is classified in one
+# apply_plan pass; progression is then derived on arrays sorted by patient and
+# visit date, with group boundaries handled by ufunc.reduceat / accumulate
+# rather than a Python loop over patients.
+#
+# Each classified visit gets an ordinal stage:
+#   noMCI     AutoDx == 0
+#   MCI       AutoDx == 1, single domain
+#   PDD-risk  AutoDx == 1, multiple domain (the PD-MCI subtype with the
+#             highest rate of conversion to dementia)
+# Visits whose AutoDx is missing have no stage and are skipped when comparing
+# a visit with the one before it.
+
+STAGE_LABELS = ["noMCI", "MCI", "PDD-risk"]
+NS_PER_DAY = 86_400 * 10**9
+
+
+def visit_stages(result: pd.DataFrame) -> np.ndarray:
+    # int8 stage code per row of a PD_MCIx result (-1 = no stage)
+    autodx = result['AutoDx'].to_numpy(dtype=float, na_value=np.nan)
+    multiple = (result['multipleSingle'] == "Multiple").to_numpy()
+    return np.select([autodx == 0, (autodx == 1) & ~multiple, autodx == 1], [0, 1, 2], default=-1).astype(np.int8)
+
+
+@dataclass
+class VisitOrder:
+    # Visits sorted by patient, then date (ties keep input order)
+    order: np.ndarray        # input row of each sorted visit
+    starts: np.ndarray       # sorted position of each patient's first visit
+    patient: np.ndarray      # patient number of each sorted visit
+    patient_ids: pd.Index    # patient IDs, in order of first appearance
+    dates: np.ndarray        # sorted visit dates, datetime64[ns]
+
+    @classmethod
+    def from_columns(cls, ids: pd.Series, dates: pd.Series) -> "VisitOrder":
+        dates = pd.to_datetime(dates)
+        if dates.isna().any():
+            raise ValueError("Visit dates must not be missing")
+        patient, patient_ids = pd.factorize(ids)
+        if (patient < 0).any():
+            raise ValueError("Patient IDs must not be missing")
+        dates = dates.to_numpy(dtype="datetime64[ns]")
+        # One int64 sort key, patient then date rank (both < rows, so no
+        # overflow); about twice as fast as a two-key lexsort
+        rank, unique_dates = pd.factorize(dates.view(np.int64), sort=True)
+        order = np.argsort(patient.astype(np.int64) * len(unique_dates) + rank, kind="stable")
+        patient = patient[order]
+        starts = np.flatnonzero(np.r_[True, patient[1:] != patient[:-1]]) if len(order) else order
+        return cls(order, starts, patient, pd.Index(patient_ids, name=ids.name), dates[order])
+
+    @property
+    def ends(self) -> np.ndarray:
+        # Sorted position of each patient's last visit
+        return np.r_[self.starts[1:], len(self.order)][:len(self.starts)] - 1
+
+    @property
+    def visit_number(self) -> np.ndarray:
+        return np.arange(len(self.order)) - self.starts[self.patient] + 1
+
+    @property
+    def days(self) -> np.ndarray:
+        ns = self.dates.view(np.int64)
+        return (ns - ns[self.starts][self.patient]) // NS_PER_DAY
+
+    def reduce(self, ufunc: np.ufunc, values: np.ndarray) -> np.ndarray:
+        # ufunc over each patient's visits
+        return ufunc.reduceat(values, self.starts) if len(values) else values[:0]
+
+    def previous(self, stages: np.ndarray) -> np.ndarray:
+        # Last staged value strictly before each visit of the same patient (-1 if none)
+        if not len(stages):
+            return stages.copy()
+        position = np.where(stages >= 0, np.arange(len(stages)), 0)
+        position[self.starts] = self.starts
+        previous = np.r_[-1, stages[np.maximum.accumulate(position)][:-1]].astype(stages.dtype)
+        previous[self.starts] = -1
+        return previous
+
+
+def PD_MCIx_longitudinal(df: pd.DataFrame, id_col: str, date_col: str, config=None,
+                         compact: bool = False, profiler: Optional[StageProfiler] = None,
+                         **criteria) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Classify every visit of a multi-visit cohort and track each patient's progression.
+
+    Parameters
+    ----------
+    df : DataFrame
+        One row per visit, in any order.
+    id_col, date_col : str
+        Patient ID and visit date columns. Dates are parsed with
+        ``pd.to_datetime``; neither may be missing.
+    config, **criteria
+        Criteria as for ``PD_MCIx_parallel``.
+    compact : bool
+        Compact classification output; ``stage`` is then a Categorical.
+
+    Returns
+    -------
+    visits : DataFrame
+        The PD_MCIx output in the row order of `df`, plus ``visitNumber``
+        (1 = baseline), ``daysSinceBaseline``, ``stage`` (noMCI, MCI or
+        PDD-risk; 'nan' when AutoDx is missing) and ``stageChange`` (stage
+        minus the last earlier stage; NaN when either is missing).
+    patients : DataFrame
+        One row per patient, as returned by ``progression_summary``.
+    """
+    plan = resolve_plan(config, **criteria)
+    visits = apply_plan(df, plan, profiler, compact)
+    stage = stage_timer(profiler, len(df))
+
+    with stage("visit_order"):
+        visit_order = VisitOrder.from_columns(visits[id_col], visits[date_col])
+        stages = visit_stages(visits)[visit_order.order]
+
+    with stage("visits"):
+        previous = visit_order.previous(stages)
+        change = np.where((stages >= 0) & (previous >= 0), stages - previous.astype(float), np.nan)
+        # Back to input order
+        inverse = np.empty_like(visit_order.order)
+        inverse[visit_order.order] = np.arange(len(inverse))
+        visits['visitNumber'] = visit_order.visit_number[inverse]
+        visits['daysSinceBaseline'] = visit_order.days[inverse]
+        visits['stage'] = labels(stages[inverse], STAGE_LABELS, compact)
+        visits['stageChange'] = change[inverse]
+
+    with stage("progression"):
+        patients = summarize(visit_order, stages)
+    return visits, patients
+
+
+def progression_summary(visits: pd.DataFrame, id_col: str, date_col: str) -> pd.DataFrame:
+    """
+    Per-patient progression from a longitudinal result.
+
+    `visits` needs the ID, date and ``stage`` columns (e.g. the first frame
+    returned by ``PD_MCIx_longitudinal``, or that frame read back from a file).
+
+    Returns
+    -------
+    DataFrame
+        Indexed by patient ID in order of first appearance, with ``visits``,
+        ``baselineDate``, ``lastDate``, ``baselineStage`` and ``lastStage``
+        (first and last staged visit), ``worstStage``, ``transitions`` (the
+        stage sequence with repeats collapsed, e.g. "noMCI > MCI > PDD-risk"),
+        ``conversionVisit`` / ``daysToConversion`` (first visit at MCI or worse
+        directly after a noMCI visit), ``pddRiskVisit`` / ``daysToPddRisk``
+        (first PDD-risk visit), ``reversions`` (visits staged lower than the
+        one before), ``stable`` (every staged visit at the same stage) and
+        ``stableConversion`` (converted and never staged noMCI afterwards).
+        Visit numbers count from 1 at baseline; days are since baseline.
+        Patients without a staged visit get 'nan' stages and no events.
+    """
+    visit_order = VisitOrder.from_columns(visits[id_col], visits[date_col])
+    stages = pd.Categorical(visits['stage'].to_numpy(dtype=object), categories=STAGE_LABELS).codes
+    return summarize(visit_order, stages[visit_order.order])
+
+
+def summarize(visit_order: VisitOrder, stages: np.ndarray) -> pd.DataFrame:
+    # progression_summary on sorted stage codes
+    n, starts = len(stages), visit_order.starts
+    visit_number, days = visit_order.visit_number, visit_order.days.astype(float)
+    missing = np.iinfo(np.int64).max
+
+    def first(event: np.ndarray, values: np.ndarray) -> np.ndarray:
+        # Value at each patient's first event (NaN when there is none)
+        at = visit_order.reduce(np.minimum, np.where(event, visit_number, missing))
+        found = at != missing
+        result = np.full(len(starts), np.nan)
+        result[found] = values[starts[found] + at[found] - 1]
+        return result
+
+    staged = stages >= 0
+    previous = visit_order.previous(stages)
+    compared = staged & (previous >= 0)
+    converted = compared & (previous == 0) & (stages >= 1)
+    conversion = first(converted, visit_number)
+
+    # Collapsed stage sequence: the k-th run of equal stages adds the 2-bit
+    # digit (stage + 1) at position k of a per-patient key
+    run_start = staged & (stages != previous)
+    before = np.r_[0, np.cumsum(run_start)]
+    run = (before[1:] - before[starts][visit_order.patient] - 1).clip(0, 31).astype(np.uint64)
+    digits = np.where(run_start, (stages.astype(np.int64) + 1).astype(np.uint64) << (2 * run), np.uint64(0))
+    runs = visit_order.reduce(np.add, run_start.astype(np.int64))
+    key_codes, keys = pd.factorize(visit_order.reduce(np.add, digits))
+    transitions = np.array([_sequence(int(key)) for key in keys], dtype=object)[key_codes]
+    for p in np.flatnonzero(runs > 32):
+        # Keys hold 32 runs; spell out the (rare) longer sequences directly
+        span = slice(starts[p], visit_order.ends[p] + 1)
+        transitions[p] = " > ".join(STAGE_LABELS[s] for s in stages[span][run_start[span]])
+
+    # Converted, and no noMCI visit after the conversion visit
+    last_normal = visit_order.reduce(np.maximum, np.where(stages == 0, visit_number, 0))
+    first_stage = first(staged, stages.astype(float))
+    return pd.DataFrame({
+        'visits': np.diff(np.r_[starts, n]),
+        'baselineDate': visit_order.dates[starts],
+        'lastDate': visit_order.dates[visit_order.ends],
+        'baselineStage': labels(np.nan_to_num(first_stage, nan=-1).astype(np.int8), STAGE_LABELS),
+        'lastStage': labels(np.where(staged, stages, previous)[visit_order.ends], STAGE_LABELS),
+        'worstStage': labels(visit_order.reduce(np.maximum, stages), STAGE_LABELS),
+        'transitions': transitions,
+        'conversionVisit': conversion,
+        'daysToConversion': first(converted, days),
+        'pddRiskVisit': first(stages == 2, visit_number),
+        'daysToPddRisk': first(stages == 2, days),
+        'reversions': visit_order.reduce(np.add, (compared & (stages < previous)).astype(np.int64)),
+        'stable': runs == 1,
+        'stableConversion': ~np.isnan(conversion) & (last_normal < np.nan_to_num(conversion)),
+    }, index=visit_order.patient_ids)
+
+
+def _sequence(key: int) -> str:
+    names = []
+    while key:
+        names.append(STAGE_LABELS[(key & 3) - 1])
+        key >>= 2
+    return " > ".join(names) if names else "nan"
@@ -0,0 +1,192 @@
+import os
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .core import calculate_impaired, classify_flags, select_columns
+from .criteria import PRIMARY_TESTS, CriteriaPlan, resolve_plan
+from .formats import _pyarrow
+from .profiling import StageProfiler, stage_timer
+
+# Zero-copy classification of memory-mapped score files.
+#
+# apply_plan copies every score column into a *_vec column (part of its
+# output) and again into a float array for each comparison. Here the test
+# scores are read as views of a memory-mapped file instead: Arrow IPC /
+# Feather (one record batch at a time) or a structured .npy array. Each
+# impairment flag is computed directly from the view, so besides the output
+# the only allocations are a few row-sized boolean masks. Only the
+# subjective/functional input columns (usually a handful) are loaded into
+# a DataFrame.
+#
+# Write suitable files with write_table(df, "scores.arrow") (uncompressed
+# Arrow IPC) or np.save("scores.npy", df.to_records(index=False)).
+
+MAPPED_FORMATS = {'.feather': "arrow", '.arrow': "arrow", '.ipc': "arrow", '.npy': "npy"}
+
+
+@dataclass
+class MappedBlock:
+    # A block of rows of a memory-mapped file
+    columns: List[str]
+    rows: int
+    # Rows in the whole file
+    total: int
+    # (values, missing) views of one score column
+    scores: Callable[[str], Tuple[np.ndarray, np.ndarray]]
+    # Other columns, loaded into a DataFrame
+    frame: Callable[[List[str]], pd.DataFrame]
+
+
+def _arrow_scores(array) -> Tuple[np.ndarray, np.ndarray]:
+    # Views of an Arrow array's buffers; only the missing mask is allocated.
+    # Non-numeric arrays are converted (copied).
+    pa = _pyarrow()
+    if not (pa.types.is_integer(array.type) or pa.types.is_floating(array.type)):
+        values = array.to_pandas().to_numpy(dtype=float, na_value=np.nan)
+        return values, np.isnan(values)
+    validity, data = array.buffers()[:2]
+    start, stop = array.offset, array.offset + len(array)
+    values = np.frombuffer(data, dtype=array.type.to_pandas_dtype())[start:stop]
+    if validity is None:
+        missing = np.zeros(len(array), dtype=bool)
+    else:
+        bits = np.unpackbits(np.frombuffer(validity, dtype=np.uint8), count=stop, bitorder="little")
+        missing = bits[start:] == 0
+    if values.dtype.kind == "f":
+        missing |= np.isnan(values)
+    return values, missing
+
+
+def _npy_scores(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    if values.dtype.kind not in "iuf":
+        values = values.astype(float)
+    return values, np.isnan(values) if values.dtype.kind == "f" else np.zeros(len(values), dtype=bool)
+
+
+def iter_mapped(path: str) -> Iterator[MappedBlock]:
+    # One block for a .npy file, one per record batch for Arrow IPC
+    fmt = MAPPED_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt == "npy":
+        try:
+            data = np.load(path, mmap_mode="r")
+        except ValueError as e:
+            raise ValueError(f"{path} cannot be memory-mapped; store text as fixed-width strings ({e})")
+        if data.dtype.names is None:
+            raise ValueError("A .npy input must be a structured array with one field per column")
+        yield MappedBlock(list(data.dtype.names), len(data), len(data), lambda col: _npy_scores(data[col]),
+                          lambda cols: pd.DataFrame({col: data[col] for col in cols}, index=pd.RangeIndex(len(data))))
+        return
+    if fmt != "arrow":
+        raise ValueError(f"Memory-mapped input must be one of {', '.join(MAPPED_FORMATS)}")
+    pa = _pyarrow()
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        # Batches are views of the map, so counting their rows reads no data
+        total = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            yield MappedBlock(batch.schema.names, batch.num_rows, total,
+                              lambda col, batch=batch: _arrow_scores(batch.column(col)),
+                              lambda cols, batch=batch: batch.select(cols).to_pandas()
+                              .set_axis(pd.RangeIndex(batch.num_rows)))
+
+
+def PD_MCIx_mapped(path: str, config=None, output_cols: Optional[List[str]] = None, compact: bool = False,
+                   profiler: Optional[StageProfiler] = None, **criteria) -> pd.DataFrame:
+    """
+    Classify a memory-mapped Arrow IPC (.arrow, .feather, .ipc) or structured
+    .npy file without copying the test scores.
+
+    Parameters
+    ----------
+    path : str
+        Input file. Arrow files are classified one record batch at a time
+        and should be uncompressed for the reads to be zero-copy.
+    config, **criteria
+        Criteria as for ``PD_MCIx_parallel``.
+    output_cols : list, optional
+        Output columns to keep (default: all). Text columns not selected
+        are never built.
+    compact : bool
+        Compact output, as for ``PD_MCIx(compact=True)``.
+
+    Returns
+    -------
+    DataFrame
+        The derived PD_MCIx columns (the ``*_impaired`` flags through
+        ``multipleSingleDomain``) plus the subjective/functional input
+        columns. Test score and ``*_vec`` columns are not included.
+    """
+    plan = resolve_plan(config, **criteria)
+    columns, attrs, start = None, {}, 0
+    for block in iter_mapped(path):
+        plan.bind(pd.Index(block.columns))
+        if output_cols is None:
+            result = _classify_mapped(block, plan, profiler, compact)
+        else:
+            result = _classify_mapped(block, plan, profiler, compact, text=False)
+            result = select_columns(result, output_cols, compact)
+        if block.rows == block.total:
+            return result
+        # Each batch's result is copied into the output and dropped, so only
+        # one batch is held besides the output
+        if columns is None:
+            columns = {col: _allocate(result[col], block.total) for col in result.columns}
+            attrs = result.attrs
+        for col in result.columns:
+            columns[col] = _fill(columns[col], result[col], start)
+        start += len(result)
+    if columns is None:
+        raise ValueError(f"{path} holds no record batches")
+    out = pd.DataFrame(columns, copy=False)
+    out.attrs = attrs
+    return out
+
+
+def _allocate(values: pd.Series, rows: int):
+    # An uninitialised array of `values`' dtype for `rows` rows
+    if isinstance(values.dtype, np.dtype):
+        return np.empty(rows, dtype=values.dtype)
+    return values.array.take(np.full(rows, -1), allow_fill=True)
+
+
+def _fill(column, values: pd.Series, start: int):
+    # Copies `values` into column[start:], widening the column when a batch
+    # needs a wider dtype than the ones before it (e.g. integer flags, then
+    # flags with a missing score, or an integer column with nulls)
+    if values.dtype != column.dtype:
+        if isinstance(column, np.ndarray) and isinstance(values.dtype, np.dtype):
+            column = column.astype(np.result_type(column.dtype, values.dtype), copy=False)
+        else:
+            column = np.asarray(column, dtype=object)
+        values = values.to_numpy(dtype=column.dtype)
+    else:
+        values = values.to_numpy() if isinstance(values.dtype, np.dtype) else values.array
+    column[start:start + len(values)] = values
+    return column
+
+
+def _classify_mapped(block: MappedBlock, plan: CriteriaPlan, profiler: Optional[StageProfiler],
+                     compact: bool, text: bool = True) -> pd.DataFrame:
+    stage = stage_timer(profiler, block.rows)
+    with stage("inputs"):
+        df = block.frame(list(dict.fromkeys(col for response in plan.responses for col in response.columns)))
+    scores = block.scores
+    if plan.norms is not None:
+        with stage("norms"):
+            # Normed scores are new arrays; the other scores stay views
+            normed = {}
+            for col in set(plan.primary_cols + plan.fallback_cols) & set(plan.norms.columns):
+                values, missing = block.scores(col)
+                normed[col] = np.where(missing, np.nan, values)
+            normed = plan.norms.convert(normed, block.frame(list(plan.norms.demographic_columns)))
+            scores = lambda col: (normed[col], np.isnan(normed[col])) if col in normed else block.scores(col)
+    with stage("neuropsych"):
+        for i, name in enumerate(PRIMARY_TESTS):
+            fallback = scores(plan.fallback_cols[i]) if plan.fallback_cols[i] is not None else None
+            df[f"{name}_impaired"] = calculate_impaired(
+                scores(plan.primary_cols[i]), plan.cutoffs[i], fallback, plan.fallback_cutoffs[i])
+    return classify_flags(df, plan, stage, compact, text)
@@ -0,0 +1,265 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .formats import file_hash, read_table
+
+# Normative scoring: raw test scores to z, T or percentile scores from
+# demographically stratified norm tables, so raw-score files can be
+# classified directly (cutoffs are then given on the normed scale).
+#
+# A norm table has one row per test and demographic cell:
+#
+#     test, age_min, age_max[, education_min, education_max][, sex], mean, sd[, invert]
+#
+# Bounds are inclusive. Rows whose sex is empty or "all" apply to every sex;
+# `invert` marks tests where a higher raw score is worse (e.g. completion
+# times), so that low normed scores always mean impairment. Scores outside
+# every cell of their test get no normed score (NaN).
+#
+# Each table is compiled once into per-test lookup grids (mean and sd indexed
+# by sex, age bin and education bin), where a row's cell is found with
+# np.searchsorted. Compiled tables are cached in memory and as .npz files in
+# CACHE_DIR, keyed by the table's content hash, so later runs skip parsing.
+
+CACHE_DIR = os.environ.get("PDMCIX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pdmcix"))
+SCORES = ("z", "T", "percentile")
+MEMORY_ENTRIES = 16
+
+_memory: "OrderedDict[Tuple[str, int, int], NormTable]" = OrderedDict()
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True, eq=False)
+class TestNorms:
+    # Bin edges: bin k is [edges[k], edges[k + 1]); a single unbounded bin
+    # when the table is not stratified by that variable
+    age_edges: np.ndarray
+    education_edges: np.ndarray
+    # Sex levels as text; empty when the table is not stratified by sex
+    sex_levels: Tuple[str, ...]
+    # (max(1, len(sex_levels)), age bins, education bins); NaN = no norms
+    mean: np.ndarray
+    sd: np.ndarray
+    invert: bool
+
+
+@dataclass(frozen=True, eq=False)
+class NormTable:
+    tests: Dict[str, TestNorms]
+    # Content hash of the source table
+    digest: str
+
+    @property
+    def by_education(self) -> bool:
+        return any(_bounded(norms.education_edges) for norms in self.tests.values())
+
+    @property
+    def by_sex(self) -> bool:
+        return any(norms.sex_levels for norms in self.tests.values())
+
+    def zscores(self, test: str, raw: np.ndarray, age: np.ndarray, education: Optional[np.ndarray] = None,
+                sex: Optional[np.ndarray] = None, _bins: Optional[dict] = None) -> np.ndarray:
+        # z-score of each raw score in its demographic cell
+        norms = self.tests[test]
+        bins = {} if _bins is None else _bins
+        n_sex, n_age, n_education = norms.mean.shape
+        cell = np.zeros(len(raw), dtype=np.intp)
+        valid = np.ones(len(raw), dtype=bool)
+        for variable, edges, values, size in (("age", norms.age_edges, age, n_age),
+                                              ("education", norms.education_edges, education, n_education)):
+            if _bounded(edges):
+                part = _cell(bins, variable, edges, values)
+                valid &= part >= 0
+                cell = cell * size + part
+            else:
+                cell = cell * size
+        if norms.sex_levels:
+            key = ("sex", norms.sex_levels)
+            if key not in bins:
+                bins[key] = pd.Index(norms.sex_levels).get_indexer(sex)
+            valid &= bins[key] >= 0
+            cell += bins[key] * (n_age * n_education)
+        cell[~valid] = 0
+        with np.errstate(invalid="ignore"):
+            z = np.where(valid, (raw - norms.mean.ravel()[cell]) / norms.sd.ravel()[cell], np.nan)
+        return -z if norms.invert else z
+
+    # --- Compilation and caching ---
+
+    @classmethod
+    def compile(cls, table: pd.DataFrame, digest: str = "") -> "NormTable":
+        required = ["test", "age_min", "age_max", "mean", "sd"]
+        missing = [col for col in required if col not in table.columns]
+        if missing:
+            raise ValueError(f"Norm table is missing columns: {', '.join(missing)}")
+        if not (table["sd"] > 0).all():
+            raise ValueError("Norm table standard deviations must be positive")
+        if "education_min" not in table.columns:
+            table = table.assign(education_min=-np.inf, education_max=np.inf)
+        for var in ("age", "education"):
+            if (table[f"{var}_min"] > table[f"{var}_max"]).any():
+                raise ValueError(f"Norm table has rows with {var}_min above {var}_max")
+        sex = table["sex"] if "sex" in table.columns else pd.Series("all", index=table.index)
+        sex = sex.fillna("all").astype(str).str.strip()
+        table = table.assign(sex=sex.where(~sex.str.lower().isin(["", "all"]), "all"))
+
+        tests = {}
+        for test, rows in table.groupby("test", sort=False):
+            levels = tuple(sorted(set(rows["sex"]) - {"all"}))
+            age_edges = _edges(rows["age_min"], rows["age_max"])
+            education_edges = _edges(rows["education_min"], rows["education_max"])
+            shape = (max(len(levels), 1), len(age_edges) - 1, len(education_edges) - 1)
+            mean, sd = np.full(shape, np.nan), np.full(shape, np.nan)
+            for row in rows.itertuples(index=False):
+                a = slice(*np.searchsorted(age_edges, [row.age_min, _upper(row.age_max)]))
+                e = slice(*np.searchsorted(education_edges, [row.education_min, _upper(row.education_max)]))
+                s = slice(None) if row.sex == "all" else slice(levels.index(row.sex), levels.index(row.sex) + 1)
+                if not np.isnan(mean[s, a, e]).all():
+                    raise ValueError(f"Norm table cells overlap for test {test!r} "
+                                     f"(age {row.age_min}-{row.age_max}, sex {row.sex})")
+                mean[s, a, e], sd[s, a, e] = row.mean, row.sd
+            invert = bool(rows["invert"].fillna(False).astype(bool).any()) if "invert" in rows else False
+            tests[str(test)] = TestNorms(age_edges, education_edges, levels, mean, sd, invert)
+        return cls(tests, digest)
+
+    def save(self, path: str):
+        arrays = {"tests": np.array(list(self.tests), dtype=str), "digest": np.array(self.digest)}
+        for i, norms in enumerate(self.tests.values()):
+            arrays.update({f"{i}.age_edges": norms.age_edges, f"{i}.education_edges": norms.education_edges,
+                           f"{i}.sex_levels": np.array(norms.sex_levels, dtype=str), f"{i}.mean": norms.mean,
+                           f"{i}.sd": norms.sd, f"{i}.invert": np.array(norms.invert)})
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def from_file(cls, path: str) -> "NormTable":
+        with np.load(path, allow_pickle=False) as data:
+            tests = {
+                str(test): TestNorms(data[f"{i}.age_edges"], data[f"{i}.education_edges"],
+                                     tuple(data[f"{i}.sex_levels"].tolist()), data[f"{i}.mean"], data[f"{i}.sd"],
+                                     bool(data[f"{i}.invert"]))
+                for i, test in enumerate(data["tests"])
+            }
+            return cls(tests, str(data["digest"]))
+
+
+def load_norms(path: str, cache_dir: Optional[str] = CACHE_DIR) -> NormTable:
+    """
+    Load a norm table (CSV, Parquet or Feather) compiled for lookup.
+
+    Compiled tables are kept in memory for the life of the process and, unless
+    `cache_dir` is None, written to ``<cache_dir>/norms/<content hash>.npz``
+    so that other processes and later runs reuse them.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key]
+
+    digest = file_hash(path)
+    cached = os.path.join(cache_dir, "norms", f"{digest}.npz") if cache_dir else None
+    if cached and os.path.exists(cached):
+        table = NormTable.from_file(cached)
+    else:
+        table = NormTable.compile(read_table(path), digest)
+        if cached:
+            try:
+                os.makedirs(os.path.dirname(cached), exist_ok=True)
+                table.save(cached)
+            except OSError:
+                # A read-only cache only costs the recompile next time
+                pass
+
+    with _lock:
+        _memory[key] = table
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+    return table
+
+
+@dataclass(frozen=True, eq=False)
+class NormPlan:
+    # Compiled form of a criteria file's "norms" section
+    table: NormTable
+    # Data column -> test name in the norm table
+    columns: Dict[str, str]
+    age: str
+    education: Optional[str]
+    sex: Optional[str]
+    score: str
+
+    @property
+    def demographic_columns(self) -> Tuple[str, ...]:
+        return tuple(col for col in (self.age, self.education, self.sex) if col is not None)
+
+    @property
+    def key(self) -> tuple:
+        # Everything that affects the normed scores (the table by content)
+        return (self.table.digest, tuple(sorted(self.columns.items())), self.age, self.education, self.sex,
+                self.score)
+
+    def convert(self, scores: Dict[str, np.ndarray], demographics: pd.DataFrame) -> Dict[str, np.ndarray]:
+        # Normed score per raw score column (NaN where missing or unnormed)
+        age = demographics[self.age].to_numpy(dtype=float, na_value=np.nan)
+        education = (demographics[self.education].to_numpy(dtype=float, na_value=np.nan)
+                     if self.education is not None else None)
+        sex = demographics[self.sex].astype(str).to_numpy() if self.sex is not None else None
+        bins = {}
+        normed = {}
+        for col, raw in scores.items():
+            z = self.table.zscores(self.columns[col], raw, age, education, sex, bins)
+            normed[col] = to_score(z, self.score)
+        return normed
+
+
+def to_score(z: np.ndarray, score: str) -> np.ndarray:
+    if score == "z":
+        return z
+    if score == "T":
+        return 50 + 10 * z
+    return 100 * normal_cdf(z)
+
+
+def normal_cdf(z: np.ndarray) -> np.ndarray:
+    # Standard normal CDF via the Abramowitz & Stegun 7.1.26 erf
+    # approximation (absolute error below 1e-7); avoids a scipy dependency
+    x = np.abs(z) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-x * x)
+    return 0.5 * (1 + np.sign(z) * erf)
+
+
+def _upper(bound: float) -> float:
+    # Inclusive upper bound as the start of the next bin
+    return np.nextafter(float(bound), np.inf)
+
+
+def _edges(lower: pd.Series, upper: pd.Series) -> np.ndarray:
+    return np.unique(np.r_[lower.to_numpy(dtype=float), [_upper(b) for b in upper]])
+
+
+def _bounded(edges: np.ndarray) -> bool:
+    # False for the single unbounded bin of an unstratified variable
+    return not (len(edges) == 2 and np.isneginf(edges[0]) and np.isposinf(edges[1]))
+
+
+def _cell(bins: dict, variable: str, edges: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # Bin of each value (-1 outside the edges or missing); cached per
+    # variable and edges so tests with the same stratification share the lookup
+    key = (variable, edges.tobytes())
+    if key not in bins:
+        cell = np.searchsorted(edges, values, side="right") - 1
+        cell[(cell >= len(edges) - 1) | np.isnan(values)] = -1
+        bins[key] = cell
+    return bins[key]
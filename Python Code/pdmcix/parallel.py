@@ -0,0 +1,78 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .core import apply_plan, comorbidityIdentifier
+from .criteria import resolve_plan
+
+# Process-pool classification over row partitions. Rows are classified
+# independently, so partitions are joined back in their original order and
+# the result is identical to a serial call.
+
+
+def split_partitions(df: pd.DataFrame, partitions: int) -> List[pd.DataFrame]:
+    bounds = np.linspace(0, len(df), min(partitions, max(len(df), 1)) + 1).astype(int)
+    return [df.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def imap_ordered(func: Callable, items: Iterable, workers: Optional[int] = None,
+                 window: Optional[int] = None) -> Iterator:
+    # Like pool.map, but with at most `window` items in flight so that
+    # streaming inputs stay memory bounded
+    workers = workers or os.cpu_count() or 1
+    window = window or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def map_partitions(func: Callable, df: pd.DataFrame, workers: Optional[int] = None,
+                   partitions: Optional[int] = None) -> pd.DataFrame:
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(df) == 0:
+        return func(df)
+    parts = split_partitions(df, partitions or workers)
+    return pd.concat(list(imap_ordered(func, parts, workers, window=len(parts))))
+
+
+def _comorbidities(df: pd.DataFrame, type_: str, base_name: str) -> pd.DataFrame:
+    return comorbidityIdentifier(df.copy(), type_, base_name)
+
+
+def PD_MCIx_parallel(df: pd.DataFrame, workers: Optional[int] = None,
+                     partitions: Optional[int] = None, config=None, **criteria) -> pd.DataFrame:
+    """
+    Run PD_MCIx over row partitions of `df` in a process pool.
+
+    `workers` defaults to the number of CPUs and `partitions` to `workers`.
+    Criteria are given as `config` (CriteriaConfig, CriteriaPlan, dict or
+    file path) or as PD_MCIx keyword arguments. The output is identical to
+    ``PD_MCIx(df, **criteria)``.
+    """
+    plan = resolve_plan(config, **criteria)
+    return map_partitions(partial(apply_plan, plan=plan), df, workers, partitions)
+
+
+def comorbidityIdentifier_parallel(df: pd.DataFrame, type_: str = "broad", base_name: str = "comorb",
+                                   workers: Optional[int] = None,
+                                   partitions: Optional[int] = None) -> pd.DataFrame:
+    """
+    Run comorbidityIdentifier over row partitions of `df` in a process pool.
+
+    Unlike the serial function, `df` itself is not modified; the annotated
+    frame is returned.
+    """
+    if type_ not in ("broad", "strict"):
+        raise ValueError("Invalid type. Use 'broad' or 'strict'.")
+    func = partial(_comorbidities, type_=type_, base_name=base_name)
+    return map_partitions(func, df, workers, partitions)
@@ -0,0 +1,124 @@
+import os
+from functools import partial
+from typing import List, Optional
+
+import pandas as pd
+
+from .core import DOMAIN_NAMES, apply_plan, comorbidityIdentifier, handle_type
+from .criteria import PRIMARY_TESTS, CriteriaPlan, resolve_plan
+from .formats import TableWriter
+
+# Dask DataFrames: partitioned, out-of-core classification.
+#
+# Rows are classified independently, so each function maps the pandas
+# implementation over the partitions with map_partitions. Nothing is read
+# or computed until the result is computed or written (write_partitions, or
+# Dask's own to_parquet / to_csv), and any Dask scheduler can run it: the
+# local threaded or process schedulers, or a distributed cluster.
+#
+# A Dask DataFrame needs one schema for all its partitions. PD_MCIx gives
+# the per-test and per-domain *_impaired flags an int64 dtype when no score
+# is missing and float64 otherwise; here they are always float64. Values
+# are identical to the pandas path, and so is every other dtype.
+
+# Output columns whose pandas dtype depends on the data
+FLOAT_FLAGS = [f"{name}_impaired" for name in PRIMARY_TESTS + DOMAIN_NAMES]
+
+
+def _dask():
+    try:
+        import dask
+        import dask.dataframe
+    except ImportError:
+        raise ImportError("Dask DataFrames require dask (pip install 'dask[dataframe]')")
+    return dask
+
+
+def _float_flags(df: pd.DataFrame) -> pd.DataFrame:
+    for col in FLOAT_FLAGS:
+        if col in df.columns and df[col].dtype != float:
+            df[col] = df[col].astype(float)
+    return df
+
+
+def _classify_partition(df: pd.DataFrame, plan: CriteriaPlan, compact: bool, text: bool = True) -> pd.DataFrame:
+    result = apply_plan(df, plan, compact=compact, text=text)
+    return result if compact else _float_flags(result)
+
+
+def _handle_type_partition(df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    # Partitions may share memory with the caller's data; never modify them
+    return handle_type(df.copy(), **kwargs)
+
+
+def _comorbidity_partition(df: pd.DataFrame, type_: str, base_name: str, compact: bool) -> pd.DataFrame:
+    return comorbidityIdentifier(df.copy(), type_, base_name, compact=compact)
+
+
+def PD_MCIx_dask(ddf, config=None, compact: bool = False, text: bool = True, **criteria):
+    """
+    Lazy PD_MCIx over the partitions of a Dask DataFrame.
+
+    Criteria are given as `config` (CriteriaConfig, CriteriaPlan, dict or
+    file path) or as PD_MCIx keyword arguments, and are compiled once for
+    all partitions. Returns a Dask DataFrame with the PD_MCIx columns; the
+    ``*_impaired`` flags are float64 (see the module notes). Calling
+    ``PD_MCIx`` or ``CriteriaPlan.apply`` on a Dask DataFrame comes here.
+    """
+    _dask()
+    plan = resolve_plan(config, **criteria)
+    meta = _classify_partition(ddf._meta, plan, compact, text)
+    return ddf.map_partitions(_classify_partition, plan=plan, compact=compact, text=text, meta=meta)
+
+
+def handle_type_dask(ddf, type_: str, base_name: str, **kwargs):
+    # handle_type on every partition; same arguments as handle_type
+    _dask()
+    func = partial(_handle_type_partition, type_=type_, base_name=base_name, **kwargs)
+    return ddf.map_partitions(func, meta=func(ddf._meta))
+
+
+def comorbidityIdentifier_dask(ddf, type_: str = "broad", base_name: str = "comorb", compact: bool = False):
+    """
+    Lazy comorbidityIdentifier over the partitions of a Dask DataFrame.
+
+    Unlike the pandas function, `ddf` itself is not modified. With
+    compact=True the categories of ``comorbidities`` and ``suggestions``
+    depend on each partition's data, so the result has unknown categories.
+    """
+    if type_ not in ("broad", "strict"):
+        raise ValueError("Invalid type. Use 'broad' or 'strict'.")
+    _dask()
+    from dask.dataframe.utils import clear_known_categories
+
+    func = partial(_comorbidity_partition, type_=type_, base_name=base_name, compact=compact)
+    meta = func(ddf._meta)
+    if compact:
+        meta = clear_known_categories(meta, cols=['comorbidities', 'suggestions'])
+    return ddf.map_partitions(func, meta=meta)
+
+
+def write_partitions(ddf, path, columns: Optional[List[str]] = None, fmt: Optional[str] = None,
+                     window: Optional[int] = None) -> int:
+    """
+    Compute a Dask DataFrame and write it to one CSV, Parquet or Feather file.
+
+    Partitions are computed `window` at a time (default: the number of
+    CPUs) on the current Dask scheduler and appended in order, so at most
+    `window` partitions are held in memory. `columns` selects the columns
+    to write. Returns the number of rows written. For a directory of files
+    use Dask's ``to_parquet`` / ``to_csv`` instead.
+    """
+    dask = _dask()
+    if columns is not None:
+        ddf = ddf[columns]
+    window = window or os.cpu_count() or 1
+    parts = ddf.to_delayed()
+    writer = TableWriter(path, list(ddf.columns), fmt)
+    try:
+        for start in range(0, len(parts), window):
+            for part in dask.compute(*parts[start:start + window]):
+                writer.write(part)
+    finally:
+        writer.close()
+    return writer.rows
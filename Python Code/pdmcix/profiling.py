@@ -0,0 +1,113 @@
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+# Optional per-stage instrumentation for PD_MCIx and comorbidityIdentifier.
+#
+# Pass a StageProfiler as `profiler=`; each stage then records wall time,
+# throughput and (with memory=True) tracemalloc allocation figures. Without
+# a profiler the stages run under a shared no-op context manager.
+
+_NO_STAGE = nullcontext()
+
+
+@dataclass
+class StageTiming:
+    stage: str
+    seconds: float
+    rows: int
+    # tracemalloc figures, only recorded with StageProfiler(memory=True)
+    allocated_bytes: Optional[int] = None
+    peak_bytes: Optional[int] = None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+
+class StageProfiler:
+    """
+    Collects StageTiming records.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Called with each StageTiming as soon as the stage finishes.
+    logger : logging.Logger, optional
+        If given, each stage is also logged at `level`.
+    memory : bool
+        Record net allocated and peak memory per stage with tracemalloc
+        (adds noticeable overhead to Python-heavy stages). Tracing is started
+        on demand and, if the profiler started it, stopped again when the
+        outermost stage exits.
+    """
+
+    def __init__(self, callback: Optional[Callable[[StageTiming], None]] = None,
+                 logger: Optional[logging.Logger] = None, level: int = logging.INFO, memory: bool = False):
+        self.callback = callback
+        self.logger = logger
+        self.level = level
+        self.memory = memory
+        self.report: List[StageTiming] = []
+        # Open stages, and whether tracemalloc was started by this profiler
+        self._depth = 0
+        self._tracing = False
+
+    @contextmanager
+    def stage(self, name: str, rows: int):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        self._depth += 1
+        if self.memory:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing = StageTiming(name, time.perf_counter() - start, rows)
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                timing.allocated_bytes = current - before
+                timing.peak_bytes = peak - before
+            self._depth -= 1
+            if self._tracing and not self._depth:
+                tracemalloc.stop()
+                self._tracing = False
+            self.record(timing)
+
+    def record(self, timing: StageTiming):
+        self.report.append(timing)
+        if self.logger is not None:
+            self.logger.log(self.level, "%s: %.4fs (%.0f rows/s)", timing.stage, timing.seconds,
+                            timing.rows_per_second)
+        if self.callback is not None:
+            self.callback(timing)
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame([asdict(timing) for timing in self.report],
+                             columns=['stage', 'seconds', 'rows', 'allocated_bytes', 'peak_bytes'])
+        frame['rows_per_second'] = frame['rows'] / frame['seconds']
+        return frame
+
+    def summary(self) -> pd.DataFrame:
+        # Totals per stage, e.g. across the chunks of a streamed run
+        frame = self.to_frame()
+        summary = frame.groupby('stage', sort=False).agg(
+            calls=('seconds', 'size'), seconds=('seconds', 'sum'), rows=('rows', 'sum'),
+            peak_bytes=('peak_bytes', 'max'))
+        summary['rows_per_second'] = summary['rows'] / summary['seconds']
+        return summary
+
+
+def stage_timer(profiler: Optional[StageProfiler], rows: int) -> Callable[[str], object]:
+    # `with stage("name"):` blocks cost one no-op context manager when disabled
+    if profiler is None:
+        return lambda name: _NO_STAGE
+    return lambda name: profiler.stage(name, rows)
@@ -0,0 +1,172 @@
+import io
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .criteria import resolve_plan
+from .streaming import PD_MCIx_stream
+
+# Minimal HTTP endpoint for batch classification, on the standard library
+# server (no web framework needed):
+#
+#     POST /classify   body: CSV, Parquet or Feather table -> classified table
+#     GET  /health     {"status": "ok", "criteria": <plan fingerprint>}
+#
+# The input format comes from ``?format=`` or the Content-Type header and
+# defaults to CSV; the output format from ``?output_format=`` or the Accept
+# header, defaulting to the input format. ``?output_cols=a,b`` and
+# ``?compact=1`` map to the PD_MCIx_stream arguments. The criteria are fixed
+# when the server starts and compiled once for all requests.
+#
+# A CSV body is classified as it arrives, `chunksize` rows at a time, and the
+# result is sent back with chunked transfer encoding as each chunk is
+# written, so neither side is held in memory (a Parquet or Feather body is
+# read whole: its schema is at the end). Errors before the first output
+# chunk get a JSON error response (400 for bad input, 500 otherwise); later
+# ones close the connection without the terminating chunk, so the client
+# sees a truncated response rather than a partial table.
+
+CONTENT_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet",
+                 "feather": "application/vnd.apache.arrow.file"}
+MEDIA_FORMATS = {"text/csv": "csv", "application/vnd.apache.parquet": "parquet",
+                 "application/x-parquet": "parquet", "application/vnd.apache.arrow.file": "feather",
+                 "application/vnd.apache.arrow.stream": "feather"}
+
+
+def _media_format(header):
+    # First recognised media type in a Content-Type / Accept header
+    for part in (header or "").split(","):
+        fmt = MEDIA_FORMATS.get(part.split(";")[0].strip().lower())
+        if fmt is not None:
+            return fmt
+    return None
+
+
+class _Body(io.RawIOBase):
+    # The request body: at most Content-Length bytes of the connection
+    def __init__(self, rfile, length: int):
+        self._rfile, self._left = rfile, length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._left)
+        data = self._rfile.read(n) if n else b""
+        buffer[:len(data)] = data
+        self._left -= len(data)
+        return len(data)
+
+
+class _ChunkedResponse(io.RawIOBase):
+    # Response body in chunked transfer encoding; the 200 status and headers
+    # go out with the first bytes written
+    def __init__(self, handler, content_type: str):
+        self._handler, self._content_type = handler, content_type
+        self.started = False
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        # pyarrow's writers ask for the position of a non-seekable sink
+        return self._position
+
+    def _start(self):
+        if not self.started:
+            self._handler.send_response(200)
+            self._handler.send_header("Content-Type", self._content_type)
+            self._handler.send_header("Transfer-Encoding", "chunked")
+            self._handler.end_headers()
+            self.started = True
+
+    def write(self, data):
+        data = bytes(data)
+        if not data:
+            return 0
+        self._start()
+        self._handler.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self._position += len(data)
+        return len(data)
+
+    def finish(self):
+        self._start()
+        self._handler.wfile.write(b"0\r\n\r\n")
+
+
+class ClassifyHandler(BaseHTTPRequestHandler):
+    # Chunked responses need HTTP/1.1
+    protocol_version = "HTTP/1.1"
+    # Set on the subclass built by make_server
+    plan = None
+    chunksize = 100_000
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            return self._error(404, "Not found")
+        self._send(200, "application/json", json.dumps({"status": "ok", "criteria": self.plan.fingerprint}).encode())
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/classify":
+            return self._error(404, "Not found")
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        input_format = query.get("format") or _media_format(self.headers.get("Content-Type")) or "csv"
+        output_format = query.get("output_format") or _media_format(self.headers.get("Accept")) or input_format
+        if input_format not in CONTENT_TYPES or output_format not in CONTENT_TYPES:
+            return self._error(415, f"Unsupported format; use one of {', '.join(CONTENT_TYPES)}")
+        output_cols = query["output_cols"].split(",") if query.get("output_cols") else None
+        compact = query.get("compact", "").lower() in ("1", "true", "yes")
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = io.BufferedReader(_Body(self.rfile, length))
+        if input_format == "csv":
+            body = io.TextIOWrapper(body, encoding="utf-8", newline="")
+        out = _ChunkedResponse(self, CONTENT_TYPES[output_format])
+        sink = io.TextIOWrapper(out, encoding="utf-8", newline="") if output_format == "csv" else out
+        try:
+            PD_MCIx_stream(body, sink, chunksize=self.chunksize, output_cols=output_cols, config=self.plan,
+                           compact=compact, input_format=input_format, output_format=output_format)
+            sink.flush()
+        except Exception as e:
+            if out.started:
+                self.log_error("classification failed after the response started: %r", e)
+                self.close_connection = True
+                return
+            if isinstance(e, (ValueError, KeyError)):
+                return self._error(400, e.args[0] if isinstance(e, KeyError) else str(e))
+            self.log_error("classification failed: %r", e)
+            return self._error(500, f"Internal error: {type(e).__name__}: {e}")
+        out.finish()
+
+    def _send(self, status, content_type, payload):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, message):
+        # The body may not have been read (in full), so the connection is not reused
+        self.close_connection = True
+        self._send(status, "application/json", json.dumps({"error": message}).encode())
+
+
+def make_server(config=None, host: str = "127.0.0.1", port: int = 8000,
+                chunksize: int = 100_000, **criteria) -> ThreadingHTTPServer:
+    # `config` / `criteria` as for PD_MCIx_stream
+    handler = type("ClassifyHandler", (ClassifyHandler,),
+                   {"plan": resolve_plan(config, **criteria), "chunksize": chunksize})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(config=None, host: str = "127.0.0.1", port: int = 8000, chunksize: int = 100_000, **criteria):
+    server = make_server(config, host, port, chunksize, **criteria)
+    print(f"Serving PD-MCIx on http://{host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,226 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from .core import DOMAIN_NAMES, TEXT_COLUMNS, select_columns
+from .criteria import resolve_plan
+from .formats import TableWriter, iter_table
+
+# Persisted, indexed PD-MCIx results.
+#
+# A ResultStore is a SQLite file with one row per classified patient, kept
+# in coded form (text=False: missingMask and domainMask rather than the
+# missingValues / multipleSingleDomain text). AutoDx, amnesticStatus,
+# multipleSingle, domainMask and Reliability are indexed, as are any input
+# columns named when the store is built (a site, a patient ID). Reliability
+# takes one of a few percentages, so its index already groups rows by
+# value. Filters become indexed SQL: a domain filter is expanded into the
+# domainMask values (of 32) that satisfy it. Queries and exports read only
+# the matching rows and requested columns, and text is rendered for those
+# rows only.
+
+TABLE = "results"
+INDEXED_COLUMNS = ['AutoDx', 'amnesticStatus', 'multipleSingle', 'domainMask', 'Reliability']
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _param(value: Any) -> Any:
+    # sqlite3 binds Python scalars only
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def domain_masks(domains: Iterable[str]) -> List[int]:
+    # Every domainMask value with all of `domains` impaired
+    bits = 0
+    for domain in domains:
+        if domain not in DOMAIN_NAMES:
+            raise ValueError(f"Unknown domain {domain!r}; use one of {', '.join(DOMAIN_NAMES)}")
+        bits |= 1 << DOMAIN_NAMES.index(domain)
+    return [code for code in range(1 << len(DOMAIN_NAMES)) if code & bits == bits]
+
+
+class ResultStore:
+    """
+    Indexed, on-disk PD-MCIx results (see ``build_store``).
+
+    ``query`` returns the rows matching a filter, ``export`` writes them to
+    a CSV, Parquet or Feather file chunk by chunk, and ``count`` counts them.
+    Filters are keyword arguments: ``column=value`` (a list or tuple matches
+    any of its values, None matches missing), ``domains=[...]`` (all of these
+    domains impaired) and ``reliability_below`` / ``reliability_at_least``.
+    Rows come back in the order they were stored.
+    """
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No result store at {path}")
+        self.path = path
+        with self._connect() as con:
+            meta = {key: json.loads(value) for key, value in con.execute("SELECT key, value FROM meta")}
+        self.columns: List[str] = meta['columns']
+        self.indexed: List[str] = meta['indexed']
+        self.missing_columns: List[str] = meta['missing_columns']
+        self.fingerprint: Optional[str] = meta.get('fingerprint')
+
+    def _connect(self):
+        # Read-only; one connection per call, so a store can be shared by threads
+        uri = f"file:{quote(os.path.abspath(self.path))}?mode=ro"
+        return closing(sqlite3.connect(uri, uri=True))
+
+    @property
+    def text_columns(self) -> List[str]:
+        # Stored columns, with text columns in place of their masks
+        names = {mask: text for text, mask in TEXT_COLUMNS.items()}
+        return [names.get(col, col) for col in self.columns]
+
+    def _where(self, domains: Optional[Sequence[str]], reliability_below: Optional[float],
+               reliability_at_least: Optional[float], equals: dict) -> Tuple[str, list]:
+        clauses, params = [], []
+        for col, value in equals.items():
+            if col not in self.columns:
+                raise KeyError(f"Not a stored column: {col}")
+            if value is None:
+                clauses.append(f"{_quote(col)} IS NULL")
+            elif isinstance(value, (list, tuple, set, frozenset, np.ndarray, pd.Index)):
+                values = [_param(v) for v in value]
+                clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                clauses.append(f"{_quote(col)} = ?")
+                params.append(_param(value))
+        if domains:
+            masks = domain_masks(domains)
+            clauses.append(f"domainMask IN ({', '.join(map(str, masks))})")
+        if reliability_below is not None:
+            clauses.append("Reliability < ?")
+            params.append(_param(reliability_below))
+        if reliability_at_least is not None:
+            clauses.append("Reliability >= ?")
+            params.append(_param(reliability_at_least))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, domains: Optional[Sequence[str]] = None, reliability_below: Optional[float] = None,
+              reliability_at_least: Optional[float] = None, **equals) -> int:
+        where, params = self._where(domains, reliability_below, reliability_at_least, equals)
+        with self._connect() as con:
+            return con.execute(f"SELECT COUNT(*) FROM {TABLE}{where}", params).fetchone()[0]
+
+    def iter_query(self, columns: Optional[List[str]] = None, chunksize: int = 100_000,
+                   domains: Optional[Sequence[str]] = None, reliability_below: Optional[float] = None,
+                   reliability_at_least: Optional[float] = None, **equals) -> Iterator[pd.DataFrame]:
+        # Matching rows, `chunksize` at a time; `columns` default to text_columns
+        columns = self.text_columns if columns is None else list(columns)
+        stored = list(dict.fromkeys(col if col in self.columns else TEXT_COLUMNS.get(col, col) for col in columns))
+        unknown = [col for col in stored if col not in self.columns]
+        if unknown:
+            raise KeyError(f"Not stored columns: {', '.join(map(str, unknown))}")
+        where, params = self._where(domains, reliability_below, reliability_at_least, equals)
+        sql = f"SELECT {', '.join(map(_quote, stored))} FROM {TABLE}{where} ORDER BY rowid"
+        with self._connect() as con:
+            cursor = con.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    return
+                frame = pd.DataFrame.from_records(rows, columns=stored)
+                frame.attrs['missing_columns'] = self.missing_columns
+                yield select_columns(frame, columns)
+
+    def query(self, columns: Optional[List[str]] = None, domains: Optional[Sequence[str]] = None,
+              reliability_below: Optional[float] = None, reliability_at_least: Optional[float] = None,
+              **equals) -> pd.DataFrame:
+        chunks = list(self.iter_query(columns, domains=domains, reliability_below=reliability_below,
+                                      reliability_at_least=reliability_at_least, **equals))
+        if not chunks:
+            return pd.DataFrame(columns=self.text_columns if columns is None else list(columns))
+        return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
+    def export(self, path, columns: Optional[List[str]] = None, chunksize: int = 100_000,
+               fmt: Optional[str] = None, domains: Optional[Sequence[str]] = None,
+               reliability_below: Optional[float] = None, reliability_at_least: Optional[float] = None,
+               **equals) -> int:
+        # Matching rows to a CSV, Parquet or Feather file; returns the row count
+        columns = self.text_columns if columns is None else list(columns)
+        with TableWriter(path, columns, fmt) as writer:
+            for chunk in self.iter_query(columns, chunksize, domains, reliability_below, reliability_at_least,
+                                         **equals):
+                writer.write(chunk)
+        return writer.rows
+
+    # --- Building ---
+
+    @classmethod
+    def create(cls, path: str, results: Iterable[pd.DataFrame], index: Sequence[str] = (),
+               fingerprint: Optional[str] = None) -> "ResultStore":
+        """
+        Write classified frames (``text=False`` results, or column selections
+        of them that keep ``domainMask`` and ``Reliability``) to a new store
+        at `path`, replacing any file there. `index` names further columns to
+        index.
+        """
+        tmp = f"{path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        columns, missing_columns = None, None
+        try:
+            with closing(sqlite3.connect(tmp)) as con:
+                for frame in results:
+                    if columns is None:
+                        columns = [str(col) for col in frame.columns]
+                        lacking = [col for col in INDEXED_COLUMNS + list(index) if col not in columns]
+                        if lacking:
+                            raise ValueError(f"Results lack indexed columns: {', '.join(lacking)}"
+                                             " (classify with text=False)")
+                        missing_columns = frame.attrs.get('missing_columns', [])
+                    frame.to_sql(TABLE, con, if_exists="append", index=False)
+                if columns is None:
+                    raise ValueError("No results to store")
+                indexed = list(dict.fromkeys(INDEXED_COLUMNS + list(index)))
+                for col in indexed:
+                    con.execute(f"CREATE INDEX {_quote('ix_' + col)} ON {TABLE} ({_quote(col)})")
+                # Index statistics, so the planner picks the most selective index
+                con.execute("ANALYZE")
+                con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+                meta = {'columns': columns, 'indexed': indexed, 'missing_columns': missing_columns,
+                        'fingerprint': fingerprint}
+                con.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in meta.items()])
+                con.commit()
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return cls(path)
+
+
+def build_store(input_path, path: str, config=None, passthrough: Optional[List[str]] = None,
+                index: Sequence[str] = (), chunksize: int = 100_000, input_format: Optional[str] = None,
+                **criteria) -> ResultStore:
+    """
+    Classify a table chunk by chunk into a new ResultStore at `path`.
+
+    `input_path` is a CSV, Parquet or Feather file (or a DataFrame). The
+    store keeps every PD_MCIx output column except the ``*_vec`` copies of
+    the test scores, plus the input columns in `passthrough` and `index`;
+    the `index` columns are also indexed. Criteria are given as `config` or
+    as PD_MCIx keyword arguments.
+    """
+    plan = resolve_plan(config, **criteria)
+    extra = list(dict.fromkeys(list(passthrough or []) + list(index)))
+    columns = list(dict.fromkeys(plan.input_columns + extra))
+
+    def classified():
+        for chunk in iter_table(input_path, chunksize, columns, fmt=input_format):
+            result = plan.apply(chunk, text=False)
+            derived = [col for col in result.columns if col not in chunk.columns and not col.endswith('_vec')]
+            yield select_columns(result, extra + derived)
+
+    return ResultStore.create(path, classified(), index, plan.fingerprint)
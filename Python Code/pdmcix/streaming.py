@@ -0,0 +1,107 @@
+import pandas as pd
+from functools import partial
+from typing import IO, Callable, Optional, List, Union
+
+from .core import select_columns
+from .criteria import CriteriaPlan, resolve_plan
+from .formats import TableWriter, _is_stream, iter_table, read_schema
+from .parallel import imap_ordered
+from .partitioned import _float_flags
+
+# Chunked file-to-file classification for files that do not fit in memory
+
+STREAM_OUTPUT_COLS = ['AutoDx', 'amnesticStatus', 'multipleSingle', 'Reliability']
+
+
+def _classify_chunk(chunk: pd.DataFrame, output_cols: List[str], plan: CriteriaPlan,
+                    compact: bool = False) -> pd.DataFrame:
+    # Text columns are only rendered when they are written. The *_impaired
+    # flags are always float64, so every chunk writes them alike
+    result = plan.apply(chunk, compact=compact, text=False)
+    return select_columns(result if compact else _float_flags(result), output_cols, compact)
+
+
+def PD_MCIx_stream(input_path: Union[str, pd.DataFrame, IO], output_path: Union[str, IO],
+                   chunksize: int = 100_000, output_cols: Optional[List[str]] = None, workers: int = 1,
+                   config=None, compact: bool = False, progress: Optional[Callable[[int], None]] = None,
+                   input_format: Optional[str] = None, output_format: Optional[str] = None,
+                   on_chunk: Optional[Callable[[pd.DataFrame], None]] = None, **criteria) -> int:
+    """
+    Classify a file chunk by chunk and append the results to `output_path`.
+
+    Every PD-MCIx rule is per-patient, so each chunk is classified independently
+    and the written rows match an in-memory PD_MCIx call on the whole file.
+    The per-test and per-domain ``*_impaired`` flags are written as floats in
+    every chunk, as PD_MCIx writes them when any of them is missing (it writes
+    integers only when none is missing anywhere in the data).
+    Peak memory is bounded by `chunksize`. Only the columns the criteria read,
+    plus any input columns named in `output_cols`, are loaded.
+
+    Parameters
+    ----------
+    input_path, output_path : str or file object
+        Source and destination files: CSV, Parquet (.parquet, .pq) or Feather
+        (.feather, .arrow, .ipc), chosen by extension. Columnar formats
+        need pyarrow. `input_path` may also be an already loaded DataFrame.
+        Open streams (e.g. ``sys.stdin.buffer``) are accepted when the
+        matching `input_format` / `output_format` is given; a columnar input
+        stream is read whole before classification starts.
+    chunksize : int
+        Rows read and classified per chunk.
+    output_cols : list, optional
+        Columns of the PD_MCIx output to write (input columns such as a patient
+        ID may be included). Defaults to AutoDx, amnesticStatus, multipleSingle
+        and Reliability.
+    workers : int
+        Number of processes classifying chunks concurrently. Chunks are still
+        written in input order; at most ``2 * workers`` are held in memory.
+    config : CriteriaConfig, CriteriaPlan, dict or str, optional
+        Criteria to apply (a config file path is loaded). Compiled once for
+        all chunks.
+    compact : bool
+        Classify in compact mode (see ``PD_MCIx(compact=True)``). In either
+        mode ``missingMask`` / ``domainMask`` may be written in place of the
+        ``missingValues`` / ``multipleSingleDomain`` text; text columns are
+        only built when they are written.
+    progress : callable, optional
+        Called with the number of rows written so far after every chunk. An
+        exception raised by it stops the run (e.g. to cancel a job).
+    input_format, output_format : {"csv", "parquet", "feather"}, optional
+        Override the format implied by the file extension.
+    on_chunk : callable, optional
+        Called with each classified chunk (its `output_cols`) before it is
+        written, e.g. to keep the results (see ``ResultCache.stream``).
+    **criteria
+        PD_MCIx keyword arguments, used when `config` is not given.
+
+    Returns
+    -------
+    int
+        Number of rows written.
+    """
+    if output_cols is None:
+        output_cols = STREAM_OUTPUT_COLS
+    plan = resolve_plan(config, **criteria)
+
+    if _is_stream(input_path):
+        # No schema before reading: filter to the used columns as chunks
+        # arrive; a missing criteria column fails on the first chunk
+        columns = list(dict.fromkeys(plan.input_columns + output_cols))
+    else:
+        # Check the schema up front, then read just the columns that are used
+        schema = pd.Index(read_schema(input_path))
+        plan.bind(schema)
+        passthrough = [col for col in output_cols if col in schema]
+        columns = [col for col in schema if col in set(plan.input_columns + passthrough)]
+
+    chunks = iter_table(input_path, chunksize, columns, fmt=input_format)
+    with TableWriter(output_path, output_cols, fmt=output_format) as writer:
+        classify = partial(_classify_chunk, output_cols=output_cols, plan=plan, compact=compact)
+        results = map(classify, chunks) if workers == 1 else imap_ordered(classify, chunks, workers)
+        for result in results:
+            if on_chunk is not None:
+                on_chunk(result)
+            writer.write(result)
+            if progress is not None:
+                progress(writer.rows)
+    return writer.rows
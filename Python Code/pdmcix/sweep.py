@@ -0,0 +1,223 @@
+from itertools import product
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .core import match_series
+from .criteria import CriteriaConfig, CriteriaPlan, PRIMARY_TESTS, resolve_config, resolve_plan
+
+# Criteria sweeps: AutoDx for many criteria variants in one pass over the data.
+#
+# Variants are grouped per test / response slot by everything except the
+# cutoff. Each group ranks its column once against the sorted distinct
+# cutoffs, and the NP, subjective and functional rules are then evaluated
+# on (rows x variants) matrices, one block of rows at a time.
+
+# AutoDx indexed by 4 * NP_impaired + 2 * Subjective_impaired + Functional_impaired;
+# the same table as the AutoDx np.select in apply_plan
+AUTODX = np.array([0, 0, 0, 0, 1, 0, 1, 1], dtype=np.int8)
+
+# Cells of a (rows x variants) matrix evaluated at a time
+BLOCK_CELLS = 1 << 21
+
+
+def cutoff_grid(config, grid: Mapping[Union[str, Tuple[str, ...]], Sequence[Any]]) -> Dict[tuple, CriteriaConfig]:
+    """
+    Every combination of PD_MCIx keyword values in `grid`, applied to `config`.
+
+    Keys are PD_MCIx keyword names such as ``memoryOne_cutoff`` or
+    ``subjectiveOne_cutoff_direction``; a tuple of names sets them all to the
+    same value (e.g. one SD cutoff for every test). Returns
+    ``{(value, ...): CriteriaConfig}`` in grid order.
+    """
+    base = resolve_config(config).to_kwargs()
+    variants = {}
+    for values in product(*grid.values()):
+        kwargs = dict(base)
+        for key, value in zip(grid, values):
+            for name in ((key,) if isinstance(key, str) else key):
+                kwargs[name] = value
+        variants[values] = CriteriaConfig.from_kwargs(**kwargs)
+    return variants
+
+
+def _at_most(x: np.ndarray, cutoffs: np.ndarray) -> np.ndarray:
+    # x <= cutoff per variant, via one rank of x among the sorted distinct
+    # cutoffs; a single distinct cutoff gives a (rows, 1) column
+    distinct, which = np.unique(cutoffs, return_inverse=True)
+    flags = np.searchsorted(distinct, x, side="left")[:, None] <= np.arange(len(distinct))
+    return flags if len(distinct) == 1 else flags[:, which]
+
+
+def _at_least(x: np.ndarray, cutoffs: np.ndarray) -> np.ndarray:
+    distinct, which = np.unique(cutoffs, return_inverse=True)
+    flags = np.searchsorted(distinct, x, side="right")[:, None] > np.arange(len(distinct))
+    flags &= ~np.isnan(x)[:, None]
+    return flags if len(distinct) == 1 else flags[:, which]
+
+
+def _groups(keys: List[Hashable]) -> Dict[Hashable, np.ndarray]:
+    # key -> indices of the variants sharing it
+    groups = {}
+    for i, key in enumerate(keys):
+        groups.setdefault(key, []).append(i)
+    return {key: np.array(idx) for key, idx in groups.items()}
+
+
+def _combine(parts: List[Tuple[np.ndarray, np.ndarray]], n_variants: int) -> np.ndarray:
+    # Per-group (idx, values) into one (rows, variants) matrix; values shared
+    # by every variant stay a (rows, 1) column and are broadcast later
+    if len(parts) == 1:
+        return parts[0][1]
+    first = parts[0][1]
+    out = np.empty((len(first), n_variants), dtype=first.dtype)
+    for idx, values in parts:
+        out[:, idx] = values
+    return out
+
+
+def sweep_autodx(df: pd.DataFrame, plans: Sequence[CriteriaPlan], block_cells: int = BLOCK_CELLS) -> np.ndarray:
+    # (rows, variants) int8 AutoDx matrix
+    n_variants = len(plans)
+    for plan in plans:
+        plan.bind(df.columns)
+    norms = plans[0].norms
+    if any((plan.norms is None) != (norms is None) or (norms is not None and plan.norms.key != norms.key)
+           for plan in plans):
+        raise ValueError("Swept criteria must share the same norms")
+
+    tests = []
+    for i in range(len(PRIMARY_TESTS)):
+        keys = [(plan.primary_cols[i], plan.fallback_cols[i]) for plan in plans]
+        cutoffs = np.array([plan.cutoffs[i] for plan in plans])
+        fallback_cutoffs = np.array([plan.fallback_cutoffs[i] for plan in plans])
+        tests.append([(key, idx, cutoffs[idx], fallback_cutoffs[idx]) for key, idx in _groups(keys).items()])
+
+    responses = {"Subjective": [], "Functional": []}
+    for j, first in enumerate(plans[0].responses):
+        # Everything but the cutoff identifies a group
+        keys = [(r.type, r.columns, r.less, r.values, r.match)
+                for r in (plan.responses[j] for plan in plans)]
+        cutoffs = np.array([plan.responses[j].cutoff if plan.responses[j].type == "standalone" else np.nan
+                            for plan in plans], dtype=float)
+        kind = "Subjective" if first.base_name.startswith("Subjective") else "Functional"
+        responses[kind].append([(key, idx, cutoffs[idx]) for key, idx in _groups(keys).items()])
+
+    out = np.empty((len(df), n_variants), dtype=np.int8)
+    block_rows = max(1, block_cells // max(n_variants, 1))
+    for start in range(0, len(df), block_rows):
+        block = df.iloc[start:start + block_rows]
+        rows = len(block)
+        values = {}
+
+        def column(name):
+            if name not in values:
+                values[name] = block[name].to_numpy(dtype=float, na_value=np.nan)
+            return values[name]
+
+        def score(name):
+            # Test score column, normed when the criteria have norms
+            if norms is None or name not in norms.columns:
+                return column(name)
+            if (name, "normed") not in values:
+                values[name, "normed"] = norms.convert({name: column(name)}, block)[name]
+            return values[name, "normed"]
+
+        # Neuropsychological impairment and presence per test
+        impaired, present = [], []
+        for groups in tests:
+            flag_parts, found_parts = [], []
+            for (primary_col, fallback_col), idx, cutoffs, fallback_cutoffs in groups:
+                x = score(primary_col)
+                flags = _at_most(x, cutoffs)
+                found = ~np.isnan(x)
+                if fallback_col is not None:
+                    t = score(fallback_col)
+                    use = (~found & ~np.isnan(t))[:, None]
+                    flags = np.where(use, _at_most(t, fallback_cutoffs), flags)
+                    found |= use[:, 0]
+                flag_parts.append((idx, flags))
+                found_parts.append((idx, found[:, None]))
+            impaired.append(_combine(flag_parts, n_variants))
+            present.append(_combine(found_parts, n_variants))
+
+        # NP rule per domain; a domain sum is NaN when either test is missing
+        # and NaN never counts. PRIMARY_TESTS lists each domain's One and Two
+        # tests side by side. Narrow (shared) domains are combined first.
+        domains = sorted(range(0, len(PRIMARY_TESTS), 2),
+                         key=lambda a: max(m.shape[1] for m in impaired[a:a + 2] + present[a:a + 2]))
+        two_in_one = np.zeros((rows, 1), dtype=bool)
+        one_count = np.zeros((rows, 1), dtype=np.int8)
+        for a in domains:
+            b = a + 1
+            two_in_one = two_in_one | (impaired[a] & impaired[b])
+            one_count = one_count + (present[a] & present[b] & (impaired[a] | impaired[b]))
+        np_impaired = two_in_one | (one_count >= 2)
+
+        # Subjective and functional totals skip missing responses
+        flags = {}
+        for kind, slots in responses.items():
+            contributions = []
+            for groups in slots:
+                parts = []
+                for (type_, columns, less, series_values, match), idx, cutoffs in groups:
+                    if type_ == "standalone":
+                        x = column(columns[0])
+                        parts.append((idx, _at_most(x, cutoffs) if less else _at_least(x, cutoffs)))
+                    elif type_ == "series":
+                        parts.append((idx, match_series(block[list(columns)], list(series_values), match)[:, None]))
+                    elif type_ == "OGSame":
+                        parts.append((idx, np.nan_to_num(column(columns[0]))[:, None]))
+                    else:
+                        parts.append((idx, np.zeros((rows, 1))))
+                contributions.append(_combine([(idx, part.astype(float)) for idx, part in parts], n_variants))
+            total = np.zeros((rows, 1))
+            for contribution in sorted(contributions, key=lambda m: m.shape[1]):
+                total = total + contribution
+            flags[kind] = total >= 1
+
+        out[start:start + rows] = AUTODX[4 * np_impaired + 2 * flags["Subjective"] + flags["Functional"]]
+    return out
+
+
+def PD_MCIx_sweep(df: pd.DataFrame, variants: Union[Mapping[Hashable, Any], Sequence[Any], None] = None,
+                  grid: Optional[Mapping[Union[str, Tuple[str, ...]], Sequence[Any]]] = None,
+                  config=None, block_cells: int = BLOCK_CELLS, **criteria) -> pd.DataFrame:
+    """
+    AutoDx for every patient under every criteria variant.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Input data; it is read, never copied or modified.
+    variants : mapping or sequence, optional
+        Criteria variants (CriteriaConfig, CriteriaPlan, dict or file path),
+        as ``{label: criteria}`` or a list labelled 0..n-1.
+    grid : mapping, optional
+        Instead of `variants`: PD_MCIx keyword values to combine over the base
+        criteria given by `config` / `**criteria` (see ``cutoff_grid``).
+    block_cells : int
+        Rows are processed in blocks of about ``block_cells / n_variants``.
+
+    Returns
+    -------
+    DataFrame
+        int8 AutoDx, indexed like `df`, one column per variant. Grid sweeps
+        get MultiIndex columns named by the grid keys.
+    """
+    if (variants is None) == (grid is None):
+        raise ValueError("Give either variants or grid")
+    if grid is not None:
+        variants = cutoff_grid(resolve_config(config, **criteria), grid)
+        labels = pd.MultiIndex.from_tuples(list(variants), names=list(grid))
+    elif isinstance(variants, Mapping):
+        labels = pd.Index(list(variants))
+    else:
+        variants = dict(enumerate(variants))
+        labels = pd.RangeIndex(len(variants))
+    if not variants:
+        raise ValueError("No criteria variants to sweep")
+
+    plans = [resolve_plan(variant) for variant in variants.values()]
+    return pd.DataFrame(sweep_autodx(df, plans, block_cells), index=df.index, columns=labels)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+from .criteria import CriteriaConfig, PRIMARY_TESTS, TERTIARY_TESTS
+
+# Seeded synthetic PD cohorts for benchmarks and demos. Scores share a
+# per-patient latent cognition term so impairments cluster the way they do
+# in real cohorts; nothing here is calibrated to published norms.
+
+COMORBIDITIES = [
+    "Hypertension", "Diabetes", "Depression", "Anxiety", "Sleep apnea", "REM sleep behavior disorder",
+    "Orthostatic hypotension", "Hyperlipidemia", "Coronary artery disease", "Atrial fibrillation",
+    "Stroke", "TIA", "Hypothyroidism", "Chronic kidney disease", "COPD", "Osteoporosis",
+    "Osteoarthritis", "Hearing loss", "Cataract", "Macular degeneration", "Constipation",
+    "Urinary incontinence", "Benign prostatic hyperplasia", "Peripheral neuropathy", "Migraine",
+    "Epilepsy", "Traumatic brain injury", "Alcohol use disorder", "B12 deficiency", "Anemia",
+    "Heart failure", "Obesity", "Gout", "Psoriasis", "Rheumatoid arthritis", "Glaucoma",
+    "Restless legs syndrome", "Apathy", "Psychosis", "Impulse control disorder",
+]
+
+LIKERT_ITEMS = 4
+
+
+def synthetic_cohort(n: int, seed: int = 0, missing_rate: float = 0.05, tertiary_rate: float = 0.5,
+                     n_comorb: int = 10, comorb_rate: float = 0.15) -> Tuple[pd.DataFrame, CriteriaConfig]:
+    """
+    Generate `n` synthetic patients and matching PD-MCIx criteria.
+
+    Neuropsychological tests alternate between z-scores (cutoff -1.5) and
+    scaled scores (mean 10, SD 3, cutoff 6). Each domain's tertiary test is
+    observed for a `tertiary_rate` fraction of patients. The subjective
+    block uses one criterion of each type (standalone in both directions,
+    series over Likert items, OGSame); the functional block uses standalone,
+    series and OGSame. `n_comorb` sparse comorb_* text columns are added for
+    comorbidityIdentifier.
+    """
+    rng = np.random.default_rng(seed)
+    cognition = rng.normal(-0.4, 0.8, n)
+    data = {'patient_id': np.arange(n, dtype=np.int64)}
+
+    def score(col: str, scaled: bool, observed_rate: float):
+        z = 0.7 * cognition + rng.normal(0, 0.7, n)
+        values = (10 + 3 * z).round() if scaled else z.round(2)
+        values[rng.random(n) > observed_rate] = np.nan
+        data[col] = values
+
+    tests = {}
+    for i, name in enumerate(PRIMARY_TESTS):
+        scaled = i % 2 == 1
+        score(f"np_{name}", scaled, 1 - missing_rate)
+        tests[name] = {'column': f"np_{name}", 'cutoff': 6 if scaled else -1.5}
+    for name in TERTIARY_TESTS:
+        score(f"np_{name}", False, tertiary_rate)
+        tests[name] = {'column': f"np_{name}", 'cutoff': -1.5}
+
+    # Subjective and functional responses worsen with lower cognition
+    concern = -cognition + rng.normal(0, 1, n)
+    data['subj_cfq'] = np.clip(3 - concern, 0, 5).round(2)
+    data['subj_pdq'] = np.clip(50 + 10 * concern, 0, 100).round()
+    for item in range(LIKERT_ITEMS):
+        data[f"subj_item{item + 1}"] = np.clip(np.round(concern + rng.normal(0, 1, n) + 1), 0, 4).astype(np.int8)
+    data['subj_complaint'] = (concern > 1).astype(np.int8)
+    data['func_faq'] = np.clip(np.round(2 + 2 * concern + rng.normal(0, 2, n)), 0, 30)
+    for item in range(LIKERT_ITEMS):
+        data[f"func_iadl{item + 1}"] = np.clip(np.round(concern + rng.normal(0, 1, n)), 0, 4).astype(np.int8)
+    data['func_impaired'] = (concern > 1.5).astype(np.int8)
+    for col in ('subj_cfq', 'subj_pdq', 'func_faq'):
+        data[col][rng.random(n) < missing_rate] = np.nan
+
+    vocabulary = np.array(COMORBIDITIES + [None], dtype=object)
+    for i in range(n_comorb):
+        codes = rng.integers(0, len(COMORBIDITIES), n)
+        codes[rng.random(n) > comorb_rate] = len(COMORBIDITIES)
+        data[f"comorb_{i + 1}"] = vocabulary[codes]
+
+    config = CriteriaConfig.from_dict({
+        'tests': tests,
+        'subjective': [
+            {'type': "standalone", 'column': 'subj_cfq', 'cutoff': 1.5, 'direction': "less"},
+            {'type': "standalone", 'column': 'subj_pdq', 'cutoff': 70, 'direction': "greater"},
+            {'type': "series", 'columns': [f"subj_item{i + 1}" for i in range(LIKERT_ITEMS)],
+             'values': [3, 4], 'match': "any"},
+            {'type': "OGSame", 'column': 'subj_complaint'},
+        ],
+        'functional': [
+            {'type': "standalone", 'column': 'func_faq', 'cutoff': 9, 'direction': "greater"},
+            {'type': "series", 'columns': [f"func_iadl{i + 1}" for i in range(LIKERT_ITEMS)],
+             'values': [3, 4], 'match': "all"},
+            {'type': "OGSame", 'column': 'func_impaired'},
+        ],
+    })
+    return pd.DataFrame(data), config
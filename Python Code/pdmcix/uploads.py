@@ -0,0 +1,165 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .formats import _pyarrow, count_rows, file_hash, head_table, read_schema, table_format
+
+# Per-upload cache for the web app. An upload is parsed once, keyed by the
+# hash of its contents, and later interactions (preview, validation, the
+# classification job) reuse the result. Looking an upload up only reads its
+# schema and first rows, so the preview is quick however large the file is.
+# CSV uploads whose parsed size is estimated to fit an LRU memory budget are
+# then parsed in full on a background thread; Parquet and Feather uploads are
+# not loaded at all, since their schema is in the file and columns can be
+# read selectively.
+
+# Rows sampled to estimate the in-memory size of a parsed CSV
+SAMPLE_ROWS = 1000
+
+
+@dataclass
+class Upload:
+    key: str
+    path: str
+    columns: List[str]
+    # Exact pandas dtypes when known (parsed CSV or columnar schema), else None
+    dtypes: Optional[Dict[str, str]]
+    rows: Optional[int]
+    # Parsed data once it has been parsed (only when it fits the budget);
+    # until then classification reads `path`
+    frame: Optional[pd.DataFrame] = None
+    nbytes: int = 0
+    # The background parse, if one was started
+    parsing: Optional[Future] = field(default=None, repr=False, compare=False)
+
+    @property
+    def source(self):
+        # What to hand to PD_MCIx_stream / iter_table
+        return self.frame if self.frame is not None else self.path
+
+    def head(self, rows: int = 5) -> pd.DataFrame:
+        if self.frame is not None:
+            return self.frame.head(rows)
+        return head_table(self.path, rows)
+
+
+class UploadCache:
+    """
+    LRU cache of parsed uploads, keyed by content hash.
+
+    ``get`` returns the schema of an upload without parsing it. CSV uploads
+    whose parsed size (estimated from their first rows) fits `budget_bytes`
+    are then parsed into a DataFrame on a background thread; least recently
+    used frames are dropped (their schema is kept) once the frames together
+    exceed the budget. At most `max_entries` uploads, and as many upload
+    paths, are remembered.
+    """
+
+    def __init__(self, budget_bytes: int = 1 << 30, max_entries: int = 256):
+        self.budget_bytes = budget_bytes
+        self.max_entries = max_entries
+        self._parser = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdmcix-upload")
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Upload]" = OrderedDict()
+        # path -> (size, mtime, key), so a re-sent path is not hashed again;
+        # least recently used first, and only for keys still in _entries
+        self._seen: "OrderedDict[str, Tuple[int, float, str]]" = OrderedDict()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def get(self, path: str) -> Upload:
+        stat = os.stat(path)
+        with self._lock:
+            seen = self._seen.get(path)
+        if seen is not None and seen[:2] == (stat.st_size, stat.st_mtime):
+            key = seen[2]
+        else:
+            key = file_hash(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Same contents, possibly uploaded again under a new temp path
+                entry.path = path
+                self._entries.move_to_end(key)
+                self._remember(path, stat, key)
+                return entry
+
+        entry = self._load(key, path, stat.st_size)
+        with self._lock:
+            self._entries[key] = entry
+            self._remember(path, stat, key)
+            self._evict()
+        if table_format(path) == "csv" and estimate_csv_bytes(path, stat.st_size) <= self.budget_bytes:
+            entry.parsing = self._parser.submit(self._parse, entry)
+        return entry
+
+    def _load(self, key: str, path: str, size: int) -> Upload:
+        fmt = table_format(path)
+        if fmt != "csv":
+            pa = _pyarrow()
+            if fmt == "parquet":
+                schema = pa.parquet.read_schema(path)
+            else:
+                with pa.memory_map(path) as source:
+                    schema = pa.ipc.open_file(source).schema
+            # Via pandas, so a stored pandas index is not listed as a column
+            dtypes = schema.empty_table().to_pandas().dtypes
+            return Upload(key, path, list(dtypes.index), dtypes.astype(str).to_dict(), count_rows(path))
+        return Upload(key, path, read_schema(path), None, None)
+
+    def _parse(self, entry: Upload):
+        # Background thread: the whole CSV, kept if the entry is still cached
+        frame = pd.read_csv(entry.path)
+        with self._lock:
+            if self._entries.get(entry.key) is not entry:
+                return
+            entry.dtypes, entry.rows = frame.dtypes.astype(str).to_dict(), len(frame)
+            entry.frame, entry.nbytes = frame, int(frame.memory_usage(deep=True).sum())
+            self._evict()
+
+    def _remember(self, path: str, stat: os.stat_result, key: str):
+        # At most max_entries paths, oldest dropped first: an upload re-sent
+        # under many temp paths has one entry but a path for each
+        self._seen[path] = (stat.st_size, stat.st_mtime, key)
+        self._seen.move_to_end(path)
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        # Paths go with their entries
+        for path in [path for path, seen in self._seen.items() if seen[2] not in self._entries]:
+            del self._seen[path]
+        # Drop frames, oldest first, until the budget holds; the newest frame
+        # is kept even when it alone is over budget
+        total = self.nbytes
+        for entry in list(self._entries.values())[:-1]:
+            if total <= self.budget_bytes:
+                break
+            if entry.frame is not None:
+                total -= entry.nbytes
+                entry.frame, entry.nbytes = None, 0
+
+
+def estimate_csv_bytes(path: str, size: int, rows: int = SAMPLE_ROWS) -> int:
+    # In-memory size of the parsed CSV, extrapolated from its first `rows`
+    # rows; a frame is often several times larger than its file (object
+    # columns especially), so the file size alone understates it
+    with open(path, "rb") as f:
+        lines = list(islice(f, rows + 1))
+    body = sum(len(line) for line in lines[1:])
+    if not body:
+        return 0
+    sample = pd.read_csv(io.BytesIO(b"".join(lines)))
+    return int(sample.memory_usage(deep=True).sum() / body * (size - len(lines[0])))
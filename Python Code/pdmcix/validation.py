@@ -0,0 +1,128 @@
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Agreement between AutoDx and a reference (e.g. clinician) diagnosis, as
+# reported in the validation study: Cohen's kappa, accuracy and the
+# confusion matrix, overall and per subgroup.
+#
+# Both metrics depend only on the confusion counts, so resampling patients
+# with replacement is the same as drawing the counts from a multinomial over
+# the confusion cells. The bootstrap therefore draws one (resamples x cells)
+# count matrix rather than a (resamples x patients) index matrix.
+
+SUBGROUPS = ('amnesticStatus', 'multipleSingle')
+
+
+def _pairs(auto: pd.Series, reference: pd.Series) -> Tuple[np.ndarray, np.ndarray, pd.Index]:
+    # Codes for both ratings over a shared label set; pairs with a missing side are dropped
+    keep = auto.notna().to_numpy() & reference.notna().to_numpy()
+    auto, reference = auto[keep], reference[keep]
+    labels = pd.Index(pd.concat([auto, reference], ignore_index=True).unique()).sort_values()
+    return labels.get_indexer(auto), labels.get_indexer(reference), labels
+
+
+def _counts(auto_codes: np.ndarray, reference_codes: np.ndarray, k: int) -> np.ndarray:
+    return np.bincount(reference_codes * k + auto_codes, minlength=k * k).reshape(k, k)
+
+
+def _kappa(counts: np.ndarray) -> np.ndarray:
+    # Cohen's kappa for (..., k, k) confusion counts; NaN where it is undefined
+    n = counts.sum(axis=(-2, -1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        observed = np.trace(counts, axis1=-2, axis2=-1) / n
+        expected = (counts.sum(axis=-1) * counts.sum(axis=-2)).sum(axis=-1) / n ** 2
+        return (observed - expected) / (1 - expected)
+
+
+def _accuracy(counts: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.trace(counts, axis1=-2, axis2=-1) / counts.sum(axis=(-2, -1))
+
+
+def confusion_matrix(auto: pd.Series, reference: pd.Series) -> pd.DataFrame:
+    """Counts of reference (rows) against AutoDx (columns); incomplete pairs are dropped."""
+    auto_codes, reference_codes, labels = _pairs(auto, reference)
+    counts = _counts(auto_codes, reference_codes, len(labels))
+    return pd.DataFrame(counts, index=pd.Index(labels, name='reference'), columns=pd.Index(labels, name='AutoDx'))
+
+
+def cohen_kappa(auto: pd.Series, reference: pd.Series) -> float:
+    auto_codes, reference_codes, labels = _pairs(auto, reference)
+    return float(_kappa(_counts(auto_codes, reference_codes, len(labels))))
+
+
+def bootstrap(counts: np.ndarray, n_boot: int, ci: float = 0.95,
+              rng: Optional[np.random.Generator] = None) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    # Percentile intervals for (accuracy, kappa) from one (n_boot x cells) draw
+    rng = np.random.default_rng(rng)
+    n = int(counts.sum())
+    if n == 0:
+        return (np.nan, np.nan), (np.nan, np.nan)
+    k = counts.shape[0]
+    draws = rng.multinomial(n, counts.ravel() / n, size=n_boot).reshape(n_boot, k, k)
+    tails = [50 * (1 - ci), 50 * (1 + ci)]
+    intervals = []
+    for values in (_accuracy(draws), _kappa(draws)):
+        # kappa is undefined in resamples where both raters give one label
+        values = values[~np.isnan(values)]
+        intervals.append(tuple(np.percentile(values, tails)) if len(values) else (np.nan, np.nan))
+    return intervals[0], intervals[1]
+
+
+def agreement(df: pd.DataFrame, reference: Union[str, pd.Series], auto_col: str = 'AutoDx',
+              by: Sequence[str] = SUBGROUPS, n_boot: int = 0, ci: float = 0.95,
+              seed: Optional[int] = None) -> pd.DataFrame:
+    """
+    Agreement of `auto_col` with a reference diagnosis, overall and per subgroup.
+
+    Parameters
+    ----------
+    df : DataFrame
+        PD_MCIx output.
+    reference : str or Series
+        Reference diagnosis column in `df`, or a Series aligned with it, on
+        the same label scale as AutoDx (0 = no PD-MCI, 1 = PD-MCI).
+    by : sequence of str
+        Output columns to break the results down by (default amnesticStatus
+        and multipleSingle); pass () for the overall row only.
+    n_boot : int
+        Bootstrap resamples for percentile confidence intervals (0 = none).
+        Each subgroup is resampled within itself.
+    ci : float
+        Confidence level of the intervals.
+    seed : int, optional
+        Seed for the bootstrap.
+
+    Returns
+    -------
+    DataFrame
+        Indexed by (group, value), with the overall row at ('all', 'all'):
+        n, accuracy, kappa and, with `n_boot`, their ci_low/ci_high bounds.
+        Patients missing either rating are excluded.
+    """
+    auto = df[auto_col]
+    reference = df[reference] if isinstance(reference, str) else reference.reindex(df.index)
+    auto_codes, reference_codes, labels = _pairs(auto, reference)
+    complete = auto.notna().to_numpy() & reference.notna().to_numpy()
+    k = len(labels)
+
+    groups = [('all', 'all', np.ones(len(auto_codes), dtype=bool))]
+    for col in by:
+        values = df[col][complete]
+        for value in pd.unique(values):
+            groups.append((col, value, (values == value).to_numpy()))
+
+    rng = np.random.default_rng(seed)
+    rows = []
+    for group, value, mask in groups:
+        counts = _counts(auto_codes[mask], reference_codes[mask], k)
+        row = {'group': group, 'value': value, 'n': int(counts.sum())}
+        intervals = bootstrap(counts, n_boot, ci, rng) if n_boot else None
+        for i, (metric, func) in enumerate((('accuracy', _accuracy), ('kappa', _kappa))):
+            row[metric] = float(func(counts))
+            if intervals:
+                row[f"{metric}_ci_low"], row[f"{metric}_ci_high"] = intervals[i]
+        rows.append(row)
+    return pd.DataFrame(rows).set_index(['group', 'value'])
@@ -1,7 +1,20 @@
-import gradio as gr
+import os
+import secrets
+import sys
+import time
 import pandas as pd
 import tempfile
-from autoDX import PD_MCIx
+from functools import partial
+
+# gradio is imported by the UI code that needs it, and the UI, job queue and
+# caches (with their directories) are only created by build_app(), so the
+# handlers below can be imported (e.g. for testing) without starting anything
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdmcix import CriteriaConfig, NeuropsychTest, ResponseCriterion, ResultCache
+from pdmcix.formats import count_rows, head_table
+from pdmcix.jobs import DONE, FINISHED, JobQueue
+from pdmcix.uploads import UploadCache
 
 test_type_options = ["Cutoff", "Series", "Already binary in data"]
 DOMAINS = ['Attention', 'Language', 'Executive Function', 'Memory', 'Visuospatial']
@@ -12,16 +25,92 @@ NP_TEST_INPUT_COUNT = 2
 NUM_FUNC_TESTS = 4
 NUM_SUBJ_TESTS = 4
 
-objective_inputs = []
-subjective_inputs = []
-functional_inputs = []
+# PD_MCIx keyword prefixes for the UI domains and test slots
+DOMAIN_PARAMS = {'Attention': 'attention', 'Language': 'language', 'Executive Function': 'execuFunc',
+                 'Memory': 'memory', 'Visuospatial': 'visuoSpat'}
+ORDINALS = ['One', 'Two']
+OUTPUT_COLS = ['NP_impaired', 'Subjective_impaired', 'Functional_impaired', 'AutoDx', 'amnesticStatus',
+               'multipleSingle', 'multipleSingleDomain', 'Reliability', 'missingValues']
+CHUNKSIZE = 50_000
+UPLOAD_TYPES = [".csv", ".parquet", ".feather", ".arrow"]
+OUTPUT_FORMATS = {'CSV': ".csv", 'Parquet': ".parquet", 'Feather': ".feather"}
+
+# Classification runs in background jobs, at most MAX_JOBS at a time; results
+# are kept in JOBS_DIR. Jobs belong to the browser that submitted them: it
+# gets a random session token on its first visit, kept in localStorage
+# (gr.BrowserState) so reloading the page finds its jobs again, and only that
+# token can list, watch, cancel or download them
+JOBS_DIR = os.environ.get("PDMCIX_JOBS_DIR", os.path.join(tempfile.gettempdir(), "pdmcix-jobs"))
+MAX_JOBS = int(os.environ.get("PDMCIX_MAX_JOBS", "2"))
+POLL_SECONDS = 0.5
+SESSION_KEY = "pdmcix-session"
+# Uploads, shared by preview, validation and jobs; CSVs whose parsed size fits
+# the budget are parsed in the background and classified from memory
+UPLOAD_BUDGET_MB = int(os.environ.get("PDMCIX_UPLOAD_BUDGET_MB", "1024"))
+
+# Created by build_app(): the job queue, the upload cache and the result cache
+# (classified uploads, so rerunning a job with the same data and criteria skips
+# the classification; budgets: PDMCIX_RESULT_MEMORY_MB / _DISK_MB)
+JOBS = None
+UPLOADS = None
+RESULTS = None
+
+def parse_series_values(text):
+    values = []
+    for item in str(text).split(','):
+        item = item.strip()
+        try:
+            values.append(float(item))
+        except ValueError:
+            values.append(item)
+    return values
+
+def response_criteria(tests):
+    # Map the UI's {'col', 'type', 'val'} rows onto PD-MCIx response criteria
+    criteria = []
+    for i in range(1, 5):
+        test = tests.get(i)
+        if test is None:
+            criteria.append(ResponseCriterion())
+        elif test['type'] == "Cutoff":
+            try:
+                cutoff = float(test['val'])
+            except ValueError:
+                raise ValueError(f"Cutoff for {test['col']} must be a number")
+            criteria.append(ResponseCriterion("standalone", column=test['col'], cutoff=cutoff))
+        elif test['type'] == "Series":
+            # One column checked against a list of values: impaired if any matches
+            criteria.append(ResponseCriterion("series", columns=(test['col'],),
+                                              values=tuple(parse_series_values(test['val'])), match="any"))
+        else:
+            criteria.append(ResponseCriterion("OGSame", column=test['col']))
+    return criteria
+
+def build_criteria(np_tests, subjective_tests, functional_tests):
+    tests = {}
+    for j, (name, cutoff) in enumerate(np_tests):
+        param = f"{DOMAIN_PARAMS[DOMAINS[j // 2]]}{ORDINALS[j % 2]}"
+        try:
+            tests[param] = NeuropsychTest(name, float(cutoff))
+        except ValueError:
+            raise ValueError(f'Cutoff for {TEST_NAMES[j]} must be a number')
+    return CriteriaConfig(tests, response_criteria(subjective_tests), response_criteria(functional_tests))
 
 def save_tests(*args):
+    import gradio as gr
+    session, output_format, args = args[-1], args[-2], args[:-2]
+    if not session:
+        raise gr.Error('Session expired; reload the page')
     if not args[-3]:
-        raise gr.Error('Must upload CSV before running')
-    df = pd.read_csv(args[-3].name)
-    df_columns = df.columns
+        raise gr.Error('Must upload a data file before running')
+    # The upload was parsed (or its schema read) when it was previewed
+    try:
+        upload = UPLOADS.get(args[-3].name)
+    except (ValueError, ImportError) as e:
+        raise gr.Error(str(e))
+    df_columns = upload.columns
     missing = []
+    numeric = []
 
     NP_TEST_STOP = NUM_NP_TESTS * NP_TEST_INPUT_COUNT
     # create structure for Neuropsychological assessment
@@ -33,6 +122,8 @@ def save_tests(*args):
         #    raise gr.Error(f'Missing column name for {TEST_NAMES[j]}')
         if name not in df_columns:
             missing.append(name)
+        else:
+            numeric.append(name)
         #if cutoff == '':
             #raise gr.Error(f'Missing cutoff for {TEST_NAMES[j]}')
         cutoff = args[i+1]
@@ -50,6 +141,8 @@ def save_tests(*args):
             continue
         if args[i] not in df_columns:
             missing.append(args[i])
+        elif args[i+1] == "Cutoff":
+            numeric.append(args[i])
         subjective_tests[j] = {'col': args[i], 'type': args[i+1], 'val': args[i+2]} 
         j+=1
     
@@ -61,21 +154,94 @@ def save_tests(*args):
             continue
         if args[i] not in df_columns:
             missing.append(args[i])
+        elif args[i+1] == "Cutoff":
+            numeric.append(args[i])
         functional_tests[j] = {'col': args[i], 'type': args[i+1], 'val': args[i+2]}
+        j+=1
         
-    #if missing:
-        #raise gr.Error(f"Missing columns in CSV: {', '.join(missing)}")
-    
-    #new_df = PD_MCIx(df, np_tests, subjective_tests, functional_tests)
-    new_df = df
+    if missing:
+        raise gr.Error(f"Missing columns in data: {', '.join(map(str, missing))}")
+    # Cutoffs need numeric columns; only checked when the dtypes are exact
+    if upload.dtypes is not None:
+        text = [col for col in numeric if pd.api.types.pandas_dtype(upload.dtypes[col]).kind not in "biuf"]
+        if text:
+            raise gr.Error(f"Columns compared with a cutoff must be numeric: {', '.join(text)}")
     
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv", mode="w", newline="") as tmp:
-        new_df.to_csv(tmp.name, index=False)
-        tmp_path = tmp.name
+    try:
+        config = build_criteria(np_tests, subjective_tests, functional_tests)
+    except ValueError as e:
+        raise gr.Error(str(e))
+
+    run = partial(classify_job, upload=upload, suffix=OUTPUT_FORMATS[output_format],
+                  output_cols=list(df_columns) + OUTPUT_COLS, config=config)
+    job = JOBS.submit(run, name=os.path.basename(upload.path), total_rows=upload.rows, owner=session)
+    return gr.update(choices=job_choices(session), value=job.id)
+
+def classify_job(job, upload, suffix, output_cols, config):
+    # Runs on a JobQueue worker thread; an upload classified before with the
+    # same criteria is written from the result cache, still chunk by chunk
+    if job.total_rows is None:
+        job.total_rows = upload.rows if upload.rows is not None else count_rows(upload.path)
+    output_path = JOBS.path(job, suffix)
+    RESULTS.stream(upload.key, upload.source, output_path, chunksize=CHUNKSIZE, output_cols=output_cols,
+                   config=config.compile(), progress=job.report)
+    return output_path
+
+def restore_session(token):
+    # The browser's stored token, or a new one when it has none (first visit,
+    # cleared storage) or holds something that is not a token
+    if isinstance(token, str) and len(token) == 32 and all(c in "0123456789abcdef" for c in token):
+        return token
+    return secrets.token_hex(16)
 
-    return gr.update(visible=True), new_df.head(5), tmp_path, gr.update(visible=True)
+def start_session(token):
+    # On every page load; the jobs of the token are the only ones this page sees
+    import gradio as gr
+    token = restore_session(token)
+    return token, gr.update(choices=job_choices(token), value=None)
+
+def job_choices(session):
+    if not session:
+        return []
+    return [(f"{job.name} ({time.strftime('%H:%M', time.localtime(job.submitted))}, {job.status})", job.id)
+            for job in JOBS.jobs(owner=session)]
+
+def describe_job(job):
+    text = f"**{job.name}**: {job.status}"
+    if job.rows or job.total_rows:
+        total = f" / {job.total_rows:,}" if job.total_rows is not None else ""
+        text += f", {job.rows:,}{total} rows"
+    if job.rows_per_second:
+        text += f" ({job.rows_per_second:,.0f} rows/s"
+        text += f", about {job.eta_seconds:.0f}s left)" if job.eta_seconds is not None else ")"
+    if job.error:
+        text += f"\n\n{job.error}"
+    return text
+
+def watch_job(job_id, session):
+    # Streams the job's progress until it finishes, then shows the result
+    import gradio as gr
+    hidden = gr.update(visible=False)
+    job = JOBS.get(job_id, owner=session) if job_id and session else None
+    if job is None:
+        yield "", hidden, hidden
+        return
+    while job.status not in FINISHED:
+        yield describe_job(job), hidden, hidden
+        time.sleep(POLL_SECONDS)
+    if job.status == DONE:
+        yield (describe_job(job), gr.update(visible=True, value=head_table(job.output_path)),
+               gr.update(visible=True, value=job.output_path))
+    else:
+        yield describe_job(job), hidden, hidden
+
+def cancel_job(job_id, session):
+    import gradio as gr
+    if not job_id or not session or not JOBS.cancel(job_id, owner=session):
+        raise gr.Error("No running job selected")
 
 def toggle_input(input_type):
+    import gradio as gr
     if input_type == "Cutoff":
         return gr.Textbox(visible=True, label="", placeholder="Cutoff")
     elif input_type == "Series":
@@ -84,94 +250,130 @@ def toggle_input(input_type):
         return gr.Textbox(visible=False, label="")
 
 
-with gr.Blocks() as demo:
-    gr.Markdown("## 🧠 Test Configuration for Cognitive Domains")
-    gr.Markdown("**Note:** You must enter *two tests* for each of the five domains listed below. "
-                "Each test must include a name, an input type, and a cutoff.")
-
-    for domain in DOMAINS:
-        with gr.Accordion(domain, open=False):
-            for t in range(1, 3):
-                with gr.Row():
-                    name = gr.Textbox(label='Test name in CSV', placeholder=f"{domain} Test {t} Name", scale=3)
-                    value_input = gr.Textbox(label="Cutoff", placeholder="Cutoff", scale=3)
-                    objective_inputs.extend([name, value_input])
-
-    gr.Markdown("## 🧠 Required Subjective & Functional Impairment Tests")
-    gr.Markdown("You must enter **at least one test** (1–4 allowed) for each category below.")
-
-    with gr.Row():
-        with gr.Column():
-            gr.Markdown("### Subjective Impairments")
-            subjective_count = gr.Dropdown(choices=["1", "2", "3", "4"], label="Number of subjective tests", value="1")
-            subjective_container = gr.Column(visible=True)
-            subjective_rows = []
-            for i in range(4):
-                with subjective_container:
-                    with gr.Row(visible=(i == 0)) as row:
-                        name = gr.Textbox(label='Subjective test name in CSV', placeholder=f"Subjective Test {i+1}", scale=3)
-                        test_type = gr.Dropdown(label='Criteria for impairment', choices=test_type_options, value="Cutoff", scale=2)
-                        value_input = gr.Textbox(label="", placeholder="Cutoff", scale=3)
-                        test_type.change(fn=toggle_input, inputs=test_type, outputs=value_input)
-                        subjective_inputs.extend([name, test_type, value_input])
-                    subjective_rows.append(row)
-
-        with gr.Column():
-            gr.Markdown("### Functional Impairments")
-            functional_count = gr.Dropdown(choices=["1", "2", "3", "4"], label="Number of functional tests", value="1")
-            functional_container = gr.Column(visible=True)
-            functional_rows = []
-            for i in range(4):
-                with functional_container:
-                    with gr.Row(visible=(i == 0)) as row:
-                        name = gr.Textbox(label='Functional test name in CSV', placeholder=f"Functional Test {i+1}", scale=3)
-                        test_type = gr.Dropdown(label='Criteria for impairment', choices=test_type_options, value="Cutoff", scale=2)
-                        value_input = gr.Textbox(label="", placeholder="Cutoff", scale=3)
-                        test_type.change(fn=toggle_input, inputs=test_type, outputs=value_input)
-                        functional_inputs.extend([name, test_type, value_input])
-                    functional_rows.append(row)
-
-    # --- Visibility toggles ---
-    def update_subjective_visibility(n):
-        n = int(n)
-        return [gr.update(visible=True)] + [gr.update(visible=i < n) for i in range(4)]
-
-    def update_functional_visibility(n):
-        n = int(n)
-        return [gr.update(visible=True)] + [gr.update(visible=i < n) for i in range(4)]
-
-    subjective_count.change(fn=update_subjective_visibility,
-                            inputs=subjective_count,
-                            outputs=[subjective_container] + subjective_rows)
-
-    functional_count.change(fn=update_functional_visibility,
-                            inputs=functional_count,
-                            outputs=[functional_container] + functional_rows)
-
-    # --- Validation and Submission ---
-    gr.Markdown("## 📂 Upload Clinical CSV Data")
-    gr.Markdown("Upload your patient-level clinical data (CSV format). The column names must match those used above.")
-
-    csv_upload = gr.File(label="Upload CSV File", file_types=[".csv"])
-    csv_preview = gr.Dataframe(label="CSV Preview", visible=False)
-    submit_btn = gr.Button("Submit", interactive=True)    
+def build_app():
+    # The job queue, caches and UI; JOBS_DIR and the cache directories are created here
+    global JOBS, UPLOADS, RESULTS
+    import gradio as gr
+    JOBS = JobQueue(JOBS_DIR, max_workers=MAX_JOBS)
+    UPLOADS = UploadCache(UPLOAD_BUDGET_MB << 20)
+    RESULTS = ResultCache()
 
-    
-    output_df_preview = gr.Dataframe(label="Processed Output", visible=False)
-    output_download = gr.File(label="Download Processed CSV", visible=False)
+    objective_inputs = []
+    column_inputs = []
+    subjective_inputs = []
+    functional_inputs = []
 
-    def show_csv(file):
-        try:
-            df = pd.read_csv(file.name)
-            return gr.update(visible=True), df.head()
-        except Exception as e:
-            return gr.update(visible=False), pd.DataFrame([["Error loading file:", str(e)]])
+    with gr.Blocks() as demo:
+        session = gr.BrowserState(None, storage_key=SESSION_KEY)
+        gr.Markdown("## 🧠 Test Configuration for Cognitive Domains")
+        gr.Markdown("**Note:** You must enter *two tests* for each of the five domains listed below. "
+                    "Each test must include a name, an input type, and a cutoff.")
+
+        for domain in DOMAINS:
+            with gr.Accordion(domain, open=False):
+                for t in range(1, 3):
+                    with gr.Row():
+                        name = gr.Dropdown(label='Test name in data', choices=[], allow_custom_value=True, scale=3)
+                        value_input = gr.Textbox(label="Cutoff", placeholder="Cutoff", scale=3)
+                        objective_inputs.extend([name, value_input])
+                        column_inputs.append(name)
+
+        gr.Markdown("## 🧠 Required Subjective & Functional Impairment Tests")
+        gr.Markdown("You must enter **at least one test** (1–4 allowed) for each category below.")
+
+        with gr.Row():
+            with gr.Column():
+                gr.Markdown("### Subjective Impairments")
+                subjective_count = gr.Dropdown(choices=["1", "2", "3", "4"], label="Number of subjective tests", value="1")
+                subjective_container = gr.Column(visible=True)
+                subjective_rows = []
+                for i in range(4):
+                    with subjective_container:
+                        with gr.Row(visible=(i == 0)) as row:
+                            name = gr.Dropdown(label='Subjective test name in data', choices=[], allow_custom_value=True, scale=3)
+                            column_inputs.append(name)
+                            test_type = gr.Dropdown(label='Criteria for impairment', choices=test_type_options, value="Cutoff", scale=2)
+                            value_input = gr.Textbox(label="", placeholder="Cutoff", scale=3)
+                            test_type.change(fn=toggle_input, inputs=test_type, outputs=value_input)
+                            subjective_inputs.extend([name, test_type, value_input])
+                        subjective_rows.append(row)
+
+            with gr.Column():
+                gr.Markdown("### Functional Impairments")
+                functional_count = gr.Dropdown(choices=["1", "2", "3", "4"], label="Number of functional tests", value="1")
+                functional_container = gr.Column(visible=True)
+                functional_rows = []
+                for i in range(4):
+                    with functional_container:
+                        with gr.Row(visible=(i == 0)) as row:
+                            name = gr.Dropdown(label='Functional test name in data', choices=[], allow_custom_value=True, scale=3)
+                            column_inputs.append(name)
+                            test_type = gr.Dropdown(label='Criteria for impairment', choices=test_type_options, value="Cutoff", scale=2)
+                            value_input = gr.Textbox(label="", placeholder="Cutoff", scale=3)
+                            test_type.change(fn=toggle_input, inputs=test_type, outputs=value_input)
+                            functional_inputs.extend([name, test_type, value_input])
+                        functional_rows.append(row)
+
+        # --- Visibility toggles ---
+        def update_subjective_visibility(n):
+            n = int(n)
+            return [gr.update(visible=True)] + [gr.update(visible=i < n) for i in range(4)]
+
+        def update_functional_visibility(n):
+            n = int(n)
+            return [gr.update(visible=True)] + [gr.update(visible=i < n) for i in range(4)]
 
-    csv_upload.change(fn=show_csv, inputs=csv_upload, outputs=[csv_preview, csv_preview])
+        subjective_count.change(fn=update_subjective_visibility,
+                                inputs=subjective_count,
+                                outputs=[subjective_container] + subjective_rows)
 
-    all_inputs = objective_inputs + subjective_inputs + functional_inputs
+        functional_count.change(fn=update_functional_visibility,
+                                inputs=functional_count,
+                                outputs=[functional_container] + functional_rows)
+
+        # --- Validation and Submission ---
+        gr.Markdown("## 📂 Upload Clinical Data")
+        gr.Markdown("Upload your patient-level clinical data (CSV, Parquet or Feather). "
+                    "The column names must match those used above.")
+
+        csv_upload = gr.File(label="Upload Data File", file_types=UPLOAD_TYPES)
+        csv_preview = gr.Dataframe(label="Data Preview", visible=False)
+        output_format = gr.Dropdown(choices=list(OUTPUT_FORMATS), value="CSV", label="Output format")
+        submit_btn = gr.Button("Submit", interactive=True)    
 
-    submit_btn.click(fn=save_tests, inputs=all_inputs + [csv_upload] + [subjective_count] + [functional_count], outputs=[output_df_preview, output_df_preview, output_download, output_download])
     
+        with gr.Row():
+            job_select = gr.Dropdown(label="Jobs", choices=[], scale=4)
+            cancel_btn = gr.Button("Cancel job", scale=1)
+        job_status = gr.Markdown()
+        output_df_preview = gr.Dataframe(label="Processed Output", visible=False)
+        output_download = gr.File(label="Download Processed Data", visible=False)
+
+        def show_csv(file):
+            # Reads only the upload's schema and first rows (a CSV that fits the budget is then parsed
+            # in the background) and offers its columns in the test-name dropdowns
+            if file is None:
+                return (gr.update(visible=False), None) + (gr.update(choices=[]),) * len(column_inputs)
+            try:
+                upload = UPLOADS.get(file.name)
+            except Exception as e:
+                return ((gr.update(visible=False), pd.DataFrame([["Error loading file:", str(e)]]))
+                        + (gr.update(),) * len(column_inputs))
+            return (gr.update(visible=True), upload.head()) + (gr.update(choices=upload.columns),) * len(column_inputs)
+
+        csv_upload.change(fn=show_csv, inputs=csv_upload, outputs=[csv_preview, csv_preview] + column_inputs)
+
+        all_inputs = objective_inputs + subjective_inputs + functional_inputs
+
+        submit_btn.click(fn=save_tests, inputs=all_inputs + [csv_upload] + [subjective_count] + [functional_count] + [output_format] + [session], outputs=job_select)
+        # Watching only polls the job; concurrency_limit=None keeps users from queueing behind each other
+        job_select.change(fn=watch_job, inputs=[job_select, session],
+                          outputs=[job_status, output_df_preview, output_download], concurrency_limit=None)
+        cancel_btn.click(fn=cancel_job, inputs=[job_select, session])
+        demo.load(fn=start_session, inputs=session, outputs=[session, job_select])
+
+    return demo
+
 
-demo.launch()
+if __name__ == "__main__":
+    build_app().launch()
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TESTS = ['attentionOne', 'attentionTwo', 'memoryOne', 'memoryTwo', 'execuFuncOne', 'execuFuncTwo',
+         'visuoSpatOne', 'visuoSpatTwo', 'languageOne', 'languageTwo']
+TERTIARY = ['attentionThree', 'memoryThree', 'execuFuncThree', 'visuoSpatThree', 'languageThree']
+
+
+def make_cohort(n: int, seed: int = 0, missing: float = 0.1) -> pd.DataFrame:
+    # Scores around the cutoffs with `missing` of the tests and cutoff
+    # responses blank, plus series, OGSame and comorbidity columns
+    rng = np.random.default_rng(seed)
+    data = {}
+    for test in TESTS + TERTIARY:
+        x = rng.normal(0, 1.2, n).round(2)
+        x[rng.random(n) < missing] = np.nan
+        data[f"t_{test}"] = x
+    data['subj1'] = rng.integers(0, 30, n).astype(float)
+    data['subj1'][rng.random(n) < missing] = np.nan
+    data['subj2'] = rng.integers(0, 30, n).astype(float)
+    data['sq1'] = rng.choice(['a', 'b', 'c'], n)
+    data['sq2'] = rng.choice(['a', 'b', 'c'], n)
+    data['ogs'] = rng.integers(0, 2, n)
+    data['func1'] = rng.integers(0, 10, n).astype(float)
+    data['func1'][rng.random(n) < missing] = np.nan
+    for i in range(3):
+        data[f"comorb_{i}"] = rng.choice(np.array(['HTN', 'DM', 'Depression', None], dtype=object), n)
+    data['pid'] = np.arange(n)
+    return pd.DataFrame(data)
+
+
+def criteria(tertiary: bool = True) -> dict:
+    # PD_MCIx keyword arguments for make_cohort frames, using every response type
+    kwargs = {}
+    for test in TESTS:
+        kwargs[test], kwargs[f"{test}_cutoff"] = f"t_{test}", -1.5
+    if tertiary:
+        for test in TERTIARY:
+            kwargs[test], kwargs[f"{test}_cutoff"] = f"t_{test}", -1.0
+    kwargs.update(type_1='standalone', subjectiveOne_standalone='subj1', subjectiveOne_standalone_cutoff=10,
+                  type_2='standalone', subjectiveTwo_standalone='subj2', subjectiveTwo_standalone_cutoff=20,
+                  subjectiveTwo_cutoff_direction='greater',
+                  type_3='series', subjectiveThree_Series=['sq1', 'sq2'], subjectiveThree_Series_array=['a', 'b'],
+                  type_4='OGSame', subjectiveFour_OGSame='ogs',
+                  type_1F='standalone', functionalOne_standalone='func1', functionalOne_standalone_cutoff=2,
+                  type_2F='none', type_3F='OGSame', functionalThree_OGSame='ogs', type_4F='none')
+    return kwargs
+
+
+def engines():
+    # Both engines, Numba's skipped when it is not installed
+    from pdmcix.kernel import numba_available
+    return ["numpy", pytest.param("numba", marks=pytest.mark.skipif(not numba_available(),
+                                                                      reason="numba is not installed"))]
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+from pdmcix.jobs import DONE, JobQueue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "source code"))
+import app  # noqa: E402
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / "jobs"))
+    monkeypatch.setattr(app, "JOBS", queue)
+    return queue
+
+
+def submit(jobs, token, tmp_path):
+    path = str(tmp_path / "result.csv")
+    with open(path, "w") as f:
+        f.write("pid,AutoDx\n1,1\n")
+    job = jobs.submit(lambda job: path, "upload.csv", owner=token)
+    jobs._pool.shutdown(wait=True)
+    assert job.status == DONE
+    return job
+
+
+def test_reload_keeps_jobs(jobs, tmp_path):
+    # The first load stores a new token in the browser; a reload sends it back
+    token = app.restore_session(None)
+    job = submit(jobs, token, tmp_path)
+    assert app.restore_session(token) == token
+    assert [job_id for _, job_id in app.job_choices(token)] == [job.id]
+    assert os.path.exists(jobs.get(job.id, owner=token).output_path)
+    # Another browser, or a stored value that is not a token, starts afresh
+    for other in (None, "", "../" + token[3:], token.upper()):
+        assert app.restore_session(other) != token
+        assert app.job_choices(app.restore_session(other)) == []
+
+
+def test_second_session_start_lists_and_downloads(jobs, tmp_path):
+    pytest.importorskip("gradio")
+    token, update = app.start_session(None)
+    assert update['choices'] == []
+    job = submit(jobs, token, tmp_path)
+    restored, update = app.start_session(token)
+    assert restored == token and [job_id for _, job_id in update['choices']] == [job.id]
+    *_, download = app.watch_job(job.id, token)
+    assert download[2]['value'] == job.output_path
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import CriteriaConfig, PD_MCIx, PD_MCIx_stream, ResultCache
+from pdmcix.cache import VECTOR_COLUMNS, frame_digest
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def plan():
+    return CriteriaConfig.from_kwargs(**criteria()).compile()
+
+
+def test_object_values_keep_their_type():
+    # hash_pandas_object hashes object values as strings
+    a = pd.DataFrame({'x': pd.Series([3, 'a'], dtype=object)})
+    b = pd.DataFrame({'x': pd.Series(['3', 'a'], dtype=object)})
+    assert frame_digest(a, ['x']) != frame_digest(b, ['x'])
+    a, b = a.astype("category"), b.astype("category")
+    assert frame_digest(a, ['x']) != frame_digest(b, ['x'])
+
+
+def test_mixed_type_responses_are_not_shared():
+    # A series item answered 1 matches the criteria, one answered '1' does not
+    kwargs = {**criteria(), "subjectiveThree_Series_array": [1, 'b']}
+    plan = CriteriaConfig.from_kwargs(**kwargs).compile()
+    df = make_cohort(200)
+    ints = df.assign(sq1=df['sq1'].replace('a', 1))
+    strings = df.assign(sq1=df['sq1'].replace('a', '1'))
+    cache = ResultCache(directory=None)
+    first = cache.classify(ints, plan)
+    result = cache.classify(strings, plan)
+    assert cache.misses == 2
+    assert not first['Subjective_total'].equals(result['Subjective_total'])
+    pd.testing.assert_frame_equal(result, PD_MCIx(strings, **kwargs))
+
+
+@pytest.mark.parametrize("directory", [None, "disk"])
+def test_hit_matches_classifier(tmp_path, plan, directory):
+    df = make_cohort(500).assign(func_impaired=1)
+    cache = ResultCache(directory=directory and str(tmp_path))
+    cache.classify(df, plan)
+    cache.flush()
+    if directory:
+        cache._memory.clear()
+    result = cache.classify(df, plan)
+    assert cache.misses == 1 and sum(cache.hits.values()) == 1
+    pd.testing.assert_frame_equal(result, PD_MCIx(df, **criteria()))
+    stored = cache.get(cache.key(df, plan))
+    assert not VECTOR_COLUMNS & set(stored.columns)
+
+
+def test_earlier_results_are_not_cached(plan):
+    cache = ResultCache(directory=None)
+    result = PD_MCIx(make_cohort(200), **criteria())
+    cache.classify(result, plan)
+    assert cache.misses == 0 and not cache._memory
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_stream_hit_matches_stream(tmp_path, plan, suffix):
+    make_cohort(1000).to_csv(tmp_path / "in.csv", index=False)
+    output_cols = ['pid', 'AutoDx', 'amnesticStatus', 'multipleSingleDomain', 'missingValues']
+    expected = str(tmp_path / f"expected{suffix}")
+    PD_MCIx_stream(str(tmp_path / "in.csv"), expected, chunksize=300, output_cols=output_cols, config=plan)
+    cache = ResultCache(directory=None)
+    for i in range(2):
+        progress = []
+        path = str(tmp_path / f"out{i}{suffix}")
+        rows = cache.stream("upload", str(tmp_path / "in.csv"), path, chunksize=300,
+                            output_cols=output_cols, config=plan, progress=progress.append)
+        assert rows == 1000 and progress == [300, 600, 900, 1000]
+        with open(expected, "rb") as a, open(path, "rb") as b:
+            assert a.read() == b.read()
+    assert cache.misses == 1 and cache.hits["memory"] == 1
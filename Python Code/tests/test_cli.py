@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import CriteriaConfig, PD_MCIx
+from pdmcix.cli import main
+
+
+@pytest.mark.parametrize("command", [["classify", "in.csv", "out.csv"], ["serve"]])
+def test_config_required(command, capsys):
+    with pytest.raises(SystemExit) as exit:
+        main(command)
+    assert exit.value.code == 2
+    assert "--config" in capsys.readouterr().err
+
+
+def test_classify(tmp_path):
+    df = make_cohort(300)
+    df.to_csv(tmp_path / "in.csv", index=False)
+    CriteriaConfig.from_kwargs(**criteria()).save(str(tmp_path / "criteria.json"))
+    code = main(["classify", "-q", "-c", str(tmp_path / "criteria.json"), "--output-cols", "pid,AutoDx",
+                 str(tmp_path / "in.csv"), str(tmp_path / "out.csv")])
+    assert code == 0
+    result = pd.read_csv(tmp_path / "out.csv")
+    expected = PD_MCIx(pd.read_csv(tmp_path / "in.csv"), **criteria())
+    assert result['AutoDx'].tolist() == expected['AutoDx'].tolist()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import reference
+from conftest import criteria, engines, make_cohort
+from pdmcix import CriteriaConfig, PD_MCIx, PD_MCIx_sweep, comorbidityIdentifier, render_text
+
+
+@pytest.mark.parametrize("engine", engines())
+@pytest.mark.parametrize("tertiary", [True, False])
+@pytest.mark.parametrize("missing", [0.0, 0.1, 0.6])
+def test_matches_reference(engine, tertiary, missing):
+    df = make_cohort(2000, seed=int(missing * 10), missing=missing)
+    expected = reference.PD_MCIx(df.copy(), **criteria(tertiary))
+    result = PD_MCIx(df, **criteria(tertiary), engine=engine)
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("engine", engines())
+def test_integer_scores(engine):
+    df = make_cohort(500, missing=0.0)
+    scores = [col for col in df.columns if col.startswith("t_")]
+    df[scores] = (df[scores] * 10).astype(int)
+    kwargs = {k: v * 10 if k.endswith("_cutoff") else v for k, v in criteria().items()}
+    pd.testing.assert_frame_equal(PD_MCIx(df, **kwargs, engine=engine), reference.PD_MCIx(df.copy(), **kwargs))
+
+
+@pytest.mark.parametrize("engine", engines())
+@pytest.mark.parametrize("compact", [False, True])
+def test_text_rendered_on_demand(engine, compact):
+    df = make_cohort(1000)
+    result = PD_MCIx(df, **criteria(), compact=compact, text=False, engine=engine)
+    rendered = render_text(result, compact=compact)
+    # compact results keep missingMask even with text=True
+    expected = PD_MCIx(df, **criteria(), compact=compact, engine="numpy")
+    pd.testing.assert_series_equal(rendered["multipleSingleDomain"], expected["multipleSingleDomain"])
+    expected = PD_MCIx(df, **criteria(), engine="numpy")
+    pd.testing.assert_series_equal(rendered["missingValues"], expected["missingValues"])
+
+
+def test_input_not_modified():
+    df = make_cohort(100)
+    before = df.copy()
+    PD_MCIx(df, **criteria())
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_sweep_matches_classifier():
+    df = make_cohort(1000)
+    variants = {cutoff: CriteriaConfig.from_kwargs(**{**criteria(), "memoryOne_cutoff": cutoff})
+                for cutoff in (-2.0, -1.5, 0.0)}
+    swept = PD_MCIx_sweep(df, variants)
+    for cutoff, config in variants.items():
+        expected = PD_MCIx(df, **config.to_kwargs())["AutoDx"]
+        np.testing.assert_array_equal(swept[cutoff].to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize("type_", ["broad", "strict"])
+def test_comorbidities_match_reference(type_):
+    df = make_cohort(500)
+    pd.testing.assert_frame_equal(comorbidityIdentifier(df.copy(), type_), reference.comorbidityIdentifier(df.copy(), type_))
+
+
+@pytest.mark.parametrize("engine", engines())
+def test_compact_decodes_to_full_output(engine):
+    df = make_cohort(2000)
+    full = PD_MCIx(df, **criteria(), engine=engine)
+    compact = PD_MCIx(df, **criteria(), compact=True, engine=engine)
+
+    def derived_bytes(result):
+        derived = [col for col in result.columns if col not in df.columns and not col.endswith("_vec")]
+        return result[derived].memory_usage(deep=True, index=False).sum()
+
+    assert derived_bytes(compact) * 4 < derived_bytes(full)
+    decoded = render_text(compact, compact=True).astype(full.dtypes.to_dict())
+    # Reliability is float32 in compact mode
+    pd.testing.assert_frame_equal(decoded, full, check_exact=False, rtol=1e-6)
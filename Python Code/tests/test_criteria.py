@@ -0,0 +1,77 @@
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import CriteriaConfig, PD_MCIx
+from pdmcix.criteria import MAX_RESPONSES, ResponseCriterion
+
+
+def test_json_round_trip(tmp_path):
+    config = CriteriaConfig.from_kwargs(**criteria())
+    config.save(str(tmp_path / "criteria.json"))
+    loaded = CriteriaConfig.load(str(tmp_path / "criteria.json"))
+    assert loaded == config
+    assert CriteriaConfig.from_kwargs(**loaded.to_kwargs()) == config
+
+
+def test_yaml_round_trip(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    config = CriteriaConfig.from_kwargs(**criteria())
+    (tmp_path / "criteria.yaml").write_text(yaml.safe_dump(config.to_dict()))
+    assert CriteriaConfig.load(str(tmp_path / "criteria.yaml")) == config
+
+
+@pytest.mark.parametrize("change, message", [
+    ({'memoryOne': None, 'memoryOne_cutoff': None}, "memoryOne: column"),
+    ({'memoryOne_cutoff': "-1.5"}, "memoryOne: cutoff must be a number"),
+    ({'type_1': "likert"}, "subjectiveOne: unknown type 'likert'"),
+    ({'subjectiveOne_standalone_cutoff': None}, "subjectiveOne: standalone cutoff"),
+    ({'subjectiveTwo_cutoff_direction': "up"}, "subjectiveTwo: cutoff direction"),
+    ({'subjectiveThree_Series_array': []}, "subjectiveThree: series criteria need at least one"),
+    ({'type_4F': "OGSame"}, "functionalFour: OGSame criteria need a column name"),
+])
+def test_invalid_criteria(change, message):
+    with pytest.raises(ValueError, match=message):
+        CriteriaConfig.from_kwargs(**{**criteria(), **change})
+
+
+def test_invalid_tests_and_response_count():
+    tests = CriteriaConfig.from_kwargs(**criteria()).to_dict()['tests']
+    with pytest.raises(ValueError, match="Missing neuropsychological tests: languageTwo"):
+        CriteriaConfig.from_dict({'tests': {k: v for k, v in tests.items() if k != 'languageTwo'}})
+    with pytest.raises(ValueError, match="Unknown neuropsychological tests: memoryFour"):
+        CriteriaConfig.from_dict({'tests': {**tests, 'memoryFour': {'column': "x", 'cutoff': 0}}})
+    with pytest.raises(ValueError, match=f"At most {MAX_RESPONSES} subjective"):
+        CriteriaConfig.from_dict({'tests': tests, 'subjective': [{'type': "none"}] * (MAX_RESPONSES + 1)})
+    with pytest.raises(TypeError, match="subjectiveFive"):
+        CriteriaConfig.from_kwargs(**criteria(), subjectiveFive_standalone="x")
+
+
+def test_unknown_response_type_raises():
+    # The original PD_MCIx set the impairment to NaN for an unknown type
+    with pytest.raises(ValueError, match="unknown type"):
+        PD_MCIx(make_cohort(10), **{**criteria(), 'type_2F': "Likert"})
+
+
+def test_fingerprint_stable():
+    config = CriteriaConfig.from_kwargs(**criteria())
+    fingerprint = config.compile().fingerprint
+    assert config.compile().fingerprint == fingerprint
+    assert CriteriaConfig.from_dict(config.to_dict()).compile().fingerprint == fingerprint
+    # Only the response objects' content matters, not their identity
+    rebuilt = CriteriaConfig(config.tests, [ResponseCriterion(**vars(r)) for r in config.subjective],
+                             config.functional)
+    assert rebuilt.compile().fingerprint == fingerprint
+
+
+@pytest.mark.parametrize("change", [
+    {'memoryOne_cutoff': -1.4},
+    {'memoryThree': "t_memoryOne"},
+    {'memoryThree': None, 'memoryThree_cutoff': None},
+    {'subjectiveTwo_cutoff_direction': "less"},
+    {'subjectiveThree_Series_array': ['a', 'c']},
+    {'subjectiveThree_Series_match': "any"},
+    {'type_4': "none"},
+])
+def test_fingerprint_changes_with_criteria(change):
+    fingerprint = CriteriaConfig.from_kwargs(**criteria()).compile().fingerprint
+    assert CriteriaConfig.from_kwargs(**{**criteria(), **change}).compile().fingerprint != fingerprint
@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from pdmcix.formats import TableWriter, head_table
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_all_null_first_chunk(tmp_path, suffix):
+    # A column with no values in the first chunk still takes later values
+    path = str(tmp_path / f"out{suffix}")
+    with TableWriter(path) as writer:
+        writer.write(pd.DataFrame({'pid': [1, 2], 'label': [None, None]}))
+        writer.write(pd.DataFrame({'pid': [3], 'label': ["amnestic"]}))
+    result = head_table(path, 10)
+    assert result['pid'].tolist() == [1, 2, 3]
+    assert result['label'].tolist() == [None, None, "amnestic"]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet", ".feather"])
+def test_empty_table_keeps_columns(tmp_path, suffix):
+    path = str(tmp_path / f"out{suffix}")
+    TableWriter(path, ['pid', 'AutoDx']).close()
+    assert list(head_table(path)) == ['pid', 'AutoDx']
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import PD_MCIx, PD_MCIx_incremental, write_table
+from pdmcix.incremental import HASH_COL
+
+
+def classify(df, previous=None, **kwargs):
+    return PD_MCIx_incremental(df, 'pid', previous=previous, **{**criteria(), **kwargs})
+
+
+def assert_matches_classifier(result, df, **kwargs):
+    expected = PD_MCIx(df, **{**criteria(), **kwargs})
+    pd.testing.assert_frame_equal(result.drop(columns=HASH_COL), expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_file_round_trip(tmp_path, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    df = make_cohort(500)
+    path = str(tmp_path / f"previous{suffix}")
+    write_table(classify(df), path)
+    new = df.assign(t_memoryOne=df['t_memoryOne'].where(df.index % 5 != 0, -3.0))
+    result = classify(new, previous=path)
+    assert result.attrs['reclassified'] == 100
+    assert_matches_classifier(result, new)
+
+
+def test_changed_unchanged_new_and_deleted_rows():
+    df = make_cohort(400)
+    previous = classify(df)
+    assert previous.attrs['reclassified'] == 400
+    unchanged = classify(df, previous)
+    assert unchanged.attrs['reclassified'] == 0
+    pd.testing.assert_frame_equal(unchanged, previous)
+
+    changed = df.copy()
+    changed.loc[:9, 'subj2'] = 29.0
+    extra = make_cohort(20, seed=1).assign(pid=np.arange(1000, 1020))
+    # Rows 390+ deleted, 20 new patients, in shuffled order
+    new = pd.concat([changed.iloc[:390], extra]).sample(frac=1, random_state=0)
+    result = classify(new, previous)
+    assert result.attrs['reclassified'] == (df.loc[:9, 'subj2'] != 29.0).sum() + 20
+    assert list(result['pid']) == list(new['pid'])
+    assert_matches_classifier(result, new)
+
+
+def test_value_type_change_is_reclassified():
+    # hash_pandas_object hashes object values as strings, so 1 and '1' collide
+    kwargs = {"subjectiveThree_Series_array": [1, 'b']}
+    df = make_cohort(200)
+    ints = df.assign(sq1=df['sq1'].replace('a', 1))
+    strings = df.assign(sq1=df['sq1'].replace('a', '1'))
+    result = classify(strings, classify(ints, **kwargs), **kwargs)
+    assert result.attrs['reclassified'] == (df['sq1'] == 'a').sum()
+    assert_matches_classifier(result, strings, **kwargs)
+
+
+def test_criteria_change_reclassifies_every_row():
+    df = make_cohort(300)
+    previous = classify(df)
+    result = classify(df, previous, memoryOne_cutoff=-1.0)
+    assert result.attrs['reclassified'] == 300
+    assert not (result[HASH_COL] == previous[HASH_COL]).any()
+    assert_matches_classifier(result, df, memoryOne_cutoff=-1.0)
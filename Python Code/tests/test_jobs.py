@@ -0,0 +1,20 @@
+from pdmcix.jobs import DONE, FINISHED, JobQueue
+
+
+def _wait(queue, job):
+    queue._pool.shutdown(wait=True)
+    assert job.status in FINISHED
+
+
+def test_jobs_scoped_to_owner(tmp_path):
+    queue = JobQueue(str(tmp_path))
+    path = str(tmp_path / "result.csv")
+    mine = queue.submit(lambda job: path, "mine.csv", owner="a")
+    theirs = queue.submit(lambda job: path, "theirs.csv", owner="b")
+    _wait(queue, mine)
+    assert [job.id for job in queue.jobs(owner="a")] == [mine.id]
+    assert queue.get(theirs.id, owner="a") is None
+    assert queue.get(mine.id, owner="a").status == DONE
+    assert not queue.cancel(theirs.id, owner="a")
+    # Owners survive a restart
+    assert [job.id for job in JobQueue(str(tmp_path)).jobs(owner="b")] == [theirs.id]
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from conftest import criteria, make_cohort
+from pdmcix import PD_MCIx, PD_MCIx_longitudinal, progression_summary
+
+# Hand-built visits: patient, days since baseline, stage
+VISITS = [
+    ('a', 0, 'noMCI'), ('a', 100, 'MCI'), ('a', 200, 'PDD-risk'), ('a', 365, 'PDD-risk'),
+    ('b', 0, 'MCI'), ('b', 30, 'noMCI'), ('b', 60, 'nan'), ('b', 90, 'MCI'),
+    ('c', 0, 'noMCI'), ('c', 10, 'noMCI'),
+    ('d', 0, 'nan'),
+    ('e', 0, 'noMCI'), ('e', 50, 'MCI'), ('e', 80, 'noMCI'),
+]
+
+
+def test_progression_on_known_visits():
+    visits = pd.DataFrame(VISITS, columns=['pid', 'days', 'stage'])
+    visits['date'] = pd.Timestamp("2020-01-01") + pd.to_timedelta(visits['days'], unit="D")
+    # Row order must not matter
+    summary = progression_summary(visits.sample(frac=1, random_state=0), 'pid', 'date').sort_index()
+    assert summary['visits'].tolist() == [4, 4, 2, 1, 3]
+    assert summary['baselineStage'].tolist() == ['noMCI', 'MCI', 'noMCI', 'nan', 'noMCI']
+    assert summary['lastStage'].tolist() == ['PDD-risk', 'MCI', 'noMCI', 'nan', 'noMCI']
+    assert summary['worstStage'].tolist() == ['PDD-risk', 'MCI', 'noMCI', 'nan', 'MCI']
+    assert summary['transitions'].tolist() == ['noMCI > MCI > PDD-risk', 'MCI > noMCI > MCI', 'noMCI', 'nan',
+                                               'noMCI > MCI > noMCI']
+    # b converts at visit 4: the unstaged visit 3 is skipped, so it follows noMCI
+    np.testing.assert_array_equal(summary['conversionVisit'], [2, 4, np.nan, np.nan, 2])
+    np.testing.assert_array_equal(summary['daysToConversion'], [100, 90, np.nan, np.nan, 50])
+    np.testing.assert_array_equal(summary['pddRiskVisit'], [3, np.nan, np.nan, np.nan, np.nan])
+    np.testing.assert_array_equal(summary['daysToPddRisk'], [200, np.nan, np.nan, np.nan, np.nan])
+    assert summary['reversions'].tolist() == [0, 1, 0, 0, 1]
+    assert summary['stable'].tolist() == [False, False, True, False, False]
+    assert summary['stableConversion'].tolist() == [True, True, False, False, False]
+    # PDD-risk and conversion counts over the cohort
+    assert (summary['worstStage'] == 'PDD-risk').sum() == 1
+    assert summary['conversionVisit'].notna().sum() == 3
+
+
+def test_visits_match_classifier():
+    df = make_cohort(600)
+    # 200 patients with three visits each, a year apart, rows in file order
+    df['patient'] = df['pid'] % 200
+    df['date'] = pd.Timestamp("2020-01-01") + pd.to_timedelta(365 * (df['pid'] // 200), unit="D")
+    visits, patients = PD_MCIx_longitudinal(df, 'patient', 'date', **criteria())
+    expected = PD_MCIx(df, **criteria())
+    pd.testing.assert_frame_equal(visits[expected.columns], expected)
+    assert (visits['visitNumber'] == df['pid'] // 200 + 1).all()
+    assert (visits['daysSinceBaseline'] == 365 * (df['pid'] // 200)).all()
+    pdd_risk = (expected['AutoDx'] == 1) & (expected['multipleSingle'] == "Multiple")
+    assert (visits['stage'] == 'PDD-risk').sum() == pdd_risk.sum()
+    pd.testing.assert_frame_equal(patients, progression_summary(visits, 'patient', 'date'))
+    assert patients['visits'].eq(3).all() and len(patients) == 200
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import PD_MCIx, PD_MCIx_mapped
+from pdmcix.formats import TableWriter
+
+pytest.importorskip("pyarrow")
+
+
+def cohort(n=1000, missing=0.1):
+    return make_cohort(n, missing=missing).drop(columns=[f"comorb_{i}" for i in range(3)])
+
+
+def write_arrow(df, path, batch_rows):
+    with TableWriter(path) as writer:
+        for start in range(0, len(df), batch_rows):
+            writer.write(df.iloc[start:start + batch_rows])
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("batch_rows", [1000, 300])
+def test_arrow_matches_classifier(tmp_path, batch_rows, compact):
+    df = cohort()
+    path = str(tmp_path / "scores.arrow")
+    write_arrow(df, path, batch_rows)
+    result = PD_MCIx_mapped(path, compact=compact, **criteria())
+    expected = PD_MCIx(df, compact=compact, **criteria())
+    assert len(result) == len(df) and 'AutoDx' in result
+    pd.testing.assert_frame_equal(result, expected[result.columns])
+
+
+def test_batches_widen_flags(tmp_path):
+    # No missing score in the first batch: its flags are integers, later ones floats
+    df = cohort(missing=0.0)
+    df.loc[600:, 't_memoryOne'] = np.nan
+    path = str(tmp_path / "scores.arrow")
+    write_arrow(df, path, 500)
+    result = PD_MCIx_mapped(path, output_cols=['AutoDx', 'memoryOne_impaired'], **criteria())
+    expected = PD_MCIx(df, **criteria())[['AutoDx', 'memoryOne_impaired']]
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_npy_matches_classifier(tmp_path):
+    df = cohort()
+    path = str(tmp_path / "scores.npy")
+    # Text as fixed-width strings, so the file can be memory-mapped
+    np.save(path, df.to_records(index=False, column_dtypes={'sq1': "U1", 'sq2': "U1"}))
+    result = PD_MCIx_mapped(path, **criteria())
+    expected = PD_MCIx(df, **criteria())
+    pd.testing.assert_frame_equal(result, expected[result.columns])
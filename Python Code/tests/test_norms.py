@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+
+from pdmcix.norms import NormTable
+
+
+def test_same_edges_for_age_and_education():
+    # Age and education bins with identical edges are still binned separately
+    table = pd.DataFrame({
+        'test': 'moca',
+        'age_min': [0, 0, 11, 11], 'age_max': [10, 10, 20, 20],
+        'education_min': [0, 11, 0, 11], 'education_max': [10, 20, 10, 20],
+        'mean': [1.0, 2.0, 3.0, 4.0], 'sd': 1.0,
+    })
+    norms = NormTable.compile(table)
+    age, education = np.array([5.0, 15.0]), np.array([15.0, 5.0])
+    z = norms.zscores('moca', np.zeros(2), age, education, _bins={})
+    np.testing.assert_array_equal(z, [-2.0, -3.0])
@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import PD_MCIx, PD_MCIx_parallel, comorbidityIdentifier, comorbidityIdentifier_parallel
+
+
+@pytest.mark.parametrize("partitions", [None, 3])
+def test_matches_serial(partitions):
+    df = make_cohort(600)
+    result = PD_MCIx_parallel(df, workers=2, partitions=partitions, **criteria())
+    pd.testing.assert_frame_equal(result, PD_MCIx(df, **criteria()))
+
+
+@pytest.mark.parametrize("type_", ["broad", "strict"])
+def test_comorbidities_match_serial(type_):
+    df = make_cohort(600)
+    result = comorbidityIdentifier_parallel(df, type_, workers=2)
+    pd.testing.assert_frame_equal(result, comorbidityIdentifier(df.copy(), type_))
+    assert 'comorbidities' not in df.columns
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import PD_MCIx, PD_MCIx_dask, comorbidityIdentifier, comorbidityIdentifier_dask, write_partitions
+from pdmcix.partitioned import FLOAT_FLAGS
+
+dask = pytest.importorskip("dask")
+dd = pytest.importorskip("dask.dataframe")
+
+
+@pytest.fixture(autouse=True)
+def pandas_strings():
+    # Keep object columns as they are in pandas rather than Arrow strings
+    with dask.config.set({"dataframe.convert-string": False, "scheduler": "synchronous"}):
+        yield
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_matches_pandas(compact):
+    df = make_cohort(1000)
+    result = PD_MCIx_dask(dd.from_pandas(df, npartitions=4), compact=compact, **criteria()).compute()
+    expected = PD_MCIx(df, compact=compact, **criteria())
+    if not compact:
+        # Flags are float64 in every partition (see partitioned.py)
+        expected = expected.astype({col: float for col in FLOAT_FLAGS if col in expected})
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_comorbidities_match_pandas():
+    df = make_cohort(500)
+    result = comorbidityIdentifier_dask(dd.from_pandas(df, npartitions=3)).compute()
+    pd.testing.assert_frame_equal(result, comorbidityIdentifier(df.copy()))
+
+
+def test_write_partitions(tmp_path):
+    df = make_cohort(1000)
+    path = str(tmp_path / "out.csv")
+    ddf = PD_MCIx_dask(dd.from_pandas(df, npartitions=5), **criteria())
+    assert write_partitions(ddf, path, columns=['pid', 'AutoDx', 'multipleSingle'], window=2) == 1000
+    expected = PD_MCIx(df, **criteria())[['pid', 'AutoDx', 'multipleSingle']]
+    pd.testing.assert_frame_equal(pd.read_csv(path, keep_default_na=False, na_values={'AutoDx': [""]}),
+                                  expected, check_dtype=False)
@@ -0,0 +1,47 @@
+import tracemalloc
+from contextlib import contextmanager
+
+import pytest
+
+from conftest import criteria, engines, make_cohort
+from pdmcix import PD_MCIx, StageProfiler
+
+
+def test_memory_profiling_stops_tracing():
+    profiler = StageProfiler(memory=True)
+    PD_MCIx(make_cohort(200), **criteria(), profiler=profiler)
+    assert not tracemalloc.is_tracing()
+    assert profiler.to_frame()['peak_bytes'].notna().all()
+
+
+def test_memory_profiling_leaves_callers_tracing():
+    tracemalloc.start()
+    try:
+        PD_MCIx(make_cohort(200), **criteria(), profiler=StageProfiler(memory=True))
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+class NestingProfiler(StageProfiler):
+    # Records the largest number of stages open at once
+    open = deepest = 0
+
+    @contextmanager
+    def stage(self, name, rows):
+        self.open += 1
+        self.deepest = max(self.deepest, self.open)
+        try:
+            with super().stage(name, rows):
+                yield
+        finally:
+            self.open -= 1
+
+
+@pytest.mark.parametrize("engine", engines())
+def test_stages_do_not_overlap(engine):
+    # A stage opened inside another would be counted twice in the totals
+    profiler = NestingProfiler()
+    PD_MCIx(make_cohort(2000), **criteria(), profiler=profiler, engine=engine)
+    assert profiler.deepest == 1
+    assert {'subjective', 'functional'} <= set(profiler.to_frame()['stage'])
@@ -0,0 +1,56 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import PD_MCIx
+from pdmcix import server as server_module
+from pdmcix.server import make_server
+
+
+@pytest.fixture
+def url():
+    server = make_server(port=0, chunksize=100, **criteria())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body, query="", content_type="text/csv"):
+    request = urllib.request.Request(f"{url}/classify{query}", data=body, headers={"Content-Type": content_type})
+    with urllib.request.urlopen(request) as response:
+        return response.headers, response.read()
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet"])
+def test_classify_streams_csv(url, output_format):
+    if output_format == "parquet":
+        pytest.importorskip("pyarrow")
+    df = make_cohort(1000)
+    headers, body = post(url, df.to_csv(index=False).encode(), f"?output_cols=pid,AutoDx&output_format={output_format}")
+    assert headers["Transfer-Encoding"] == "chunked"
+    result = pd.read_csv(io.BytesIO(body)) if output_format == "csv" else pd.read_parquet(io.BytesIO(body))
+    expected = PD_MCIx(df, **criteria())
+    assert result['pid'].tolist() == df['pid'].tolist()
+    assert result['AutoDx'].tolist() == expected['AutoDx'].tolist()
+
+
+def test_errors(url, monkeypatch):
+    body = make_cohort(10).drop(columns="subj1").to_csv(index=False).encode()
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(url, body)
+    assert error.value.code == 400 and "subj1" in json.load(error.value)["error"]
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(server_module, "PD_MCIx_stream", fail)
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(url, body)
+    assert error.value.code == 500 and json.load(error.value)["error"] == "Internal error: RuntimeError: disk full"
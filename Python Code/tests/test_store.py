@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import PD_MCIx, ResultStore, build_store
+
+
+@pytest.fixture(scope="module")
+def cohort():
+    df = make_cohort(1000)
+    return df, PD_MCIx(df, **criteria())
+
+
+@pytest.fixture(scope="module")
+def store(cohort, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("store") / "results.db")
+    return build_store(cohort[0], path, passthrough=['ogs'], index=['pid'], chunksize=300, **criteria())
+
+
+def test_count(cohort, store):
+    df, expected = cohort
+    assert store.count() == len(df)
+    assert store.count(AutoDx=1) == (expected['AutoDx'] == 1).sum()
+    assert store.count(amnesticStatus=['amnestic', 'nonAmnestic']) == (expected['AutoDx'] == 1).sum()
+    assert store.count(pid=[3, 5, 10_000]) == 2
+    memory = expected['multipleSingleDomain'].str.contains("Memory")
+    assert store.count(domains=["Memory"]) == memory.sum()
+    low = expected['Reliability'] < 80
+    assert store.count(reliability_below=80) == low.sum()
+    assert store.count(domains=["Memory"], reliability_at_least=80) == (memory & ~low).sum()
+    with pytest.raises(ValueError, match="Unknown domain"):
+        store.count(domains=["Mood"])
+    with pytest.raises(KeyError, match="Not a stored column"):
+        store.count(t_memoryOne=1)
+
+
+def test_query(cohort, store):
+    df, expected = cohort
+    columns = ['pid', 'ogs', 'AutoDx', 'multipleSingle', 'multipleSingleDomain', 'missingValues', 'Reliability']
+    result = store.query(columns, amnesticStatus='amnestic')
+    rows = expected[expected['amnesticStatus'] == 'amnestic'][columns].reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, rows, check_dtype=False)
+    assert store.query(columns, pid=-1).columns.tolist() == columns
+    # Every row back, in the order stored
+    everything = store.query()
+    assert everything.columns.tolist() == store.text_columns
+    assert everything['pid'].tolist() == df['pid'].tolist()
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_export_round_trip(tmp_path, store, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"export{suffix}")
+    columns = ['pid', 'AutoDx', 'multipleSingleDomain', 'Reliability']
+    rows = store.export(path, columns, chunksize=100, domains=["Attention"])
+    assert rows == store.count(domains=["Attention"])
+    if suffix == ".csv":
+        exported = pd.read_csv(path, keep_default_na=False)
+    else:
+        exported = pd.read_parquet(path)
+    pd.testing.assert_frame_equal(exported, store.query(columns, domains=["Attention"]), check_dtype=False)
+    assert ResultStore(store.path).fingerprint == store.fingerprint
@@ -0,0 +1,21 @@
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import PD_MCIx, PD_MCIx_stream
+
+
+@pytest.mark.parametrize("chunksize", [50, 333, 1000, 5000])
+@pytest.mark.parametrize("source", ["frame", "parquet"])
+def test_matches_in_memory_csv(tmp_path, chunksize, source):
+    # Few missing scores and no tertiary fallback: the file has missing
+    # flags, but many chunks have none in a given test column
+    df = make_cohort(1000, missing=0.01)
+    expected = PD_MCIx(df, **criteria(tertiary=False))
+    if source == "parquet":
+        pytest.importorskip("pyarrow")
+        df.to_parquet(tmp_path / "in.parquet", index=False)
+        df = str(tmp_path / "in.parquet")
+    PD_MCIx_stream(df, str(tmp_path / "out.csv"), chunksize=chunksize, output_cols=list(expected.columns),
+                   **criteria(tertiary=False))
+    with open(tmp_path / "out.csv", newline="") as f:
+        assert f.read().splitlines() == expected.to_csv(index=False).splitlines()
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from pdmcix.uploads import UploadCache, estimate_csv_bytes
+
+
+def _csv(tmp_path, n=5000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'pid': np.arange(n), 'score': rng.normal(size=n).round(2),
+                       'site': rng.choice(['north', 'south'], n)})
+    path = str(tmp_path / "upload.csv")
+    df.to_csv(path, index=False)
+    return path, df
+
+
+def test_estimate_close_to_parsed_size(tmp_path):
+    path, df = _csv(tmp_path)
+    parsed = pd.read_csv(path).memory_usage(deep=True).sum()
+    estimate = estimate_csv_bytes(path, len(open(path, "rb").read()))
+    assert 0.8 * parsed < estimate < 1.2 * parsed
+
+
+def test_schema_first_then_parsed_in_background(tmp_path):
+    path, df = _csv(tmp_path)
+    upload = UploadCache().get(path)
+    assert upload.columns == list(df.columns)
+    pd.testing.assert_frame_equal(upload.head(), df.head())
+    upload.parsing.result()
+    pd.testing.assert_frame_equal(upload.frame, df)
+    assert upload.rows == len(df) and upload.dtypes['site'] == 'object'
+
+
+def test_over_budget_by_parsed_size(tmp_path):
+    # The file fits the budget but its parsed frame would not
+    path, df = _csv(tmp_path)
+    size = len(open(path, "rb").read())
+    upload = UploadCache(budget_bytes=size).get(path)
+    assert upload.parsing is None and upload.frame is None
+    assert upload.columns == list(df.columns)
+
+
+def test_paths_evicted_with_entries(tmp_path):
+    cache = UploadCache(max_entries=2)
+    paths = []
+    for i in range(4):
+        path = str(tmp_path / f"upload{i}.csv")
+        pd.DataFrame({'pid': [i]}).to_csv(path, index=False)
+        paths.append(path)
+        cache.get(path)
+    assert list(cache._entries) == [cache._seen[p][2] for p in paths[2:]]
+    assert list(cache._seen) == paths[2:]
+    # The same contents under many paths keep one entry and the newest paths
+    for i in range(5):
+        path = str(tmp_path / f"copy{i}.csv")
+        pd.DataFrame({'pid': [3]}).to_csv(path, index=False)
+        assert cache.get(path).path == path
+    assert len(cache._entries) == 2 and len(cache._seen) == 2
+    assert list(cache._seen)[-1] == path
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import criteria, make_cohort
+from pdmcix import PD_MCIx, agreement, cohen_kappa, confusion_matrix
+
+
+@pytest.fixture
+def rated():
+    # Reference (rows) x AutoDx (columns) counts [[40, 10], [5, 45]]:
+    # accuracy 0.85, chance agreement 0.5, kappa 0.7. Subgroup 'a' holds
+    # every AutoDx 0, 'b' every AutoDx 1; one pair has no reference
+    pairs = [(0, 0, 40), (0, 1, 10), (1, 0, 5), (1, 1, 45)]
+    reference = np.repeat([r for r, _, _ in pairs], [n for _, _, n in pairs]).astype(float)
+    auto = np.repeat([a for _, a, _ in pairs], [n for _, _, n in pairs])
+    df = pd.DataFrame({'AutoDx': np.append(auto, 1), 'reference': np.append(reference, np.nan)})
+    df['amnesticStatus'] = np.where(df['AutoDx'] == 0, 'a', 'b')
+    return df
+
+
+def test_known_confusion_matrix(rated):
+    counts = confusion_matrix(rated['AutoDx'], rated['reference'])
+    np.testing.assert_array_equal(counts.to_numpy(), [[40, 10], [5, 45]])
+    assert counts.index.name == 'reference' and counts.columns.name == 'AutoDx'
+    assert cohen_kappa(rated['AutoDx'], rated['reference']) == pytest.approx(0.7)
+
+    result = agreement(rated, 'reference', by=['amnesticStatus'])
+    assert result.loc[('all', 'all'), 'n'] == 100
+    assert result.loc[('all', 'all'), 'accuracy'] == pytest.approx(0.85)
+    assert result.loc[('all', 'all'), 'kappa'] == pytest.approx(0.7)
+    # One AutoDx label per subgroup: accuracy is the share of that reference label, kappa 0
+    assert result.loc[('amnesticStatus', 'a'), ['n', 'accuracy', 'kappa']].tolist() == pytest.approx([45, 40 / 45, 0])
+    assert result.loc[('amnesticStatus', 'b'), ['n', 'accuracy', 'kappa']].tolist() == pytest.approx([55, 45 / 55, 0])
+
+
+def test_bootstrap_intervals(rated):
+    result = agreement(rated, 'reference', by=(), n_boot=2000, seed=0)
+    row = result.loc[('all', 'all')]
+    for metric in ('accuracy', 'kappa'):
+        assert row[f"{metric}_ci_low"] < row[metric] < row[f"{metric}_ci_high"]
+    # Normal approximation for the accuracy interval, sqrt(0.85 * 0.15 / 100) ~ 0.036
+    assert row['accuracy_ci_high'] - row['accuracy_ci_low'] == pytest.approx(2 * 1.96 * 0.0357, rel=0.15)
+    pd.testing.assert_frame_equal(result, agreement(rated, 'reference', by=(), n_boot=2000, seed=0))
+
+
+def test_agreement_with_itself():
+    df = PD_MCIx(make_cohort(500), **criteria())
+    result = agreement(df, df['AutoDx'].copy())
+    assert (result['accuracy'] == 1).all()
+    assert result.loc[('all', 'all'), 'n'] == df['AutoDx'].notna().sum()
+    assert set(result.index.get_level_values('group')) == {'all', 'amnesticStatus', 'multipleSingle'}